@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Хранилище результатов бенчмарков и отчёт о регрессиях
+
+Запуск из корня репозитория:
+    python benchmarks/compare.py run --label v1.2 --size t5_f24_r10000 --size t5_f24_r50000 --runs 5
+    python benchmarks/compare.py compare --baseline v1.1 --current v1.2 --html report.html
+    python benchmarks/compare.py list
+
+run прогоняет набор (suite.py) --runs раз для каждого размера и сохраняет
+по каждому замеру медиану, доверительный интервал медианы и все значения
+в <store>/<метка>.json (по умолчанию метка - git-ревизия). Результаты
+хранятся по ключу размера проекта, поэтому в отчёте видно, как время
+растёт с числом таблиц, полей и записей.
+
+compare сравнивает медианы двух меток: регрессия - если медиана выросла
+больше чем на --threshold и интервалы не перекрываются (то есть разница
+не объясняется шумом). Код возврата 1 - если найдена регрессия.
+"""
+
+import argparse
+import html
+import json
+import math
+import os
+import re
+import statistics
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from suite import git_revision, run_suite, size_key
+
+DEFAULT_STORE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_THRESHOLD = 0.10
+
+SIZE_PATTERN = re.compile(r'^t(\d+)_f(\d+)_r(\d+)$')
+
+
+def parse_size(key: str) -> Tuple[int, int, int]:
+    match = SIZE_PATTERN.match(key)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"Размер в виде t<таблиц>_f<полей>_r<записей>: {key}")
+    return tuple(int(part) for part in match.groups())
+
+
+# ========== СТАТИСТИКА ==========
+
+def median_interval(samples: List[float], z: float = 1.96) -> Tuple[float, float]:
+    """
+    Доверительный интервал медианы (~95%) по порядковым статистикам -
+    без предположений о распределении времени. При малом числе
+    прогонов интервал равен размаху значений.
+    """
+    ordered = sorted(samples)
+    n = len(ordered)
+    half_width = z * math.sqrt(n) / 2
+    low = max(0, math.floor(n / 2 - half_width))
+    high = min(n - 1, math.ceil(n / 2 + half_width) - 1)
+    return ordered[low], ordered[high]
+
+
+def summarize(samples: List[float]) -> Dict:
+    low, high = median_interval(samples)
+    return {
+        'median': statistics.median(samples),
+        'low': low,
+        'high': high,
+        'samples': samples,
+    }
+
+
+# ========== ХРАНИЛИЩЕ ==========
+
+class ResultStore:
+    """Папка с файлами <метка>.json: {label, environment, sizes: {ключ: {params, runs, metrics}}}"""
+
+    def __init__(self, folder: str = DEFAULT_STORE):
+        self.folder = folder
+
+    def path(self, label: str) -> str:
+        safe = re.sub(r'[^\w.-]+', '_', label)
+        return os.path.join(self.folder, f"{safe}.json")
+
+    def load(self, label: str) -> Optional[Dict]:
+        try:
+            with open(self.path(label), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, data: Dict):
+        os.makedirs(self.folder, exist_ok=True)
+        with open(self.path(data['label']), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def labels(self) -> List[str]:
+        """Метки от старых к новым"""
+        if not os.path.isdir(self.folder):
+            return []
+        files = [name for name in os.listdir(self.folder) if name.endswith('.json')]
+        files.sort(key=lambda name: os.path.getmtime(os.path.join(self.folder, name)))
+        return [os.path.splitext(name)[0] for name in files]
+
+    def record(self, label: str, reports: List[Dict]) -> Dict:
+        """Добавляет прогоны одного размера к метке (прежние данные этого размера заменяются)"""
+        data = self.load(label) or {'label': label, 'sizes': {}}
+        data['environment'] = reports[0]['environment']
+        data['updated'] = datetime.now().isoformat(timespec='seconds')
+
+        names = []
+        for report in reports:
+            names.extend(name for name in report['results'] if name not in names)
+        metrics = {}
+        for name in names:
+            samples = [report['results'][name] for report in reports if name in report['results']]
+            metrics[name] = summarize(samples)
+        data['sizes'][reports[0]['key']] = {
+            'params': reports[0]['params'],
+            'runs': len(reports),
+            'metrics': metrics,
+            'skipped': reports[0]['skipped'],
+        }
+        self.save(data)
+        return data
+
+
+# ========== СРАВНЕНИЕ ==========
+
+def compare(baseline: Dict, current: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """Строки сравнения по общим размерам и замерам"""
+    rows = []
+    for key in sorted(set(baseline['sizes']) & set(current['sizes']), key=parse_size):
+        before = baseline['sizes'][key]['metrics']
+        after = current['sizes'][key]['metrics']
+        for name in before:
+            if name not in after:
+                continue
+            old, new = before[name], after[name]
+            change = (new['median'] - old['median']) / old['median'] if old['median'] else 0.0
+            if change > threshold and new['low'] > old['high']:
+                status = 'regression'
+            elif change < -threshold and new['high'] < old['low']:
+                status = 'improvement'
+            else:
+                status = 'same'
+            rows.append({'key': key, 'name': name, 'baseline': old, 'current': new,
+                         'change': change, 'status': status})
+    return rows
+
+
+def scaling(data: Dict) -> Dict[str, List[Tuple[str, float]]]:
+    """Замер -> [(ключ размера, медиана)] по возрастанию размера"""
+    curves: Dict[str, List[Tuple[str, float]]] = {}
+    for key in sorted(data['sizes'], key=parse_size):
+        for name, metric in data['sizes'][key]['metrics'].items():
+            curves.setdefault(name, []).append((key, metric['median']))
+    return curves
+
+
+STATUS_TEXT = {'regression': 'РЕГРЕССИЯ', 'improvement': 'улучшение', 'same': ''}
+
+
+def ms(seconds: float) -> str:
+    return f"{seconds * 1000:.2f}"
+
+
+def text_report(baseline: Dict, current: Dict, rows: List[Dict], threshold: float) -> str:
+    lines = [f"{baseline['label']} -> {current['label']} (порог {threshold:.0%})"]
+    key = None
+    for row in rows:
+        if row['key'] != key:
+            key = row['key']
+            lines.append(f"\n{key}")
+            lines.append(f"  {'замер':<22}{'было, ms':>12}{'стало, ms':>12}{'изменение':>12}  интервал, ms")
+        interval = f"{ms(row['current']['low'])}..{ms(row['current']['high'])}"
+        lines.append(f"  {row['name']:<22}{ms(row['baseline']['median']):>12}{ms(row['current']['median']):>12}"
+                     f"{row['change']:>+12.1%}  {interval:<22}{STATUS_TEXT[row['status']]}")
+
+    curves = scaling(current)
+    if any(len(points) > 1 for points in curves.values()):
+        lines.append(f"\nМасштабирование ({current['label']}), ms")
+        for name, points in curves.items():
+            lines.append(f"  {name:<22}" + '  '.join(f"{key}={ms(value)}" for key, value in points))
+
+    regressions = sum(row['status'] == 'regression' for row in rows)
+    lines.append(f"\nРегрессий: {regressions}")
+    return '\n'.join(lines)
+
+
+def _polyline(points: List[Tuple[str, float]], width: int = 160, height: int = 32) -> str:
+    """Маленький график медиан по размерам (inline SVG)"""
+    top = max(value for _, value in points) or 1
+    step = width / max(1, len(points) - 1)
+    coords = ' '.join(f"{i * step:.1f},{height - value / top * (height - 2):.1f}" for i, (_, value) in enumerate(points))
+    return (f'<svg width="{width}" height="{height}"><polyline points="{coords}" '
+            f'fill="none" stroke="#0e639c" stroke-width="2"/></svg>')
+
+
+def html_report(baseline: Dict, current: Dict, rows: List[Dict], threshold: float) -> str:
+    escape = html.escape
+    out = [
+        '<!DOCTYPE html><html><head><meta charset="utf-8">',
+        f"<title>Бенчмарки: {escape(baseline['label'])} → {escape(current['label'])}</title>",
+        '<style>body{font-family:sans-serif;background:#1e1e1e;color:#d4d4d4}'
+        'table{border-collapse:collapse;margin-bottom:24px}td,th{padding:4px 10px;border-bottom:1px solid #3c3c3c}'
+        'td.n{text-align:right;font-family:monospace}.regression{background:#5a1d1d}.improvement{background:#1d4a2a}'
+        '</style></head><body>',
+        f"<h1>{escape(baseline['label'])} → {escape(current['label'])}</h1>",
+        f"<p>Порог регрессии: {threshold:.0%}; интервал - 95% для медианы.</p>",
+    ]
+    key = None
+    for row in rows:
+        if row['key'] != key:
+            if key is not None:
+                out.append('</table>')
+            key = row['key']
+            out.append(f"<h2>{escape(key)}</h2><table><tr><th>Замер</th><th>Было, ms</th><th>Стало, ms</th>"
+                       f"<th>Изменение</th><th>Интервал, ms</th><th></th></tr>")
+        out.append(
+            f"<tr class=\"{row['status']}\"><td>{escape(row['name'])}</td>"
+            f"<td class=\"n\">{ms(row['baseline']['median'])}</td><td class=\"n\">{ms(row['current']['median'])}</td>"
+            f"<td class=\"n\">{row['change']:+.1%}</td>"
+            f"<td class=\"n\">{ms(row['current']['low'])}..{ms(row['current']['high'])}</td>"
+            f"<td>{STATUS_TEXT[row['status']]}</td></tr>"
+        )
+    if key is not None:
+        out.append('</table>')
+
+    curves = scaling(current)
+    if any(len(points) > 1 for points in curves.values()):
+        out.append(f"<h2>Масштабирование ({escape(current['label'])})</h2><table><tr><th>Замер</th>")
+        keys = [key for key, _ in max(curves.values(), key=len)]
+        out.extend(f"<th>{escape(key)}, ms</th>" for key in keys)
+        out.append('<th></th></tr>')
+        for name, points in curves.items():
+            values = dict(points)
+            out.append(f"<tr><td>{escape(name)}</td>")
+            out.extend(f"<td class=\"n\">{ms(values[key]) if key in values else ''}</td>" for key in keys)
+            out.append(f"<td>{_polyline(points)}</td></tr>")
+        out.append('</table>')
+    out.append('</body></html>')
+    return '\n'.join(out)
+
+
+# ========== КОМАНДНАЯ СТРОКА ==========
+
+def command_run(args, store: ResultStore) -> int:
+    label = args.label or git_revision() or datetime.now().strftime('%Y%m%d_%H%M%S')
+    sizes = args.size or [size_key(5, 24, 10000)]
+    for key in sizes:
+        tables, fields, rows = parse_size(key)
+        reports = []
+        for run in range(args.runs):
+            print(f"{label} {key}: прогон {run + 1} из {args.runs}", file=sys.stderr)
+            reports.append(run_suite(tables, fields, rows, args.seed, args.repeat))
+        store.record(label, reports)
+    print(store.path(label))
+    return 0
+
+
+def command_compare(args, store: ResultStore) -> int:
+    labels = store.labels()
+    current_label = args.current or next((label for label in reversed(labels) if label != args.baseline), None)
+    baseline, current = store.load(args.baseline), store.load(current_label) if current_label else None
+    if baseline is None or current is None:
+        raise SystemExit(f"Нет результатов: {args.baseline if baseline is None else current_label}")
+
+    rows = compare(baseline, current, args.threshold)
+    print(text_report(baseline, current, rows, args.threshold))
+    if args.html:
+        with open(args.html, 'w', encoding='utf-8') as f:
+            f.write(html_report(baseline, current, rows, args.threshold))
+    return 1 if any(row['status'] == 'regression' for row in rows) else 0
+
+
+def command_list(args, store: ResultStore) -> int:
+    for label in store.labels():
+        data = store.load(label)
+        sizes = ', '.join(f"{key} ×{size['runs']}" for key, size in sorted(data['sizes'].items()))
+        print(f"{label:<20}{data.get('updated', ''):<22}{sizes}")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Хранилище результатов бенчмарков и сравнение версий")
+    parser.add_argument('--store', default=DEFAULT_STORE, help="папка с результатами")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help="прогнать набор и сохранить результаты")
+    run.add_argument('--label', help="метка версии (по умолчанию - git-ревизия)")
+    run.add_argument('--size', action='append', help="размер t<таблиц>_f<полей>_r<записей>; можно несколько раз")
+    run.add_argument('--runs', type=int, default=5, help="число прогонов набора")
+    run.add_argument('--repeat', type=int, default=3, help="повторов замера внутри прогона")
+    run.add_argument('--seed', type=int, default=1)
+
+    compare_ = subparsers.add_parser('compare', help="сравнить с базовой версией")
+    compare_.add_argument('--baseline', required=True, help="метка базовой версии")
+    compare_.add_argument('--current', help="метка новой версии (по умолчанию - последняя сохранённая)")
+    compare_.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="доля роста медианы")
+    compare_.add_argument('--html', help="файл HTML-отчёта")
+
+    subparsers.add_parser('list', help="сохранённые метки и размеры")
+
+    args = parser.parse_args(argv)
+    store = ResultStore(args.store)
+    commands = {'run': command_run, 'compare': command_compare, 'list': command_list}
+    return commands[args.command](args, store)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Генератор синтетических проектов для бенчмарков
+
+Проект из N таблиц по M полей; типы полей идут по кругу через все
+FieldType.TYPES, так что при M >= 24 в каждой таблице есть поле каждого
+типа. Таблицы заполняются K записями правдоподобных значений (в виде для
+пользователя - через кодеки, как при вводе). Генерация детерминирована
+(seed), поэтому прогоны разных версий работают с одинаковыми данными.
+
+Запуск из корня репозитория:
+    python benchmarks/generator.py --tables 5 --fields 24 --rows 10000 --output /tmp/bench
+"""
+
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from platform.core.field_types import FieldType
+from platform.core.schema import FieldDef, TableDef
+from platform.project_manager import ProjectManager
+
+TYPE_IDS = [item[3] for item in FieldType.TYPES]
+LIST_OPTIONS = ['Новый', 'В работе', 'На проверке', 'Готов', 'Отменён']
+WORDS = ('альфа', 'бета', 'гамма', 'дельта', 'омега', 'север', 'юг', 'поток', 'склад', 'заказ',
+         'клиент', 'отчёт', 'договор', 'товар', 'услуга', 'счёт', 'проект', 'этап')
+BATCH_SIZE = 5000
+
+# Свойства полей по типу - как у новых полей в конструкторе
+FIELD_PROPERTIES = {
+    'float': {'decimals': 2},
+    'money': {'currency': '₽ (Рубль)', 'decimals': 2},
+    'percent': {'decimals': 1, 'show_percent_sign': True},
+    'date': {'date_format': 'ДД.ММ.ГГГГ'},
+    'time': {'time_format': 'ЧЧ:ММ'},
+    'datetime': {'date_format': 'ДД.ММ.ГГГГ', 'time_format': 'ЧЧ:ММ'},
+    'list': {'options': LIST_OPTIONS},
+    'formula': {'result_type': 'Число'},
+}
+
+
+def make_tables(tables: int, fields: int):
+    """Определения таблиц без данных: поля всех типов по кругу"""
+    result = []
+    for t in range(tables):
+        table = TableDef(id=f"table_{t}", name_ru=f"Таблица {t}", name_en=f"table_{t}")
+        for f in range(fields):
+            type_id = TYPE_IDS[f % len(TYPE_IDS)]
+            properties = {'description': f"Описание поля {f}", 'width': 150, 'visible': True}
+            properties.update({
+                key: list(value) if isinstance(value, list) else value
+                for key, value in FIELD_PROPERTIES.get(type_id, {}).items()
+            })
+            table.fields.append(FieldDef(
+                id=f"field_{f}",
+                name_ru=f"Поле {f}",
+                name_en=f"field_{f}",
+                type_id=type_id,
+                extra=properties,
+            ))
+        _set_formulas(table)
+        result.append(table)
+    return result
+
+
+def _set_formulas(table: TableDef):
+    """Формулы ссылаются на первые поля подходящих типов в той же таблице"""
+    by_type = {}
+    for field in table.fields:
+        by_type.setdefault(field.type_id, field.name_ru)
+    parts = []
+    if 'money' in by_type and 'integer' in by_type:
+        parts.append(f"[{by_type['money']}] * [{by_type['integer']}]")
+    if 'boolean' in by_type:
+        parts.append(f"ЕСЛИ([{by_type['boolean']}]; 1; 0)")
+    formula = ' + '.join(parts) or '1'
+    for field in table.fields:
+        if field.type_id == 'formula':
+            field['formula'] = formula
+
+
+def _png(red: int, green: int, blue: int, size: int = 8) -> bytes:
+    """Маленький однотонный PNG (без Qt и Pillow)"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    row = b'\x00' + bytes((red, green, blue)) * size
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(row * size))
+            + chunk(b'IEND', b''))
+
+
+class ValueGenerator:
+    """Случайные значения полей в виде для пользователя"""
+
+    def __init__(self, seed: int, blob_store=None):
+        self.random = random.Random(seed)
+        self.images = []
+        self.files = []
+        if blob_store is not None:
+            rnd = random.Random(seed)
+            self.images = [blob_store.put_bytes(_png(*(rnd.randrange(256) for _ in range(3)))) for _ in range(16)]
+            self.files = [blob_store.put_bytes(f"Файл {i}\n".encode('utf-8') * (i + 1)) for i in range(16)]
+
+    def words(self, low: int, high: int) -> str:
+        return ' '.join(self.random.choice(WORDS) for _ in range(self.random.randint(low, high)))
+
+    def value(self, type_id: str, rows: int):
+        r = self.random
+        if r.random() < 0.05 and type_id not in ('boolean', 'formula'):
+            return None
+        if type_id == 'text':
+            return self.words(1, 4).capitalize()
+        if type_id == 'text_multiline':
+            return '\n'.join(self.words(5, 12).capitalize() + '.' for _ in range(r.randint(1, 3)))
+        if type_id == 'integer':
+            return r.randint(0, 1000)
+        if type_id == 'float':
+            return round(r.uniform(0, 10000), 3)
+        if type_id == 'date':
+            return f"{r.randint(1, 28):02}.{r.randint(1, 12):02}.{r.randint(2015, 2025)}"
+        if type_id == 'time':
+            return f"{r.randint(0, 23):02}:{r.randint(0, 59):02}"
+        if type_id == 'datetime':
+            return f"{r.randint(1, 28):02}.{r.randint(1, 12):02}.{r.randint(2015, 2025)} {r.randint(0, 23):02}:{r.randint(0, 59):02}"
+        if type_id == 'boolean':
+            return r.random() < 0.3
+        if type_id == 'list':
+            return r.choice(LIST_OPTIONS)
+        if type_id == 'reference':
+            return str(r.randint(1, max(rows, 1)))
+        if type_id == 'reference_multiple':
+            return ','.join(str(r.randint(1, max(rows, 1))) for _ in range(r.randint(1, 4)))
+        if type_id == 'phone':
+            return f"+7 (9{r.randint(0, 99):02}) {r.randint(0, 999):03}-{r.randint(0, 99):02}-{r.randint(0, 99):02}"
+        if type_id == 'email':
+            return f"user{r.randint(1, 100000)}@example.com"
+        if type_id == 'snils':
+            return f"{r.randint(100, 999)}-{r.randint(100, 999)}-{r.randint(100, 999)} {r.randint(10, 99)}"
+        if type_id == 'inn':
+            return ''.join(str(r.randint(0, 9)) for _ in range(12))
+        if type_id == 'money':
+            return f"{r.randint(0, 500000)},{r.randint(0, 99):02}"
+        if type_id == 'percent':
+            return f"{r.uniform(0, 100):.1f}".replace('.', ',')
+        if type_id == 'file':
+            return r.choice(self.files) if self.files else None
+        if type_id == 'image':
+            return r.choice(self.images) if self.images else None
+        if type_id == 'color':
+            return f"#{r.randrange(0x1000000):06x}"
+        if type_id == 'rating':
+            return r.randint(1, 5)
+        if type_id == 'password':
+            return ''.join(r.choice('abcdefghijk0123456789') for _ in range(10))
+        if type_id == 'url':
+            return f"https://example.com/{self.random.choice(WORDS)}/{r.randint(1, 9999)}"
+        return None
+
+
+def generate_project(folder: str, tables: int, fields: int, rows: int, seed: int = 1,
+                     name: str = "Бенчмарк") -> ProjectManager:
+    """Создаёт и сохраняет проект в folder; возвращает открытый ProjectManager"""
+    os.makedirs(folder, exist_ok=True)
+    manager = ProjectManager(folder, use_snapshot_cache=False)
+    manager.create_project(name, "Синтетический проект для бенчмарков")
+    values = ValueGenerator(seed, manager.blob_store)
+
+    for table in make_tables(tables, fields):
+        created = manager.create_table(table.name_ru)
+        created.fields = table.fields
+        job = manager.update_table(created)
+        if job is not None:
+            job.join()
+        type_ids = [(field.id, field.type_id) for field in created.fields if field.type_id != 'formula']
+        for start in range(0, rows, BATCH_SIZE):
+            batch = [
+                {field_id: values.value(type_id, rows) for field_id, type_id in type_ids}
+                for _ in range(min(BATCH_SIZE, rows - start))
+            ]
+            manager.add_records(created.id, batch)
+        manager.recalculate(created.id)
+
+    manager.save_project()
+    return manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Синтетический проект для бенчмарков")
+    parser.add_argument('--tables', type=int, default=5)
+    parser.add_argument('--fields', type=int, default=len(TYPE_IDS))
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='benchmark_projects')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    manager = generate_project(args.output, args.tables, args.fields, args.rows, args.seed)
+    print(f"{manager.current_file}: {args.tables} × {args.fields} полей × {args.rows} записей "
+          f"за {time.perf_counter() - started:.1f} с")
+    manager.close_database()
+
+
+if __name__ == '__main__':
+    main()
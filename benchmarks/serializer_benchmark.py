@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Сравнение сериализаторов файла проекта на синтетических проектах
+
+Запуск из корня репозитория:
+    python benchmarks/serializer_benchmark.py --tables 50 --fields 40
+
+Для каждой доступной библиотеки и режима (pretty/compact) выводит
+лучшее время записи и чтения и размер файла.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generator import make_tables
+from platform.core.serializer import available_backends, get_serializer
+from platform.project_manager import Project
+
+
+def make_project(tables: int, fields: int) -> dict:
+    """Проект из tables таблиц по fields полей всех типов по кругу"""
+    project = Project(name="Бенчмарк", description="Синтетический проект")
+    project.tables.extend(make_tables(tables, fields))
+    return project.to_dict()
+
+
+def best_time(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение сериализаторов проекта")
+    parser.add_argument('--tables', type=int, default=50)
+    parser.add_argument('--fields', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    data = make_project(args.tables, args.fields)
+    print(f"Проект: {args.tables} таблиц × {args.fields} полей")
+    print(f"{'backend':<10}{'mode':<10}{'write, ms':>12}{'read, ms':>12}{'size, KB':>12}")
+
+    for name in available_backends():
+        serializer = get_serializer(name)
+        for pretty in (True, False):
+            content = serializer.dumps(data, pretty)
+            write = best_time(lambda: serializer.dumps(data, pretty), args.repeat)
+            read = best_time(lambda: serializer.loads(content), args.repeat)
+            mode = 'pretty' if pretty else 'compact'
+            print(f"{name:<10}{mode:<10}{write * 1000:>12.2f}{read * 1000:>12.2f}{len(content) / 1024:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Набор бенчмарков платформы на синтетическом проекте
+
+Запуск из корня репозитория:
+    python benchmarks/suite.py --tables 5 --fields 24 --rows 10000 --output results.json
+
+Проект создаётся генератором (generator.py) во временной папке, затем
+измеряются: сохранение и загрузка проекта (без кэша снимков и с ним),
+list_projects, выборки из базы (страницы, фасеты, поиск), формулы,
+экспорт и импорт, просмотрщик таблицы (открытие, прокрутка, отбор).
+Просмотрщик меряется в Qt без окна (QT_QPA_PLATFORM=offscreen); если
+PyQt6 не установлен, эти замеры попадают в skipped.
+
+Для каждого замера - лучшее время из --repeat повторов, в секундах.
+Результат - JSON с параметрами, окружением и временами; ключ размера
+(например, t5_f24_r10000) позволяет сравнивать прогоны разных версий.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generator import LIST_OPTIONS, TYPE_IDS, generate_project
+from platform.core.formula_engine import FormulaEngine
+from platform.core.snapshot_cache import SnapshotCache
+from platform.core.table_io import export_table, import_table
+from platform.project_manager import ProjectManager
+
+SUITE_VERSION = 1
+
+# Сколько копий файла проекта лежит в папке для list_projects
+LIST_PROJECTS_COPIES = 20
+
+
+def size_key(tables: int, fields: int, rows: int) -> str:
+    return f"t{tables}_f{fields}_r{rows}"
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=10,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment() -> Dict:
+    return {
+        'python': sys.version.split()[0],
+        'os': sys.platform,
+        'cpu_count': os.cpu_count(),
+        'sqlite': sqlite3.sqlite_version,
+        'revision': git_revision(),
+    }
+
+
+class Suite:
+    """Замеры над одним сгенерированным проектом"""
+
+    def __init__(self, folder: str, tables: int, fields: int, rows: int, seed: int = 1, repeat: int = 3):
+        self.folder = folder
+        self.tables = tables
+        self.fields = fields
+        self.rows = rows
+        self.seed = seed
+        self.repeat = repeat
+        self.results: Dict[str, float] = {}
+        self.skipped: Dict[str, str] = {}
+        self.manager: Optional[ProjectManager] = None
+
+    def measure(self, name: str, func: Callable, repeat: Optional[int] = None):
+        best = float('inf')
+        for _ in range(repeat or self.repeat):
+            started = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - started)
+        self.results[name] = best
+
+    def open_manager(self, use_cache: bool) -> ProjectManager:
+        manager = ProjectManager(self.folder, use_snapshot_cache=False)
+        if use_cache:
+            manager.snapshot_cache = SnapshotCache(os.path.join(self.folder, 'snapshots'))
+        return manager
+
+    def run(self) -> Dict:
+        started = time.perf_counter()
+        self.manager = generate_project(os.path.join(self.folder, 'project'), self.tables, self.fields,
+                                        self.rows, self.seed)
+        self.results['generate'] = time.perf_counter() - started
+        try:
+            self.bench_project()
+            self.bench_queries()
+            self.bench_formulas()
+            self.bench_table_io()
+            self.bench_viewer()
+        finally:
+            self.manager.close_database()
+        return {
+            'suite_version': SUITE_VERSION,
+            'key': size_key(self.tables, self.fields, self.rows),
+            'params': {'tables': self.tables, 'fields': self.fields, 'rows': self.rows, 'seed': self.seed},
+            'environment': environment(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'results': {name: round(seconds, 6) for name, seconds in self.results.items()},
+            'skipped': self.skipped,
+        }
+
+    # ========== ПРОЕКТ ==========
+
+    def bench_project(self):
+        project_file = self.manager.current_file
+        self.measure('save_project', self.manager.save_project)
+
+        def load(use_cache):
+            manager = self.open_manager(use_cache)
+            if manager.load_project(project_file) is None:
+                raise RuntimeError(f"Не загружен {project_file}")
+
+        self.measure('load_project', lambda: load(False))
+        load(True)  # снимок в кэше
+        self.measure('load_project_cached', lambda: load(True))
+
+        listing = os.path.join(self.folder, 'listing')
+        os.makedirs(listing, exist_ok=True)
+        for i in range(LIST_PROJECTS_COPIES):
+            shutil.copyfile(project_file, os.path.join(listing, f"project_{i}.ncp"))
+        lister = ProjectManager(listing, use_snapshot_cache=False)
+        self.measure('list_projects', lister.list_projects)
+
+    # ========== ЗАПРОСЫ ==========
+
+    def first_field(self, table, type_id: str):
+        return next((field for field in table.fields if field.type_id == type_id), None)
+
+    def bench_queries(self):
+        manager = self.manager
+        table = manager.get_all_tables()[0]
+        last_page = max(0, (self.rows - 1) // 100)
+
+        self.measure('count', lambda: manager.count(table.id))
+        self.measure('page_first', lambda: manager.get_page(table.id, 0, 100))
+        self.measure('page_last', lambda: manager.get_page(table.id, last_page, 100))
+        self.measure('search', lambda: manager.count(table.id, search='договор'))
+
+        options = self.first_field(table, 'list')
+        flag = self.first_field(table, 'boolean')
+        if options is not None and flag is not None:
+            facet = {options.id: LIST_OPTIONS[:2], flag.id: [True]}
+            self.measure('filter_facet', lambda: manager.get_page(table.id, 0, 100, filter=facet))
+            self.measure('facet_counts', lambda: manager.facet_counts(table.id, options.id, filter={flag.id: [True]}))
+        else:
+            self.skipped['filter_facet'] = self.skipped['facet_counts'] = "нет полей «Список» и «Да/Нет»"
+
+    # ========== ФОРМУЛЫ ==========
+
+    def bench_formulas(self):
+        manager = self.manager
+        table = manager.get_all_tables()[0]
+        formulas = [field.get('formula') for field in table.fields if field.type_id == 'formula']
+        if not formulas:
+            self.skipped['formula_compile'] = self.skipped['formula_evaluate'] = \
+                self.skipped['recalculate'] = "нет вычисляемых полей"
+            return
+
+        def compile_all():
+            engine = FormulaEngine(table)
+            return [engine.compile(text) for text in formulas]
+
+        self.measure('formula_compile', compile_all)
+        compiled = compile_all()
+        records = list(manager.iter_records(table.id, 5000))
+        self.measure('formula_evaluate', lambda: [formula.evaluate_all(records) for formula in compiled])
+        self.measure('recalculate', lambda: manager.recalculate(table.id), repeat=1)
+
+    # ========== ИМПОРТ И ЭКСПОРТ ==========
+
+    def bench_table_io(self):
+        manager = self.manager
+        table = manager.get_all_tables()[0]
+        folder = os.path.join(self.folder, 'export')
+        os.makedirs(folder, exist_ok=True)
+        csv_path = os.path.join(folder, 'table.csv')
+        json_path = os.path.join(folder, 'table.json')
+
+        self.measure('export_csv', lambda: export_table(manager, table.id, csv_path))
+        self.measure('export_json', lambda: export_table(manager, table.id, json_path))
+
+        # Импорт - в пустую копию таблицы, один раз на формат
+        for fmt, path in (('csv', csv_path), ('json', json_path)):
+            target = manager.create_table(f"Импорт {fmt}")
+            target.fields = [type(field).from_dict(field.to_dict()) for field in table.fields]
+            manager.update_table(target)
+            self.measure(f'import_{fmt}', lambda: import_table(manager, target.id, path), repeat=1)
+
+    # ========== ПРОСМОТРЩИК ==========
+
+    def bench_viewer(self):
+        names = ('viewer_open', 'viewer_scroll', 'viewer_search', 'viewer_facet')
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        try:
+            from PyQt6.QtWidgets import QApplication
+            from platform.widgets.table_viewer import TableViewer
+        except ImportError as e:
+            for name in names:
+                self.skipped[name] = f"нет PyQt6: {e}"
+            return
+
+        app = QApplication.instance() or QApplication([])
+        manager = self.manager
+        table = manager.get_all_tables()[0]
+        viewer = TableViewer()
+        viewer.resize(1280, 800)
+        viewer.show()
+
+        def open_table():
+            viewer.width_estimator.invalidate()
+            viewer.set_source(table, manager)
+            app.processEvents()
+
+        def scroll():
+            bar = viewer.table.verticalScrollBar()
+            step = max(1, bar.maximum() // 50)
+            for value in range(0, bar.maximum() + 1, step):
+                bar.setValue(value)
+                viewer.table.viewport().repaint()
+                app.processEvents()
+            bar.setValue(0)
+
+        def search():
+            viewer.filter_table('договор')
+            app.processEvents()
+            viewer.filter_table('')
+
+        options = self.first_field(table, 'list')
+        code = next(iter(manager.facet_counts(table.id, options.id)), None) if options is not None else None
+
+        def facet():
+            viewer.on_facet_toggled(options.id, code, True)
+            app.processEvents()
+            viewer.reset_facets()
+
+        self.measure('viewer_open', open_table)
+        self.measure('viewer_scroll', scroll)
+        self.measure('viewer_search', search)
+        if code is not None:
+            self.measure('viewer_facet', facet)
+        else:
+            self.skipped['viewer_facet'] = "нет поля «Список»"
+        viewer.close()
+
+
+def run_suite(tables: int, fields: int, rows: int, seed: int = 1, repeat: int = 3,
+              workdir: Optional[str] = None) -> Dict:
+    """Один прогон набора; workdir=None - временная папка, удаляется после прогона"""
+    folder = workdir or tempfile.mkdtemp(prefix='lowcode_bench_')
+    try:
+        return Suite(folder, tables, fields, rows, seed, repeat).run()
+    finally:
+        if workdir is None:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+def print_results(report: Dict):
+    print(f"{report['key']} ({report['environment']['revision'] or 'без git'})")
+    for name, seconds in report['results'].items():
+        print(f"  {name:<22}{seconds * 1000:>12.2f} ms")
+    for name, reason in report['skipped'].items():
+        print(f"  {name:<22}{'-':>12}    {reason}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки платформы на синтетическом проекте")
+    parser.add_argument('--tables', type=int, default=5)
+    parser.add_argument('--fields', type=int, default=len(TYPE_IDS))
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workdir', help="папка для проекта (по умолчанию - временная)")
+    parser.add_argument('--output', '-o', help="файл JSON с результатами")
+    args = parser.parse_args()
+
+    report = run_suite(args.tables, args.fields, args.rows, args.seed, args.repeat, args.workdir)
+    print_results(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
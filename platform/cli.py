@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+
+"""
+Пакетные задачи над проектом без графического интерфейса
+
+    python -m platform.cli recalc projects/shop.ncp --jobs 4
+    python -m platform.cli validate projects/shop.ncp --table Товары
+    python -m platform.cli export projects/shop.ncp --output out/ --format csv
+    python -m platform.cli import projects/shop.ncp --table Товары data.csv
+    python -m platform.cli stats projects/shop.ncp
+
+PyQt6 не импортируется: проект загружается через ProjectManager, данные
+читаются из базы проекта. Таблицы (для импорта - файлы) обрабатываются
+параллельно в отдельных процессах (--jobs), у каждого своё подключение
+к базе. Результат печатается в stdout одним JSON-объектом со временем
+каждого шага (--text - для чтения человеком). Код возврата 1 - если
+проверка нашла ошибки или задача завершилась исключением.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from platform.core.column_stats import collect_table_stats
+from platform.core.schema import TableDef
+from platform.core.table_io import export_table, import_table
+from platform.core.validation import validate_table
+from platform.core.value_codecs import formatter
+from platform.project_manager import ProjectManager
+
+
+def open_project(project_file: str, use_cache: bool = True) -> ProjectManager:
+    manager = ProjectManager(os.path.dirname(os.path.abspath(project_file)), use_snapshot_cache=use_cache)
+    if manager.load_project(project_file) is None:
+        raise SystemExit(f"Не удалось загрузить проект: {project_file}")
+    return manager
+
+
+def find_tables(manager: ProjectManager, names: Optional[List[str]]) -> List[TableDef]:
+    """Таблицы по id, русскому или английскому имени; без имён - все"""
+    tables = manager.get_all_tables()
+    if not names:
+        return list(tables)
+    result = []
+    for name in names:
+        lowered = name.lower()
+        for table in tables:
+            if lowered in (table.id.lower(), table.name_ru.lower(), table.name_en.lower()):
+                result.append(table)
+                break
+        else:
+            raise SystemExit(f"Нет таблицы: {name}")
+    return result
+
+
+# ========== ЗАДАЧИ (выполняются в процессах пула) ==========
+
+def _recalc(manager: ProjectManager, table: TableDef, options: Dict) -> Dict:
+    return {'written': manager.recalculate(table.id)}
+
+
+def _validate(manager: ProjectManager, table: TableDef, options: Dict) -> Dict:
+    issues = validate_table(manager.database, table)
+    return {'issues': [issue.to_dict() for issue in issues], 'failed': bool(issues)}
+
+
+def _export(manager: ProjectManager, table: TableDef, options: Dict) -> Dict:
+    fmt = options['format']
+    path = os.path.join(options['output'], f"{table.name_en or table.id}.{fmt}")
+    count = export_table(manager, table.id, path, fmt, raw=options['raw'])
+    return {'path': path, 'records': count}
+
+
+def _import(manager: ProjectManager, table: TableDef, options: Dict) -> Dict:
+    result = import_table(manager, table.id, options['file'], options['format'])
+    result['file'] = options['file']
+    result['failed'] = bool(result['errors'])
+    result['errors'] = result['errors'][:100]
+    return result
+
+
+def _stats(manager: ProjectManager, table: TableDef, options: Dict) -> Dict:
+    stats = collect_table_stats(manager.database, table.id, table, sample_size=options['sample'])
+    columns = {}
+    for field_def in table.fields:
+        column = stats.columns.get(field_def.id)
+        if column is None:
+            continue
+        format_value = formatter(field_def)
+        columns[field_def.name_ru or field_def.id] = {
+            'nulls': column.nulls,
+            'distinct': column.distinct,
+            'min': None if column.minimum is None else format_value(column.minimum),
+            'max': None if column.maximum is None else format_value(column.maximum),
+            'top': [[format_value(value), count] for value, count in column.top_values[:5]],
+        }
+    return {'rows': stats.rows, 'sample_rows': stats.sample_rows, 'columns': columns}
+
+
+TASKS: Dict[str, Callable[[ProjectManager, TableDef, Dict], Dict]] = {
+    'recalc': _recalc,
+    'validate': _validate,
+    'export': _export,
+    'import': _import,
+    'stats': _stats,
+}
+
+
+def run_task(command: str, project_file: str, table_id: str, options: Dict) -> Dict[str, Any]:
+    """Одна задача над одной таблицей; возвращает результат со временем выполнения"""
+    started = time.perf_counter()
+    report: Dict[str, Any] = {'table_id': table_id}
+    manager = None
+    try:
+        manager = open_project(project_file, options.get('cache', True))
+        table = manager.get_table(table_id)
+        report['table'] = table.name_ru
+        report['load_seconds'] = round(time.perf_counter() - started, 4)
+        report.update(TASKS[command](manager, table, options))
+        report['ok'] = not report.pop('failed', False)
+    except Exception as e:
+        report['ok'] = False
+        report['error'] = f"{type(e).__name__}: {e}"
+        report['traceback'] = traceback.format_exc()
+    finally:
+        if manager is not None:
+            manager.close_database()
+    report['seconds'] = round(time.perf_counter() - started, 4)
+    return report
+
+
+def run_tasks(command: str, project_file: str, jobs: List[tuple], workers: int) -> List[Dict]:
+    """jobs - [(table_id, options)]; при workers > 1 - в пуле процессов"""
+    if workers <= 1 or len(jobs) <= 1:
+        return [run_task(command, project_file, table_id, options) for table_id, options in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = [pool.submit(run_task, command, project_file, table_id, options) for table_id, options in jobs]
+        return [future.result() for future in futures]
+
+
+# ========== КОМАНДНАЯ СТРОКА ==========
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m platform.cli', description="Пакетные задачи над проектом .ncp")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name: str, help: str) -> argparse.ArgumentParser:
+        command = subparsers.add_parser(name, help=help)
+        command.add_argument('project', help="файл проекта .ncp")
+        command.add_argument('--table', '-t', action='append', help="таблица (id или имя); можно несколько раз")
+        command.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1, help="число процессов")
+        command.add_argument('--no-cache', action='store_true', help="не использовать кэш снимков проекта")
+        command.add_argument('--text', action='store_true', help="вывод для человека вместо JSON")
+        return command
+
+    add_command('recalc', "пересчитать вычисляемые поля")
+    add_command('validate', "проверить данные на соответствие схеме")
+
+    export = add_command('export', "выгрузить таблицы в файлы")
+    export.add_argument('--output', '-o', default='.', help="папка для файлов")
+    export.add_argument('--format', '-f', choices=('csv', 'json'), default='csv')
+    export.add_argument('--raw', action='store_true', help="хранимые значения без форматирования")
+
+    import_ = add_command('import', "загрузить записи из файлов в таблицу")
+    import_.add_argument('files', nargs='+', help="файлы CSV или JSON")
+    import_.add_argument('--format', '-f', choices=('csv', 'json'), help="формат (по умолчанию - по расширению)")
+
+    stats = add_command('stats', "статистика колонок")
+    stats.add_argument('--sample', type=int, default=20000, help="размер выборки записей")
+    return parser
+
+
+def plan_jobs(args, manager: ProjectManager) -> List[tuple]:
+    tables = find_tables(manager, args.table)
+    options = {'cache': not args.no_cache}
+    if args.command == 'export':
+        os.makedirs(args.output, exist_ok=True)
+        options.update(output=args.output, format=args.format, raw=args.raw)
+    elif args.command == 'stats':
+        options['sample'] = args.sample
+    elif args.command == 'import':
+        if len(tables) != 1:
+            raise SystemExit("Для импорта нужна одна таблица: --table")
+        return [(tables[0].id, dict(options, file=path, format=args.format)) for path in args.files]
+    return [(table.id, options) for table in tables]
+
+
+def print_text(summary: Dict):
+    print(f"{summary['command']}: {summary['project']} - {summary['seconds']} с")
+    for task in summary['tasks']:
+        status = "ok" if task['ok'] else "ОШИБКА"
+        print(f"  [{status}] {task.get('table', task['table_id'])} - {task['seconds']} с")
+        if 'error' in task:
+            print(f"      {task['error']}")
+        for issue in task.get('issues', []):
+            print(f"      {issue['message']} ({issue['count']})")
+        for line, message in task.get('errors', []):
+            print(f"      строка {line}: {message}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    started = time.perf_counter()
+    manager = open_project(args.project, not args.no_cache)
+    load_seconds = time.perf_counter() - started
+    jobs = plan_jobs(args, manager)
+    # Родитель не держит подключение к базе, пока работают процессы пула
+    manager.close_database()
+
+    tasks = run_tasks(args.command, args.project, jobs, args.jobs)
+    summary = {
+        'command': args.command,
+        'project': os.path.abspath(args.project),
+        'jobs': min(args.jobs, len(jobs)) if jobs else 0,
+        'load_seconds': round(load_seconds, 4),
+        'seconds': round(time.perf_counter() - started, 4),
+        'ok': all(task['ok'] for task in tasks),
+        'tasks': tasks,
+    }
+    if args.text:
+        print_text(summary)
+    else:
+        json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write('\n')
+    return 0 if summary['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
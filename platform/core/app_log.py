@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""
+Журнал приложения поверх стандартного logging
+
+Модули пишут через logging.getLogger(__name__) с отложенным
+форматированием (logger.debug("Файл %s", name)): строка собирается,
+только если сообщение проходит по уровню. По умолчанию пишутся WARNING
+и выше; уровни задаются по модулям:
+
+    LOWCODE_LOG="platform.project_manager=DEBUG,platform.core.database=INFO"
+
+Все прошедшие сообщения попадают в кольцевой буфер (последние
+RING_CAPACITY), который показывает диалог журнала из меню «Справка».
+В консоль (stderr) журнал выводится только с LOWCODE_LOG_CONSOLE=1.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+RING_CAPACITY = 5000
+DEFAULT_LEVEL = logging.WARNING
+
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+
+@dataclass
+class LogEntry:
+    created: float
+    level: int
+    logger: str
+    message: str
+    exc_text: Optional[str] = None
+
+    @property
+    def level_name(self) -> str:
+        return logging.getLevelName(self.level)
+
+    def format(self) -> str:
+        stamp = time.strftime('%H:%M:%S', time.localtime(self.created))
+        text = f"{stamp}.{int(self.created * 1000) % 1000:03} {self.level_name:<8} {self.logger}: {self.message}"
+        return f"{text}\n{self.exc_text}" if self.exc_text else text
+
+
+class RingBufferHandler(logging.Handler):
+    """Хранит последние записи журнала в памяти"""
+
+    def __init__(self, capacity: int = RING_CAPACITY):
+        super().__init__()
+        self.entries: deque = deque(maxlen=capacity)
+        self.total = 0  # сколько записей пришло за всё время (для обновления диалога)
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            exc_text = None
+            if record.exc_info:
+                exc_text = logging.Formatter().formatException(record.exc_info)
+            self.entries.append(LogEntry(record.created, record.levelno, record.name, record.getMessage(), exc_text))
+            self.total += 1
+        except Exception:
+            self.handleError(record)
+
+    def records(self, min_level: int = logging.NOTSET, text: str = "") -> List[LogEntry]:
+        needle = text.lower()
+        return [
+            entry for entry in list(self.entries)
+            if entry.level >= min_level and (not needle or needle in entry.message.lower() or needle in entry.logger.lower())
+        ]
+
+    def clear(self):
+        self.entries.clear()
+
+
+_lock = threading.Lock()
+_ring: Optional[RingBufferHandler] = None
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """'модуль=УРОВЕНЬ,...' -> {модуль: уровень}; модуль без '=' - уровень корня ('DEBUG')"""
+    levels = {}
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, level = part.rpartition('=')
+        level = level.strip().upper()
+        if level not in LEVELS:
+            raise ValueError(f"Неизвестный уровень журнала: {level}")
+        levels[name.strip()] = getattr(logging, level)
+    return levels
+
+
+def set_levels(levels: Dict[str, int]):
+    """Уровни по модулям; пустое имя - корневой журнал"""
+    for name, level in levels.items():
+        logging.getLogger(name or None).setLevel(level)
+
+
+def configure(levels: Optional[Dict[str, int]] = None, console: Optional[bool] = None,
+              capacity: int = RING_CAPACITY) -> RingBufferHandler:
+    """Подключает кольцевой буфер (один раз) и задаёт уровни из аргумента или LOWCODE_LOG"""
+    global _ring
+    root = logging.getLogger()
+    with _lock:
+        if _ring is None:
+            _ring = RingBufferHandler(capacity)
+            root.addHandler(_ring)
+            root.setLevel(DEFAULT_LEVEL)
+            if console if console is not None else os.environ.get('LOWCODE_LOG_CONSOLE', '') not in ('', '0'):
+                handler = logging.StreamHandler()
+                handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)-8s %(name)s: %(message)s'))
+                root.addHandler(handler)
+    set_levels(levels if levels is not None else parse_levels(os.environ.get('LOWCODE_LOG', '')))
+    return _ring
+
+
+def ring_buffer() -> RingBufferHandler:
+    return _ring or configure()
+
+
+def current_levels() -> Dict[str, str]:
+    """Явно заданные уровни модулей (для диалога журнала)"""
+    levels = {'': logging.getLevelName(logging.getLogger().level)}
+    for name, logger in sorted(logging.root.manager.loggerDict.items()):
+        if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET:
+            levels[name] = logging.getLevelName(logger.level)
+    return levels
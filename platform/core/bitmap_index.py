@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+
+"""
+Сжатые битовые индексы для колонок с малым числом различных значений
+
+Для каждого значения колонки (Да/Нет, вариант списка, оценка) хранится
+множество id записей в виде RoaringBitmap: id делятся на блоки по 65536,
+разреженный блок - отсортированный массив 16-битных смещений, плотный -
+битовая маска в одном int Python. Пересечение и объединение фильтров и
+подсчёт фасетов сводятся к операциям над этими блоками и не обращаются
+к базе.
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+# Поля, для которых строятся битовые индексы
+INDEXED_TYPES = ('boolean', 'list', 'rating')
+
+# Больше стольких элементов блок хранится битовой маской (как в Roaring)
+ARRAY_MAX = 4096
+_BLOCK_BYTES = 65536 // 8
+
+Container = Union[array, int]
+
+
+# ========== БЛОКИ ==========
+
+def _bits_from(values: Iterable[int]) -> int:
+    buffer = bytearray(_BLOCK_BYTES)
+    for value in values:
+        buffer[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def _array_from(bits: int) -> array:
+    result = array('H')
+    data = bits.to_bytes(_BLOCK_BYTES, 'little')
+    for offset, byte in enumerate(data):
+        if byte:
+            base = offset << 3
+            for bit in range(8):
+                if byte >> bit & 1:
+                    result.append(base + bit)
+    return result
+
+
+def _size(container: Container) -> int:
+    return container.bit_count() if isinstance(container, int) else len(container)
+
+
+def _normalize(container: Container) -> Optional[Container]:
+    """Приводит блок к выгодному представлению; пустой блок - None"""
+    if isinstance(container, int):
+        size = container.bit_count()
+        if size == 0:
+            return None
+        return _array_from(container) if size <= ARRAY_MAX else container
+    if not container:
+        return None
+    return _bits_from(container) if len(container) > ARRAY_MAX else container
+
+
+def _and(a: Container, b: Container) -> Optional[Container]:
+    if isinstance(a, int) and isinstance(b, int):
+        return _normalize(a & b)
+    if isinstance(a, int):
+        a, b = b, a
+    if isinstance(b, int):
+        return _normalize(_bits_from(a) & b)
+    return _normalize(array('H', sorted(set(a).intersection(b))))
+
+
+def _and_count(a: Container, b: Container) -> int:
+    if isinstance(a, int) and isinstance(b, int):
+        return (a & b).bit_count()
+    if isinstance(a, int):
+        a, b = b, a
+    if isinstance(b, int):
+        return (_bits_from(a) & b).bit_count()
+    return len(set(a).intersection(b))
+
+
+def _or(a: Container, b: Container) -> Container:
+    if isinstance(a, int) or isinstance(b, int):
+        if not isinstance(a, int):
+            a = _bits_from(a)
+        if not isinstance(b, int):
+            b = _bits_from(b)
+        return _normalize(a | b)
+    return _normalize(array('H', sorted(set(a).union(b))))
+
+
+def _copy(container: Container) -> Container:
+    return container if isinstance(container, int) else array('H', container)
+
+
+def _iter(container: Container) -> Iterable[int]:
+    return _array_from(container) if isinstance(container, int) else container
+
+
+# ========== МНОЖЕСТВО ID ==========
+
+class RoaringBitmap:
+    """Множество неотрицательных целых (id записей)"""
+
+    __slots__ = ('blocks',)
+
+    def __init__(self, values: Iterable[int] = ()):
+        self.blocks: Dict[int, Container] = {}
+        self.update(values)
+
+    def update(self, values: Iterable[int]):
+        """Добавляет значения пакетом (быстрее, чем add по одному)"""
+        grouped: Dict[int, List[int]] = {}
+        for value in values:
+            grouped.setdefault(value >> 16, []).append(value & 0xFFFF)
+        for high, lows in grouped.items():
+            if len(lows) > ARRAY_MAX:
+                block = _bits_from(lows)
+            else:
+                block = array('H', sorted(set(lows)))
+            current = self.blocks.get(high)
+            self.blocks[high] = _normalize(block) if current is None else _or(current, block)
+
+    def add(self, value: int):
+        high, low = value >> 16, value & 0xFFFF
+        block = self.blocks.get(high)
+        if block is None:
+            self.blocks[high] = array('H', [low])
+        elif isinstance(block, int):
+            self.blocks[high] = block | (1 << low)
+        else:
+            position = bisect_left(block, low)
+            if position == len(block) or block[position] != low:
+                block.insert(position, low)
+                if len(block) > ARRAY_MAX:
+                    self.blocks[high] = _bits_from(block)
+
+    def discard(self, value: int):
+        high, low = value >> 16, value & 0xFFFF
+        block = self.blocks.get(high)
+        if block is None:
+            return
+        if isinstance(block, int):
+            block = _normalize(block & ~(1 << low))
+        else:
+            position = bisect_left(block, low)
+            if position < len(block) and block[position] == low:
+                del block[position]
+            block = block or None
+        if block is None:
+            del self.blocks[high]
+        else:
+            self.blocks[high] = block
+
+    def __contains__(self, value: int) -> bool:
+        block = self.blocks.get(value >> 16)
+        if block is None:
+            return False
+        low = value & 0xFFFF
+        if isinstance(block, int):
+            return bool(block >> low & 1)
+        position = bisect_left(block, low)
+        return position < len(block) and block[position] == low
+
+    def __len__(self) -> int:
+        return sum(_size(block) for block in self.blocks.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.blocks)
+
+    def __iter__(self) -> Iterator[int]:
+        for high in sorted(self.blocks):
+            base = high << 16
+            for low in _iter(self.blocks[high]):
+                yield base + low
+
+    def __and__(self, other: 'RoaringBitmap') -> 'RoaringBitmap':
+        result = RoaringBitmap()
+        for high, block in self.blocks.items():
+            other_block = other.blocks.get(high)
+            if other_block is not None:
+                block = _and(block, other_block)
+                if block is not None:
+                    result.blocks[high] = block
+        return result
+
+    def __or__(self, other: 'RoaringBitmap') -> 'RoaringBitmap':
+        return union((self, other))
+
+    def and_count(self, other: 'RoaringBitmap') -> int:
+        """Размер пересечения без построения результата"""
+        return sum(
+            _and_count(block, other.blocks[high])
+            for high, block in self.blocks.items() if high in other.blocks
+        )
+
+    def slice(self, start: int, count: int) -> List[int]:
+        """count значений по возрастанию, начиная с позиции start (для страниц)"""
+        result: List[int] = []
+        for high in sorted(self.blocks):
+            if len(result) >= count:
+                break
+            block = self.blocks[high]
+            size = _size(block)
+            if start >= size:
+                start -= size
+                continue
+            base = high << 16
+            values = _iter(block)
+            for low in values[start:start + count - len(result)]:
+                result.append(base + low)
+            start = 0
+        return result
+
+    def memory_size(self) -> int:
+        """Примерный объём блоков в байтах"""
+        return sum(
+            _BLOCK_BYTES if isinstance(block, int) else block.itemsize * len(block)
+            for block in self.blocks.values()
+        )
+
+
+def union(bitmaps: Iterable[RoaringBitmap]) -> RoaringBitmap:
+    result = RoaringBitmap()
+    for bitmap in bitmaps:
+        for high, block in bitmap.blocks.items():
+            current = result.blocks.get(high)
+            result.blocks[high] = _copy(block) if current is None else _or(current, block)
+    return result
+
+
+def intersection(bitmaps: Iterable[RoaringBitmap]) -> Optional[RoaringBitmap]:
+    """Пересечение; None - если множеств нет (нет ограничений)"""
+    result = None
+    for bitmap in sorted(bitmaps, key=len):
+        result = bitmap if result is None else result & bitmap
+        if not result:
+            break
+    return result
+
+
+# ========== ИНДЕКС КОЛОНКИ ==========
+
+def _in_range(value: Any, low: Any, high: Any) -> bool:
+    if value is None:
+        return False
+    try:
+        return (low is None or value >= low) and (high is None or value <= high)
+    except TypeError:
+        # Текст, попавший в числовую колонку, в диапазон не входит (как в SQL)
+        return False
+
+
+class ColumnIndex:
+    """Значение колонки -> id записей с этим значением (None - пустые)"""
+
+    __slots__ = ('values',)
+
+    def __init__(self):
+        self.values: Dict[Any, RoaringBitmap] = {}
+
+    def add(self, record_id: int, value: Any):
+        bitmap = self.values.get(value)
+        if bitmap is None:
+            bitmap = self.values[value] = RoaringBitmap()
+        bitmap.add(record_id)
+
+    def remove(self, record_id: int, value: Any):
+        bitmap = self.values.get(value)
+        if bitmap is not None:
+            bitmap.discard(record_id)
+            if not bitmap:
+                del self.values[value]
+
+    def bulk_load(self, pairs: Iterable[tuple]):
+        """Начальное построение из пар (id, значение)"""
+        grouped: Dict[Any, List[int]] = {}
+        for record_id, value in pairs:
+            grouped.setdefault(value, []).append(record_id)
+        for value, ids in grouped.items():
+            bitmap = self.values.get(value)
+            if bitmap is None:
+                self.values[value] = RoaringBitmap(ids)
+            else:
+                bitmap.update(ids)
+
+    def all(self) -> RoaringBitmap:
+        return union(self.values.values())
+
+    def matching(self, condition: Any) -> RoaringBitmap:
+        """
+        Записи, подходящие под условие фильтра в форме Database._where:
+        None - пусто, (от, до) - диапазон, список - любое из значений.
+        """
+        empty = RoaringBitmap()
+        if isinstance(condition, tuple):
+            low, high = condition
+            return union(
+                bitmap for value, bitmap in self.values.items()
+                if _in_range(value, low, high)
+            )
+        if isinstance(condition, (list, set, frozenset)):
+            return union(self.values.get(value, empty) for value in set(condition))
+        return self.values.get(condition, empty)
+
+    def counts(self, subset: Optional[RoaringBitmap] = None) -> Dict[Any, int]:
+        """Число записей по значениям (внутри subset, если задано)"""
+        if subset is None:
+            return {value: len(bitmap) for value, bitmap in self.values.items()}
+        counts = {}
+        for value, bitmap in self.values.items():
+            count = bitmap.and_count(subset)
+            if count:
+                counts[value] = count
+        return counts
+
+    def memory_size(self) -> int:
+        return sum(bitmap.memory_size() for bitmap in self.values.values())
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+"""
+Хранилище вложений полей «Файл» и «Изображение»
+
+Содержимое лежит в папке рядом с базой проекта под именем, равным
+SHA-256 содержимого (ab/cdef...), поэтому одинаковые файлы хранятся один
+раз. В записях таблиц хранится только хэш. Счётчики ссылок ведёт база
+данных при записи записей; gc() удаляет вложения без ссылок.
+Запись и чтение идут блоками по CHUNK_SIZE - большой файл не попадает
+в память целиком.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from typing import BinaryIO, Iterator, List, Optional
+
+from .database import Database
+
+
+class BlobStore:
+    """Вложения проекта, адресуемые по содержимому"""
+
+    CHUNK_SIZE = 1024 * 1024
+    # Вложение без ссылок моложе этого срока не удаляется: запись с ним может ещё сохраняться
+    GC_GRACE_SECONDS = 3600
+
+    def __init__(self, folder: str, database: Database):
+        self.folder = folder
+        self.database = database
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, blob_hash: str) -> str:
+        return os.path.join(self.folder, blob_hash[:2], blob_hash[2:])
+
+    def exists(self, blob_hash: str) -> bool:
+        return bool(blob_hash) and os.path.exists(self.path(blob_hash))
+
+    def size(self, blob_hash: str) -> int:
+        return os.path.getsize(self.path(blob_hash))
+
+    # ========== ЗАПИСЬ ==========
+
+    def put_stream(self, stream: BinaryIO) -> str:
+        """Сохраняет содержимое потока, возвращает его хэш"""
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp = tempfile.mkstemp(dir=self.folder, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+
+            blob_hash = digest.hexdigest()
+            target = self.path(blob_hash)
+            if os.path.exists(target):
+                os.remove(temp)
+                # Обновляем время, чтобы gc не удалил вложение до сохранения записи
+                os.utime(target)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(temp, target)
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+        self.database.register_blob(blob_hash, size)
+        return blob_hash
+
+    def put_file(self, filename: str) -> str:
+        with open(filename, 'rb') as f:
+            return self.put_stream(f)
+
+    def put_bytes(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        target = self.path(digest)
+        if os.path.exists(target):
+            os.utime(target)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            fd, temp = tempfile.mkstemp(dir=self.folder, suffix='.part')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    out.write(data)
+                os.replace(temp, target)
+            finally:
+                # После успешного replace временного файла уже нет
+                if os.path.exists(temp):
+                    os.remove(temp)
+        self.database.register_blob(digest, len(data))
+        return digest
+
+    # ========== ЧТЕНИЕ ==========
+
+    def open(self, blob_hash: str) -> BinaryIO:
+        return open(self.path(blob_hash), 'rb')
+
+    def iter_chunks(self, blob_hash: str) -> Iterator[bytes]:
+        with self.open(blob_hash) as f:
+            while True:
+                chunk = f.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def read_bytes(self, blob_hash: str) -> bytes:
+        with self.open(blob_hash) as f:
+            return f.read()
+
+    def export(self, blob_hash: str, filename: str):
+        """Копирует вложение в файл пользователя"""
+        with open(filename, 'wb') as out:
+            for chunk in self.iter_chunks(blob_hash):
+                out.write(chunk)
+
+    # ========== СБОРКА МУСОРА ==========
+
+    def gc(self, full: bool = False, grace_seconds: Optional[int] = None) -> List[str]:
+        """
+        Удаляет вложения без ссылок, возвращает их хэши.
+        full=True сначала пересчитывает ссылки по данным и удаляет файлы,
+        которых нет в учёте (например, после удаления полей или сбоя).
+        Заодно удаляются старые временные файлы .part, оставшиеся от
+        прерванной записи.
+        """
+        grace = self.GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        deadline = time.time() - grace
+        self._remove_stale_parts(deadline)
+
+        if full:
+            self.database.recount_blob_refs()
+
+        candidates = set(self.database.unreferenced_blobs())
+        if full:
+            known = candidates | set(self.database.referenced_blobs())
+            candidates |= {blob_hash for blob_hash in self._stored() if blob_hash not in known}
+
+        removed = []
+        for blob_hash in candidates:
+            path = self.path(blob_hash)
+            try:
+                if os.path.getmtime(path) > deadline:
+                    continue
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            removed.append(blob_hash)
+
+        self.database.forget_blobs(removed)
+        return removed
+
+    def _remove_stale_parts(self, deadline: float):
+        # Файл моложе deadline может принадлежать записи, которая идёт прямо сейчас
+        for name in os.listdir(self.folder):
+            if not name.endswith('.part'):
+                continue
+            path = os.path.join(self.folder, name)
+            try:
+                if os.path.getmtime(path) <= deadline:
+                    os.remove(path)
+            except OSError:
+                continue
+
+    def _stored(self) -> Iterator[str]:
+        for prefix in os.listdir(self.folder):
+            folder = os.path.join(self.folder, prefix)
+            if len(prefix) != 2 or not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                yield prefix + name
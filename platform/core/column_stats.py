@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+
+"""
+Статистика значений колонок
+
+Для каждой колонки таблицы: число записей и пустых, min/max, оценка
+числа различных значений (HyperLogLog), гистограмма (числа и даты) или
+частые значения (остальное), длины текста при отображении. Полный
+пересчёт идёт в фоновом потоке: точные COUNT/MIN/MAX - одним запросом,
+HyperLogLog - потоковым проходом по всем записям, остальное - по
+случайной выборке записей. Добавленные после пересчёта
+записи учитываются приращением, изменения и удаления только копятся в
+счётчике, пока статистика не устареет.
+
+Статистика определяет порядок условий фильтра, ширину колонок и профиль
+данных в панели свойств.
+"""
+
+import math
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .database import Database, data_table, quote
+from .memory import accountant, deep_size
+from .schema import TableDef
+from .value_codecs import formatter
+
+
+# Сколько записей читается для гистограмм и частых значений
+SAMPLE_SIZE = 20000
+# По сколько строк читается проход для HyperLogLog
+SCAN_BATCH = 10000
+HISTOGRAM_BUCKETS = 16
+TOP_VALUES = 10
+
+# Статистика устаревает, когда изменено больше этой доли записей
+STALE_RATIO = 0.2
+STALE_MIN_CHANGES = 1000
+
+# Типы с упорядоченными значениями - для них строится гистограмма
+HISTOGRAM_TYPES = ('integer', 'float', 'money', 'percent', 'date', 'time', 'datetime')
+
+_MASK64 = (1 << 64) - 1
+
+
+# ========== ЧИСЛО РАЗЛИЧНЫХ ЗНАЧЕНИЙ ==========
+
+def _hash64(value: Any) -> int:
+    """Перемешанный 64-битный хэш (у int Python hash(n) == n)"""
+    x = (hash(value) + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+class HyperLogLog:
+    """Оценка числа различных значений в 2**precision байтах (ошибка ~1.04/sqrt(m))"""
+
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: Any):
+        x = _hash64(value)
+        index = x >> (64 - self.precision)
+        rest = (x << self.precision) & _MASK64
+        rank = 64 - self.precision + 1 if rest == 0 else 65 - rest.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[Any]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'HyperLogLog'):
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Малые множества - линейный подсчёт
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+
+# ========== СТАТИСТИКА КОЛОНКИ ==========
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _percentile(sorted_values: List[int], ratio: float) -> int:
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * ratio))]
+
+
+@dataclass
+class ColumnStats:
+    """Статистика одной колонки; значения - в хранимом виде"""
+    field_id: str
+    type_id: str
+    rows: int = 0
+    nulls: int = 0
+    minimum: Any = None
+    maximum: Any = None
+    # Гистограмма: равные интервалы от low до high, число записей в каждом
+    histogram: List[int] = field(default_factory=list)
+    low: Any = None
+    high: Any = None
+    # Частые значения: (значение, примерное число записей)
+    top_values: List[Tuple[Any, int]] = field(default_factory=list)
+    # Длины текста при отображении (по выборке)
+    length_median: int = 0
+    length_p95: int = 0
+    length_max: int = 0
+    # Все значения колонки (проход при пересчёте и добавленные записи)
+    hll: HyperLogLog = field(default_factory=HyperLogLog, repr=False)
+
+    @property
+    def null_ratio(self) -> float:
+        return self.nulls / self.rows if self.rows else 0.0
+
+    @property
+    def distinct(self) -> int:
+        return min(self.hll.estimate(), self.rows - self.nulls)
+
+    def bucket(self, value: Any) -> Optional[int]:
+        """Номер интервала гистограммы для значения"""
+        if not self.histogram or not _is_number(value):
+            return None
+        span = self.high - self.low
+        if span <= 0:
+            return 0
+        position = int((value - self.low) / span * len(self.histogram))
+        return max(0, min(len(self.histogram) - 1, position))
+
+    def observe(self, values: Iterable[Any]):
+        """Учитывает значения добавленных записей"""
+        top = dict(self.top_values)
+        for value in values:
+            self.rows += 1
+            if value is None:
+                self.nulls += 1
+                continue
+            self.hll.add(value)
+            try:
+                if self.minimum is None or value < self.minimum:
+                    self.minimum = value
+                if self.maximum is None or value > self.maximum:
+                    self.maximum = value
+            except TypeError:
+                pass
+            bucket = self.bucket(value)
+            if bucket is not None:
+                self.histogram[bucket] += 1
+            if value in top:
+                top[value] += 1
+        self.top_values = sorted(top.items(), key=lambda item: -item[1])
+
+    def selectivity(self, condition: Any) -> float:
+        """
+        Примерная доля записей под условием фильтра (None - пусто,
+        (от, до) - диапазон, список - любое из значений).
+        """
+        if not self.rows:
+            return 1.0
+        present = self.rows - self.nulls
+        if condition is None:
+            return self.null_ratio
+        if isinstance(condition, (list, set, frozenset)):
+            return min(1.0, sum(self.selectivity(item) for item in condition))
+        if isinstance(condition, tuple):
+            low, high = condition
+            if not self.histogram:
+                return present / self.rows / 3
+            first = 0 if low is None else self.bucket(low)
+            last = len(self.histogram) - 1 if high is None else self.bucket(high)
+            if first is None or last is None:
+                return present / self.rows / 3
+            if (low is not None and low > self.maximum) or (high is not None and high < self.minimum):
+                return 0.0
+            return sum(self.histogram[first:last + 1]) / self.rows
+        for value, count in self.top_values:
+            if value == condition:
+                return count / self.rows
+        return present / self.rows / max(self.distinct, 1)
+
+
+@dataclass
+class TableStats:
+    table_id: str
+    rows: int = 0
+    columns: Dict[str, ColumnStats] = field(default_factory=dict)
+    sample_rows: int = 0
+    changes: int = 0
+    collected_at: float = 0.0
+    duration: float = 0.0
+
+    @property
+    def sampled(self) -> bool:
+        return self.sample_rows < self.rows
+
+    def is_stale(self) -> bool:
+        return self.changes > max(STALE_MIN_CHANGES, self.rows * STALE_RATIO)
+
+
+# ========== СБОР ==========
+
+def collect_table_stats(database: Database, table_id: str, table: Optional[TableDef] = None,
+                        connection=None, sample_size: int = SAMPLE_SIZE) -> TableStats:
+    """Полный пересчёт статистики таблицы (вызывается в фоновом потоке)"""
+    started = time.perf_counter()
+    connection = connection or database.connection
+    applied = database.applied_schema(table_id, connection) or {}
+    columns = list(applied)
+    stats = TableStats(table_id)
+    if not columns:
+        return stats
+
+    aggregates = ', '.join(
+        f"COUNT({quote(c)}), MIN({quote(c)}), MAX({quote(c)})" for c in columns
+    )
+    row = connection.execute(f"SELECT COUNT(*), {aggregates} FROM {data_table(table_id)}").fetchone()
+    stats.rows = row[0]
+    sample = database.sample_records(table_id, sample_size, stats.rows, connection) if stats.rows else []
+    stats.sample_rows = len(sample)
+    scale = stats.rows / len(sample) if sample else 0.0
+
+    fields = {f.id: f for f in table.fields} if table is not None else {}
+    for position, column in enumerate(columns):
+        type_id = applied[column]
+        present, minimum, maximum = row[1 + position * 3:4 + position * 3]
+        values = [record[position + 1] for record in sample if record[position + 1] is not None]
+        column_stats = ColumnStats(column, type_id, stats.rows, stats.rows - present, minimum, maximum)
+
+        counts = Counter(values)
+        column_stats.top_values = [(value, round(count * scale)) for value, count in counts.most_common(TOP_VALUES)]
+
+        if type_id in HISTOGRAM_TYPES and _is_number(minimum) and _is_number(maximum):
+            column_stats.histogram = [0] * HISTOGRAM_BUCKETS
+            column_stats.low, column_stats.high = minimum, maximum
+            for value in values:
+                bucket = column_stats.bucket(value)
+                if bucket is not None:
+                    column_stats.histogram[bucket] += 1
+            column_stats.histogram = [round(count * scale) for count in column_stats.histogram]
+
+        field_def = fields.get(column)
+        format_value = formatter(field_def) if field_def is not None else str
+        lengths = sorted(len(format_value(value)) for value in counts)
+        column_stats.length_median = _percentile(lengths, 0.5)
+        column_stats.length_p95 = _percentile(lengths, 0.95)
+        column_stats.length_max = lengths[-1] if lengths else 0
+        stats.columns[column] = column_stats
+
+    if stats.rows:
+        _scan_distinct(connection, table_id, columns, [stats.columns[column].hll for column in columns])
+    stats.collected_at = time.time()
+    stats.duration = time.perf_counter() - started
+    return stats
+
+
+def _scan_distinct(connection, table_id: str, columns: List[str], hlls: List[HyperLogLog]):
+    """Проход по всем записям таблицы пачками: каждое значение попадает в HyperLogLog колонки"""
+    select = ', '.join(quote(c) for c in columns)
+    cursor = connection.execute(f"SELECT {select} FROM {data_table(table_id)}")
+    try:
+        while True:
+            batch = cursor.fetchmany(SCAN_BATCH)
+            if not batch:
+                break
+            for hll, values in zip(hlls, zip(*batch)):
+                hll.update(value for value in values if value is not None)
+    finally:
+        cursor.close()
+
+
+# ========== СЕРВИС ==========
+
+class StatisticsService:
+    """
+    Статистика таблиц проекта в памяти. Пересчёт выполняется в одном
+    фоновом потоке со своим подключением к базе; UI получает результат
+    через Future (или колбэк), не дожидаясь его.
+    """
+
+    def __init__(self, database: Database, sample_size: int = SAMPLE_SIZE):
+        self.database = database
+        self.sample_size = sample_size
+        self.tables: Dict[str, TableStats] = {}
+        self.pending: Dict[str, Future] = {}
+        # Растёт при invalidate: пересчёт, начатый раньше, не сохраняет устаревший результат
+        self.generations: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='column-stats')
+        accountant.register(self, "Статистика колонок", 'statistics', StatisticsService.memory_usage,
+                            trim=StatisticsService.trim, details=StatisticsService.memory_details)
+
+    def get(self, table_id: str) -> Optional[TableStats]:
+        accountant.touch(self, "Статистика колонок")
+        return self.tables.get(table_id)
+
+    def refresh(self, table_id: str, table: Optional[TableDef] = None) -> Future:
+        """Запускает пересчёт в фоне; повторный вызов до завершения возвращает ту же задачу"""
+        with self.lock:
+            future = self.pending.get(table_id)
+            if future is None:
+                future = self.executor.submit(self._collect, table_id, table)
+                self.pending[table_id] = future
+            return future
+
+    def ensure(self, table_id: str, table: Optional[TableDef] = None,
+               callback: Optional[Callable[[str], None]] = None) -> Optional[TableStats]:
+        """
+        Текущая статистика (может быть None). Если её нет или она устарела,
+        запускается пересчёт; callback(table_id) вызывается из фонового потока.
+        """
+        stats = self.tables.get(table_id)
+        if stats is None or stats.is_stale():
+            future = self.refresh(table_id, table)
+            if callback is not None:
+                future.add_done_callback(
+                    lambda done: callback(table_id) if not done.cancelled() and done.exception() is None else None
+                )
+        return stats
+
+    def _collect(self, table_id: str, table: Optional[TableDef]) -> TableStats:
+        generation = self.generations.get(table_id, 0)
+        connection = self.database.connect()
+        try:
+            stats = collect_table_stats(self.database, table_id, table, connection, self.sample_size)
+        finally:
+            connection.close()
+            with self.lock:
+                self.pending.pop(table_id, None)
+        with self.lock:
+            if self.generations.get(table_id, 0) == generation:
+                self.tables[table_id] = stats
+        return stats
+
+    def observe_insert(self, table_id: str, records: List[Dict[str, Any]]):
+        """Приращение по добавленным записям (значения - в хранимом виде)"""
+        stats = self.tables.get(table_id)
+        if stats is None:
+            return
+        stats.rows += len(records)
+        for column, column_stats in stats.columns.items():
+            column_stats.observe(record.get(column) for record in records)
+
+    def note_changes(self, table_id: str, count: int = 1):
+        """Изменённые и удалённые записи приближают пересчёт"""
+        stats = self.tables.get(table_id)
+        if stats is not None:
+            stats.changes += count
+
+    def invalidate(self, table_id: str):
+        with self.lock:
+            self.generations[table_id] = self.generations.get(table_id, 0) + 1
+            self.tables.pop(table_id, None)
+
+    def memory_details(self) -> List[Tuple[str, int]]:
+        return [(table_id, deep_size(stats)) for table_id, stats in list(self.tables.items())]
+
+    def memory_usage(self) -> Tuple[int, int]:
+        details = self.memory_details()
+        return sum(size for _, size in details), len(details)
+
+    def trim(self, target_bytes: int):
+        """Забывает статистику давно собранных таблиц; при следующем обращении она соберётся снова"""
+        sizes = dict(self.memory_details())
+        total = sum(sizes.values())
+        for table_id in sorted(sizes, key=lambda table_id: getattr(self.tables.get(table_id), 'collected_at', 0)):
+            if total <= target_bytes:
+                break
+            self.tables.pop(table_id, None)
+            total -= sizes[table_id]
+
+    def plan_filter(self, table_id: str, filter: Optional[Dict]) -> Optional[Dict]:
+        """
+        Условия фильтра в порядке возрастания доли подходящих записей:
+        SQLite проверяет AND слева направо, и самое строгое условие
+        отсекает строки раньше остальных.
+        """
+        stats = self.tables.get(table_id)
+        if stats is None or not filter or len(filter) < 2:
+            return filter
+
+        def selectivity(item):
+            column = stats.columns.get(item[0])
+            return column.selectivity(item[1]) if column is not None else 1.0
+        return dict(sorted(filter.items(), key=selectivity))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
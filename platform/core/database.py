@@ -0,0 +1,650 @@
+# -*- coding: utf-8 -*-
+
+"""
+Хранилище данных таблиц проекта (SQLite)
+
+Каждая таблица проекта хранится в отдельной таблице SQLite. Колонки
+называются по id полей, поэтому переименование и перестановка полей
+не затрагивают данные. Применённая схема (какие поля и каких типов
+физически есть в базе) хранится в служебной таблице _schema.
+"""
+
+import json
+import random
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .bitmap_index import INDEXED_TYPES, ColumnIndex, RoaringBitmap, intersection
+from .memory import accountant
+from .tracing import traced
+
+
+# Класс хранения SQLite для каждого типа поля
+STORAGE_TYPES = {
+    'integer': 'INTEGER',
+    'float': 'REAL',
+    'boolean': 'INTEGER',
+    'rating': 'INTEGER',
+    # Деньги и проценты - целые десятитысячные доли (см. fixed_point)
+    'money': 'INTEGER',
+    'percent': 'INTEGER',
+    # Дата - номер дня, время и дата со временем - секунды (см. date_codec)
+    'date': 'INTEGER',
+    'time': 'INTEGER',
+    'datetime': 'INTEGER',
+    # Список - код варианта (см. list_codec)
+    'list': 'INTEGER',
+}
+DEFAULT_STORAGE = 'TEXT'
+
+# Поля, в которых хранится хэш вложения из BlobStore, а не само содержимое
+BLOB_TYPES = ('file', 'image')
+
+
+def storage_type(type_id: str) -> str:
+    """Класс хранения SQLite для типа поля"""
+    return STORAGE_TYPES.get(type_id, DEFAULT_STORAGE)
+
+
+def quote(identifier: str) -> str:
+    """Экранирует имя таблицы или колонки"""
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+def data_table(table_id: str) -> str:
+    """Имя таблицы SQLite с данными таблицы проекта"""
+    return quote(f"data_{table_id}")
+
+
+@dataclass
+class Search:
+    """
+    Поиск по записям: подстрока text в текстовых колонках или, для колонок,
+    которые хранятся кодами и числами, совпадение с values - тем, во что
+    text переводится кодеком поля ({field_id: условие как в filter},
+    см. value_codecs.search_values)
+    """
+    text: str
+    values: Dict[str, Any] = field(default_factory=dict)
+
+
+class Row(tuple):
+    """
+    Строка данных: кортеж (id, значения полей...) без словаря на каждую запись.
+    Доступ по id поля - через get(), как у словаря.
+    """
+
+    __slots__ = ()
+    columns: Dict[str, int] = {}
+
+    @property
+    def id(self) -> int:
+        return self[0]
+
+    def get(self, field_id: str, default: Any = None) -> Any:
+        index = self.columns.get(field_id)
+        if index is None:
+            return default
+        value = self[index]
+        return default if value is None else value
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {field_id: self[index] for field_id, index in self.columns.items()}
+
+
+_row_types: Dict[Tuple[str, ...], type] = {}
+
+
+def row_type(field_ids: Sequence[str]) -> type:
+    """Класс строки для набора колонок (создаётся один раз на набор)"""
+    key = tuple(field_ids)
+    cls = _row_types.get(key)
+    if cls is None:
+        columns = {field_id: index for index, field_id in enumerate(key, start=1)}
+        cls = type('Row', (Row,), {'__slots__': (), 'columns': columns})
+        _row_types[key] = cls
+    return cls
+
+
+class Database:
+    """Подключение к базе данных проекта"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        self.connection = self.connect()
+        # Битовые индексы в памяти: table_id -> {field_id: ColumnIndex}.
+        # Строятся при первом фильтре по таблице и обновляются при записи.
+        self.indexes: Dict[str, Dict[str, ColumnIndex]] = {}
+        self._init_meta()
+        accountant.register(self, "Битовые индексы", 'index', Database.index_memory,
+                            trim=Database.trim_indexes, details=Database.index_details)
+
+    def connect(self) -> sqlite3.Connection:
+        """Новое подключение (фоновые задачи работают через собственное)"""
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _init_meta(self):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS _schema ("
+                "table_id TEXT PRIMARY KEY, "
+                "columns TEXT NOT NULL, "
+                "dropped TEXT NOT NULL DEFAULT '[]')"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS _blobs ("
+                "hash TEXT PRIMARY KEY, "
+                "size INTEGER NOT NULL DEFAULT 0, "
+                "refs INTEGER NOT NULL DEFAULT 0)"
+            )
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    # ========== ПРИМЕНЁННАЯ СХЕМА ==========
+
+    def applied_schema(self, table_id: str, connection: Optional[sqlite3.Connection] = None) -> Optional[Dict[str, str]]:
+        """Поля, физически существующие в базе: {field_id: type_id}"""
+        connection = connection or self.connection
+        row = connection.execute(
+            "SELECT columns FROM _schema WHERE table_id = ?", (table_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(json.loads(row[0]))
+
+    def column_storage(self, table_id: str, connection: Optional[sqlite3.Connection] = None) -> Dict[str, str]:
+        """Фактический класс хранения колонок: {колонка: INTEGER/REAL/TEXT}"""
+        connection = connection or self.connection
+        return {
+            row[1]: row[2].upper()
+            for row in connection.execute(f"PRAGMA table_info({data_table(table_id)})")
+        }
+
+    def dropped_columns(self, table_id: str, connection: Optional[sqlite3.Connection] = None) -> List[str]:
+        """Колонки удалённых полей, ещё не вычищенные из файла"""
+        connection = connection or self.connection
+        row = connection.execute(
+            "SELECT dropped FROM _schema WHERE table_id = ?", (table_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def save_schema(self, table_id: str, columns: Dict[str, str], dropped: List[str],
+                    connection: Optional[sqlite3.Connection] = None):
+        connection = connection or self.connection
+        connection.execute(
+            "INSERT OR REPLACE INTO _schema (table_id, columns, dropped) VALUES (?, ?, ?)",
+            (table_id, json.dumps(list(columns.items())), json.dumps(dropped))
+        )
+        # Колонки могли смениться или переписаться - индекс строится заново
+        self.indexes.pop(table_id, None)
+
+    def drop_table(self, table_id: str):
+        """Удаляет данные таблицы проекта"""
+        with self.lock, self.connection:
+            self._change_refs(self._blob_values(table_id), -1)
+            self.connection.execute(f"DROP TABLE IF EXISTS {data_table(table_id)}")
+            self.connection.execute("DELETE FROM _schema WHERE table_id = ?", (table_id,))
+            self.indexes.pop(table_id, None)
+
+    def compact(self, table_id: str):
+        """
+        Физически удаляет колонки удалённых полей.
+        SQLite при этом перезаписывает таблицу, поэтому операция запускается явно.
+        """
+        with self.lock, self.connection:
+            columns = self.applied_schema(table_id)
+            if columns is None:
+                return
+            for column in self.dropped_columns(table_id):
+                self.connection.execute(
+                    f"ALTER TABLE {data_table(table_id)} DROP COLUMN {quote(column)}"
+                )
+            self.save_schema(table_id, columns, [])
+
+    # ========== ЗАПИСИ ==========
+
+    def _columns(self, table_id: str) -> List[str]:
+        return list(self.applied_schema(table_id) or {})
+
+    @staticmethod
+    def _condition(field_id: str, value: Any) -> Tuple[str, list]:
+        """Условие на одну колонку (см. _where)"""
+        column = quote(field_id)
+        if value is None:
+            return f"{column} IS NULL", []
+        if isinstance(value, tuple):
+            low, high = value
+            parts, params = [], []
+            if low is not None:
+                parts.append(f"{column} >= ?")
+                params.append(low)
+            if high is not None:
+                parts.append(f"{column} <= ?")
+                params.append(high)
+            return ' AND '.join(parts) or "1", params
+        if isinstance(value, (list, set, frozenset)):
+            values = [item for item in value if item is not None]
+            condition = f"{column} IN ({', '.join('?' * len(values))})" if values else "0"
+            if len(values) < len(value):
+                condition = f"({condition} OR {column} IS NULL)"
+            return condition, values
+        return f"{column} = ?", [value]
+
+    def _where(self, table_id: str, filter: Optional[Dict] = None,
+               search: Union[str, Search, None] = None) -> Tuple[str, list]:
+        """
+        Условие выборки. filter - {field_id: значение}, где значение может быть
+        None (пусто), кортежем (от, до) - диапазон, списком/множеством - IN.
+        search - подстрока в любом текстовом поле (строка) или Search.
+        """
+        conditions = []
+        params = []
+
+        for field_id, value in (filter or {}).items():
+            condition, values = self._condition(field_id, value)
+            conditions.append(condition)
+            params.extend(values)
+
+        if search:
+            if isinstance(search, str):
+                search = Search(search)
+            applied = self.applied_schema(table_id) or {}
+            alternatives = []
+            for field_id, type_id in applied.items():
+                if storage_type(type_id) == 'TEXT':
+                    alternatives.append(f"{quote(field_id)} LIKE ?")
+                    params.append(f"%{search.text}%")
+            for field_id, value in search.values.items():
+                if field_id in applied:
+                    condition, values = self._condition(field_id, value)
+                    alternatives.append(f"({condition})")
+                    params.extend(values)
+            conditions.append('(' + ' OR '.join(alternatives) + ')' if alternatives else "0")
+
+        if not conditions:
+            return "", params
+        return " WHERE " + " AND ".join(conditions), params
+
+    @staticmethod
+    def _order(order: Optional[str]) -> str:
+        """order - id поля, с минусом впереди для убывания"""
+        if not order:
+            return " ORDER BY id"
+        if order.startswith('-'):
+            return f" ORDER BY {quote(order[1:])} DESC, id DESC"
+        return f" ORDER BY {quote(order)}, id"
+
+    def iter_records(self, table_id: str, batch_size: int = 1000, filter: Optional[Dict] = None,
+                     order: Optional[str] = None, search: Union[str, Search, None] = None) -> Iterator[Row]:
+        """Потоковое чтение записей: в памяти держится не больше batch_size строк"""
+        with self.lock:
+            columns = self._columns(table_id)
+            if not columns:
+                return
+            where, params = self._where(table_id, filter, search)
+            select = ', '.join(['id'] + [quote(c) for c in columns])
+            cursor = self.connection.execute(
+                f"SELECT {select} FROM {data_table(table_id)}{where}{self._order(order)}", params
+            )
+        cls = row_type(columns)
+
+        try:
+            while True:
+                with self.lock:
+                    batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                for values in batch:
+                    yield cls(values)
+        finally:
+            cursor.close()
+
+    def sample_records(self, table_id: str, size: int, rows: Optional[int] = None,
+                       connection: Optional[sqlite3.Connection] = None) -> List[Row]:
+        """
+        Примерно size случайных записей без просмотра всей таблицы: id
+        выбираются из диапазона [min, max], пропуски от удалённых записей
+        просто не находятся. rows - известное число записей (уточняет,
+        сколько id нужно взять, чтобы набралось size).
+        """
+        # Фоновые задачи передают своё подключение и не занимают общий lock
+        with self.lock if connection is None else nullcontext():
+            connection = connection or self.connection
+            columns = list(self.applied_schema(table_id, connection) or {})
+            if not columns:
+                return []
+            table = data_table(table_id)
+            select = ', '.join(['id'] + [quote(c) for c in columns])
+            low, high = connection.execute(f"SELECT MIN(id), MAX(id) FROM {table}").fetchone()
+            if low is None:
+                return []
+            span = high - low + 1
+            if span <= size:
+                result = connection.execute(f"SELECT {select} FROM {table}").fetchall()
+            else:
+                count = min(span, size * span // (rows or span) + 1)
+                ids = random.sample(range(low, high + 1), count)
+                result = []
+                for start in range(0, len(ids), 900):
+                    chunk = ids[start:start + 900]
+                    result.extend(connection.execute(
+                        f"SELECT {select} FROM {table} WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                    ).fetchall())
+        cls = row_type(columns)
+        return [cls(values) for values in result]
+
+    def distinct_values(self, table_id: str, field_id: str) -> List[Any]:
+        with self.lock:
+            return [
+                row[0] for row in self.connection.execute(
+                    f"SELECT DISTINCT {quote(field_id)} FROM {data_table(table_id)} "
+                    f"WHERE {quote(field_id)} IS NOT NULL"
+                )
+            ]
+
+    @traced('db.count')
+    def count(self, table_id: str, filter: Optional[Dict] = None, search: Union[str, Search, None] = None) -> int:
+        with self.lock:
+            if self.applied_schema(table_id) is None:
+                return 0
+            ids = None if search else self.filter_ids(table_id, filter)
+            if ids is not None:
+                return len(ids)
+            where, params = self._where(table_id, filter, search)
+            return self.connection.execute(
+                f"SELECT COUNT(*) FROM {data_table(table_id)}{where}", params
+            ).fetchone()[0]
+
+    @traced('db.get_page')
+    def get_page(self, table_id: str, page: int, page_size: int = 100, filter: Optional[Dict] = None,
+                 order: Optional[str] = None, search: Union[str, Search, None] = None) -> List[Row]:
+        with self.lock:
+            columns = self._columns(table_id)
+            if not columns:
+                return []
+            select = ', '.join(['id'] + [quote(c) for c in columns])
+            ids = None if search or order else self.filter_ids(table_id, filter)
+            if ids is not None:
+                # Страница берётся прямо из множества id: без просмотра таблицы
+                page_ids = ids.slice(page * page_size, page_size)
+                rows = self.connection.execute(
+                    f"SELECT {select} FROM {data_table(table_id)} "
+                    f"WHERE id IN ({', '.join('?' * len(page_ids))}) ORDER BY id", page_ids
+                ).fetchall() if page_ids else []
+            else:
+                where, params = self._where(table_id, filter, search)
+                rows = self.connection.execute(
+                    f"SELECT {select} FROM {data_table(table_id)}{where}{self._order(order)} LIMIT ? OFFSET ?",
+                    params + [page_size, page * page_size]
+                ).fetchall()
+        cls = row_type(columns)
+        return [cls(values) for values in rows]
+
+    def insert_records(self, table_id: str, records: List[Dict[str, Any]]) -> int:
+        """Добавляет записи пакетом, возвращает количество"""
+        with self.lock:
+            if not records:
+                return 0
+            if self.applied_schema(table_id) is None:
+                raise LookupError(f"Таблица {table_id} не создана в базе")
+            columns = self._columns(table_id)
+            if not columns:
+                return 0
+            names = ', '.join(quote(c) for c in columns)
+            marks = ', '.join('?' * len(columns))
+            indexed = table_id in self.indexes
+            if indexed:
+                last_id = self.connection.execute(f"SELECT MAX(id) FROM {data_table(table_id)}").fetchone()[0]
+            with self.connection:
+                self.connection.executemany(
+                    f"INSERT INTO {data_table(table_id)} ({names}) VALUES ({marks})",
+                    [tuple(record.get(c) for c in columns) for record in records]
+                )
+                blob_columns = self._blob_columns(table_id)
+                if blob_columns:
+                    self._change_refs((record.get(c) for record in records for c in blob_columns), 1)
+                added = self._indexed_rows(table_id, "id > ?", [last_id or 0]) if indexed else []
+            self._apply_index(table_id, added=added)
+        return len(records)
+
+    def insert_record(self, table_id: str, values: Dict[str, Any]) -> int:
+        with self.lock:
+            columns = [c for c in self._columns(table_id) if c in values]
+            names = ', '.join(quote(c) for c in columns)
+            with self.connection:
+                if columns:
+                    cursor = self.connection.execute(
+                        f"INSERT INTO {data_table(table_id)} ({names}) VALUES ({', '.join('?' * len(columns))})",
+                        [values[c] for c in columns]
+                    )
+                else:
+                    cursor = self.connection.execute(f"INSERT INTO {data_table(table_id)} DEFAULT VALUES")
+                self._change_refs((values[c] for c in self._blob_columns(table_id) if c in values), 1)
+                added = self._indexed_rows(table_id, "id = ?", [cursor.lastrowid])
+            self._apply_index(table_id, added=added)
+            return cursor.lastrowid
+
+    def update_record(self, table_id: str, record_id: int, values: Dict[str, Any]):
+        with self.lock:
+            columns = [c for c in self._columns(table_id) if c in values]
+            if not columns:
+                return
+            assignments = ', '.join(f"{quote(c)} = ?" for c in columns)
+            blob_columns = [c for c in self._blob_columns(table_id) if c in values]
+            reindex = any(c in values for c in self.indexes.get(table_id, ()))
+            with self.connection:
+                if blob_columns:
+                    self._change_refs(self._blob_values(table_id, blob_columns, record_id), -1)
+                    self._change_refs((values[c] for c in blob_columns), 1)
+                removed = self._indexed_rows(table_id, "id = ?", [record_id]) if reindex else []
+                self.connection.execute(
+                    f"UPDATE {data_table(table_id)} SET {assignments} WHERE id = ?",
+                    [values[c] for c in columns] + [record_id]
+                )
+                added = self._indexed_rows(table_id, "id = ?", [record_id]) if reindex else []
+            self._apply_index(table_id, added, removed)
+
+    def update_column(self, table_id: str, field_id: str, values: Iterable[Tuple[Any, int]]) -> int:
+        """
+        Пакетная запись одной колонки: values - пары (значение, id записи).
+        Для вычисляемых полей - их колонки не индексируются и не ссылаются на вложения.
+        """
+        values = list(values)
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"UPDATE {data_table(table_id)} SET {quote(field_id)} = ? WHERE id = ?", values
+            )
+        return len(values)
+
+    def delete_record(self, table_id: str, record_id: int):
+        with self.lock:
+            with self.connection:
+                self._change_refs(self._blob_values(table_id, record_id=record_id), -1)
+                removed = self._indexed_rows(table_id, "id = ?", [record_id])
+                self.connection.execute(f"DELETE FROM {data_table(table_id)} WHERE id = ?", (record_id,))
+            self._apply_index(table_id, removed=removed)
+
+    # ========== БИТОВЫЕ ИНДЕКСЫ ==========
+
+    def _index_columns(self, table_id: str) -> List[str]:
+        return [
+            field_id for field_id, type_id in (self.applied_schema(table_id) or {}).items()
+            if type_id in INDEXED_TYPES
+        ]
+
+    def table_index(self, table_id: str) -> Dict[str, ColumnIndex]:
+        """Индексы колонок таблицы; при первом обращении строятся одним проходом"""
+        with self.lock:
+            index = self.indexes.get(table_id)
+            if index is None:
+                columns = self._index_columns(table_id)
+                index = {column: ColumnIndex() for column in columns}
+                if columns:
+                    select = ', '.join(['id'] + [quote(c) for c in columns])
+                    cursor = self.connection.execute(f"SELECT {select} FROM {data_table(table_id)}")
+                    while True:
+                        batch = cursor.fetchmany(10000)
+                        if not batch:
+                            break
+                        for position, column in enumerate(columns, start=1):
+                            index[column].bulk_load((row[0], row[position]) for row in batch)
+                self.indexes[table_id] = index
+            accountant.touch(self, "Битовые индексы")
+            return index
+
+    def index_details(self) -> List[Tuple[str, int]]:
+        """Память индексов по таблицам: [(table_id, байт)]"""
+        return [
+            (table_id, sum(column.memory_size() for column in index.values()))
+            for table_id, index in list(self.indexes.items())
+        ]
+
+    def index_memory(self) -> Tuple[int, int]:
+        details = self.index_details()
+        return sum(size for _, size in details), len(details)
+
+    def trim_indexes(self, target_bytes: int):
+        """Сбрасывает индексы таблиц (раньше построенные - первыми), пока их объём больше target_bytes"""
+        with self.lock:
+            total, _ = self.index_memory()
+            for table_id, size in self.index_details():
+                if total <= target_bytes:
+                    break
+                # Индекс построится заново при следующем фильтре по таблице
+                self.indexes.pop(table_id, None)
+                total -= size
+
+    def _indexed_rows(self, table_id: str, where: str, params: list) -> List[tuple]:
+        """(id, значения индексируемых колонок) затронутых строк, если индекс уже построен"""
+        index = self.indexes.get(table_id)
+        if not index:
+            return []
+        select = ', '.join(['id'] + [quote(c) for c in index])
+        return self.connection.execute(
+            f"SELECT {select} FROM {data_table(table_id)} WHERE {where}", params
+        ).fetchall()
+
+    def _apply_index(self, table_id: str, added: List[tuple] = (), removed: List[tuple] = ()):
+        """Переносит изменения в индекс после успешной записи"""
+        index = self.indexes.get(table_id)
+        if not index:
+            return
+        columns = list(index.values())
+        for row in removed:
+            for column, value in zip(columns, row[1:]):
+                column.remove(row[0], value)
+        for row in added:
+            for column, value in zip(columns, row[1:]):
+                column.add(row[0], value)
+
+    def filter_ids(self, table_id: str, filter: Optional[Dict]) -> Optional[RoaringBitmap]:
+        """
+        id записей под фильтр, если все его условия - по индексируемым
+        колонкам; иначе None (фильтр выполняется запросом).
+        """
+        if not filter:
+            return None
+        with self.lock:
+            columns = self._index_columns(table_id)
+            if any(field_id not in columns for field_id in filter):
+                return None
+            index = self.table_index(table_id)
+            return intersection(index[field_id].matching(value) for field_id, value in filter.items())
+
+    def facet_counts(self, table_id: str, field_id: str, filter: Optional[Dict] = None,
+                     search: Union[str, Search, None] = None) -> Dict[Any, int]:
+        """
+        Число записей по значениям поля среди записей под фильтром.
+        Для индексируемых колонок считается пересечением битовых множеств.
+        """
+        with self.lock:
+            if self.applied_schema(table_id) is None:
+                return {}
+            if not search and field_id in self._index_columns(table_id):
+                column = self.table_index(table_id)[field_id]
+                if not filter:
+                    return column.counts()
+                ids = self.filter_ids(table_id, filter)
+                if ids is not None:
+                    return column.counts(ids)
+            where, params = self._where(table_id, filter, search)
+            return dict(self.connection.execute(
+                f"SELECT {quote(field_id)}, COUNT(*) FROM {data_table(table_id)}{where} "
+                f"GROUP BY {quote(field_id)}", params
+            ).fetchall())
+
+    # ========== ССЫЛКИ НА ВЛОЖЕНИЯ ==========
+
+    def _blob_columns(self, table_id: str) -> List[str]:
+        return [
+            field_id for field_id, type_id in (self.applied_schema(table_id) or {}).items()
+            if type_id in BLOB_TYPES
+        ]
+
+    def _blob_values(self, table_id: str, columns: Optional[List[str]] = None,
+                     record_id: Optional[int] = None) -> List[str]:
+        """Хэши вложений в колонках таблицы (во всех строках или в одной)"""
+        columns = self._blob_columns(table_id) if columns is None else columns
+        if not columns:
+            return []
+        select = ', '.join(quote(c) for c in columns)
+        where, params = (" WHERE id = ?", (record_id,)) if record_id is not None else ("", ())
+        rows = self.connection.execute(f"SELECT {select} FROM {data_table(table_id)}{where}", params)
+        return [value for row in rows for value in row if value]
+
+    def _change_refs(self, hashes: Iterable[Optional[str]], delta: int):
+        """Изменяет счётчики ссылок; вызывается внутри транзакции записи данных"""
+        counts = Counter(value for value in hashes if value)
+        if counts:
+            self.connection.executemany(
+                "INSERT INTO _blobs (hash, refs) VALUES (?, ?) "
+                "ON CONFLICT(hash) DO UPDATE SET refs = refs + excluded.refs",
+                [(value, count * delta) for value, count in counts.items()]
+            )
+
+    def register_blob(self, blob_hash: str, size: int):
+        """Учитывает новое вложение (без ссылок, пока его не запишут в запись)"""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO _blobs (hash, size) VALUES (?, ?) "
+                "ON CONFLICT(hash) DO UPDATE SET size = excluded.size",
+                (blob_hash, size)
+            )
+
+    def blob_refs(self, blob_hash: str) -> int:
+        with self.lock:
+            row = self.connection.execute("SELECT refs FROM _blobs WHERE hash = ?", (blob_hash,)).fetchone()
+        return row[0] if row else 0
+
+    def unreferenced_blobs(self) -> List[str]:
+        with self.lock:
+            return [row[0] for row in self.connection.execute("SELECT hash FROM _blobs WHERE refs <= 0")]
+
+    def referenced_blobs(self) -> List[str]:
+        with self.lock:
+            return [row[0] for row in self.connection.execute("SELECT hash FROM _blobs WHERE refs > 0")]
+
+    def forget_blobs(self, hashes: List[str]):
+        with self.lock, self.connection:
+            self.connection.executemany("DELETE FROM _blobs WHERE hash = ? AND refs <= 0", [(h,) for h in hashes])
+
+    def recount_blob_refs(self):
+        """
+        Пересчитывает ссылки по текущим данным. Нужен после изменений схемы
+        (удаление поля, смена типа), которые не проходят через запись записей.
+        """
+        with self.lock, self.connection:
+            table_ids = [row[0] for row in self.connection.execute("SELECT table_id FROM _schema")]
+            self.connection.execute("UPDATE _blobs SET refs = 0")
+            for table_id in table_ids:
+                self._change_refs(self._blob_values(table_id), 1)
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+"""
+Даты и время как целые числа
+
+- date: номер дня от 01.01.1970;
+- time: секунды от полуночи;
+- datetime: секунды от 01.01.1970 00:00 (без часового пояса, как ввели).
+
+Сравнение, сортировка и фильтр по диапазону - операции над int в базе.
+Формат поля (date_format, time_format) применяется только при вводе и
+отображении. Год/месяц/день вычисляются целочисленно, без создания
+объектов datetime, а для колонок - через numpy datetime64, если он есть.
+"""
+
+import datetime
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+DATE_TYPES = ('date', 'time', 'datetime')
+
+SECONDS_PER_DAY = 86400
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+# С какого размера колонки части даты считаются через numpy
+NUMPY_MIN_SIZE = 10000
+
+# Форматы из свойств поля -> шаблоны strptime для ввода
+DATE_PATTERNS = {
+    'ДД.ММ.ГГГГ': '%d.%m.%Y',
+    'ММ.ДД.ГГГГ': '%m.%d.%Y',
+    'ГГГГ-ММ-ДД': '%Y-%m-%d',
+    'ММ/ГГГГ': '%m/%Y',
+    'ГГГГ': '%Y',
+}
+TIME_PATTERNS = {
+    'ЧЧ:ММ': '%H:%M',
+    'ЧЧ:ММ:СС': '%H:%M:%S',
+    'ЧЧ:ММ AM/PM': '%I:%M %p',
+}
+_FALLBACK_DATE_PATTERNS = ('%d.%m.%Y', '%Y-%m-%d', '%d/%m/%Y', '%d.%m.%y')
+_FALLBACK_TIME_PATTERNS = ('%H:%M:%S', '%H:%M', '%I:%M %p')
+
+MONTHS_GENITIVE = (
+    'января', 'февраля', 'марта', 'апреля', 'мая', 'июня',
+    'июля', 'августа', 'сентября', 'октября', 'ноября', 'декабря',
+)
+WEEKDAYS = ('понедельник', 'вторник', 'среда', 'четверг', 'пятница', 'суббота', 'воскресенье')
+
+
+# ========== ПРЕОБРАЗОВАНИЯ ==========
+
+def date_to_days(value: datetime.date) -> int:
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def days_to_date(days: int) -> datetime.date:
+    return datetime.date.fromordinal(days + _EPOCH_ORDINAL)
+
+
+def time_to_seconds(value: datetime.time) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def seconds_to_time(seconds: int) -> datetime.time:
+    seconds %= SECONDS_PER_DAY
+    return datetime.time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+def datetime_to_seconds(value: datetime.datetime) -> int:
+    return date_to_days(value.date()) * SECONDS_PER_DAY + time_to_seconds(value.time())
+
+
+def seconds_to_datetime(seconds: int) -> datetime.datetime:
+    return _EPOCH + datetime.timedelta(seconds=seconds)
+
+
+def civil_from_days(days: int) -> Tuple[int, int, int]:
+    """(год, месяц, день) по номеру дня - целочисленный алгоритм Хиннанта"""
+    z = days + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = mp + 3 if mp < 10 else mp - 9
+    return yoe + era * 400 + (month <= 2), month, day
+
+
+# ========== ВВОД ==========
+
+def _strptime(text: str, patterns: Sequence[str]) -> Optional[datetime.datetime]:
+    for pattern in patterns:
+        try:
+            return datetime.datetime.strptime(text, pattern)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_date(text: str, date_format: Optional[str] = None) -> datetime.date:
+    text = text.strip()
+    patterns = (DATE_PATTERNS[date_format],) if date_format in DATE_PATTERNS else ()
+    parsed = _strptime(text, patterns + _FALLBACK_DATE_PATTERNS)
+    if parsed is None:
+        try:
+            return datetime.datetime.fromisoformat(text).date()
+        except ValueError:
+            raise ValueError(f"Не дата: {text!r}")
+    return parsed.date()
+
+
+def parse_time(text: str, time_format: Optional[str] = None) -> datetime.time:
+    text = text.strip()
+    patterns = (TIME_PATTERNS[time_format],) if time_format in TIME_PATTERNS else ()
+    parsed = _strptime(text, patterns + _FALLBACK_TIME_PATTERNS)
+    if parsed is None:
+        raise ValueError(f"Не время: {text!r}")
+    return parsed.time()
+
+
+def parse_datetime(text: str, date_format: Optional[str] = None,
+                   time_format: Optional[str] = None) -> datetime.datetime:
+    text = text.strip()
+    try:
+        return datetime.datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    date_part, _, time_part = text.partition(' ')
+    day = parse_date(date_part, date_format)
+    moment = parse_time(time_part, time_format) if time_part else datetime.time()
+    return datetime.datetime.combine(day, moment)
+
+
+def to_stored(value: Any, type_id: str, date_format: Optional[str] = None,
+              time_format: Optional[str] = None) -> Optional[int]:
+    """Значение пользователя (объект или строка) в хранимое целое; int считается уже хранимым"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"Не дата: {value!r}")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        if type_id == 'date':
+            value = parse_date(value, date_format)
+        elif type_id == 'time':
+            value = parse_time(value, time_format)
+        else:
+            value = parse_datetime(value, date_format, time_format)
+
+    if type_id == 'date':
+        if isinstance(value, datetime.datetime):
+            value = value.date()
+        if isinstance(value, datetime.date):
+            return date_to_days(value)
+    elif type_id == 'time':
+        if isinstance(value, datetime.datetime):
+            value = value.time()
+        if isinstance(value, datetime.time):
+            return time_to_seconds(value)
+    else:
+        if isinstance(value, datetime.datetime):
+            return datetime_to_seconds(value)
+        if isinstance(value, datetime.date):
+            return date_to_days(value) * SECONDS_PER_DAY
+    raise ValueError(f"Не дата: {value!r}")
+
+
+def stored_converter(type_id: str):
+    """Преобразование для миграции колонки: нераспознанное становится пустым"""
+    def convert(value):
+        try:
+            return to_stored(value, type_id)
+        except ValueError:
+            return None
+    return convert
+
+
+def from_stored(stored: int, type_id: str) -> Any:
+    if type_id == 'date':
+        return days_to_date(stored)
+    if type_id == 'time':
+        return seconds_to_time(stored)
+    return seconds_to_datetime(stored)
+
+
+# ========== ОТОБРАЖЕНИЕ ==========
+
+def format_date(days: int, date_format: str = 'ДД.ММ.ГГГГ') -> str:
+    year, month, day = civil_from_days(days)
+    if date_format == 'ММ.ДД.ГГГГ':
+        return f"{month:02}.{day:02}.{year:04}"
+    if date_format == 'ГГГГ-ММ-ДД':
+        return f"{year:04}-{month:02}-{day:02}"
+    if date_format == 'ДД месяц ГГГГ':
+        return f"{day} {MONTHS_GENITIVE[month - 1]} {year}"
+    if date_format == 'день недели, ДД месяц ГГГГ':
+        # 01.01.1970 - четверг
+        return f"{WEEKDAYS[(days + 3) % 7]}, {day} {MONTHS_GENITIVE[month - 1]} {year}"
+    if date_format == 'ММ/ГГГГ':
+        return f"{month:02}/{year:04}"
+    if date_format == 'ГГГГ':
+        return f"{year:04}"
+    return f"{day:02}.{month:02}.{year:04}"
+
+
+def format_time(seconds: int, time_format: str = 'ЧЧ:ММ') -> str:
+    seconds %= SECONDS_PER_DAY
+    hour, minute, second = seconds // 3600, seconds // 60 % 60, seconds % 60
+    if time_format == 'ЧЧ:ММ:СС':
+        return f"{hour:02}:{minute:02}:{second:02}"
+    if time_format == 'ЧЧ:ММ AM/PM':
+        return f"{hour % 12 or 12:02}:{minute:02} {'AM' if hour < 12 else 'PM'}"
+    return f"{hour:02}:{minute:02}"
+
+
+def format_datetime(seconds: int, date_format: str = 'ДД.ММ.ГГГГ', time_format: str = 'ЧЧ:ММ') -> str:
+    days, rest = divmod(seconds, SECONDS_PER_DAY)
+    text = format_date(days, date_format)
+    if time_format == 'Без времени':
+        return text
+    return f"{text} {format_time(rest, time_format)}"
+
+
+def formatter(type_id: str, date_format: Optional[str] = None, time_format: Optional[str] = None):
+    """Функция отображения колонки; одинаковые даты форматируются один раз"""
+    date_format = date_format or 'ДД.ММ.ГГГГ'
+    if type_id == 'date':
+        cached = lru_cache(maxsize=4096)(lambda days: format_date(days, date_format))
+    elif type_id == 'time':
+        if time_format in (None, 'Без времени'):
+            time_format = 'ЧЧ:ММ'
+        cached = lru_cache(maxsize=4096)(lambda seconds: format_time(seconds, time_format))
+    else:
+        time_format = time_format or 'ЧЧ:ММ'
+        cached = lru_cache(maxsize=4096)(lambda seconds: format_datetime(seconds, date_format, time_format))
+
+    def format_value(stored):
+        if isinstance(stored, int):
+            return cached(stored)
+        return '' if stored is None else str(stored)
+    return format_value
+
+
+# ========== КОЛОНКИ ==========
+
+_PARTS = {'year': 0, 'month': 1, 'day': 2}
+
+
+def date_parts(values: List[Optional[int]], part: str, divisor: int = 1) -> List[Optional[int]]:
+    """
+    Год, месяц или день для колонки номеров дней (divisor=86400 -
+    для колонки секунд). Пустые значения остаются пустыми.
+    """
+    if numpy is not None and len(values) >= NUMPY_MIN_SIZE:
+        count = len(values)
+        present = numpy.fromiter((value is not None for value in values), dtype=bool, count=count)
+        raw = numpy.fromiter((value or 0 for value in values), dtype=numpy.int64, count=count)
+        days = (raw // divisor).astype('datetime64[D]')
+        if part == 'year':
+            result = days.astype('datetime64[Y]').astype(numpy.int64) + 1970
+        elif part == 'month':
+            result = days.astype('datetime64[M]').astype(numpy.int64) % 12 + 1
+        else:
+            result = (days - days.astype('datetime64[M]')).astype(numpy.int64) + 1
+        return [int(value) if ok else None for value, ok in zip(result.tolist(), present.tolist())]
+
+    index = _PARTS[part]
+    return [
+        None if value is None else civil_from_days(value // divisor)[index]
+        for value in values
+    ]
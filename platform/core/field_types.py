@@ -36,6 +36,32 @@ class FieldType:
     
     REFERENCE_TYPES = ["reference", "reference_multiple"]
     
+    # Имена типов в стиле перечисления, которые создаёт конструктор таблиц
+    ENUM_IDS = {
+        'TEXT': 'text',
+        'TEXT_MULTILINE': 'text_multiline',
+        'INTEGER': 'integer',
+        'FLOAT': 'float',
+        'DATE': 'date',
+        'TIME': 'time',
+        'DATETIME': 'datetime',
+        'BOOLEAN': 'boolean',
+        'LIST': 'list',
+        'REFERENCE': 'reference',
+        'PHONE': 'phone',
+        'EMAIL': 'email',
+        'MONEY': 'money',
+        'PERCENT': 'percent',
+        'FILE': 'file',
+        'IMAGE': 'image',
+        'COLOR': 'color',
+        'RATING': 'rating',
+        'CALCULATED': 'formula',
+    }
+    
+    TYPE_IDS = frozenset(type_id for _, _, _, type_id in TYPES)
+    BY_ID = {entry[3]: entry for entry in TYPES}
+    
     @classmethod
     def get_icon(cls, type_name: str) -> str:
         for icon, name, _, _ in cls.TYPES:
@@ -59,7 +85,19 @@ class FieldType:
     
     @classmethod
     def get_type_by_id(cls, type_id: str) -> tuple:
-        for icon, name, desc, tid in cls.TYPES:
-            if tid == type_id:
-                return (icon, name, desc, tid)
-        return ("📌", "Текст", "Неизвестный тип", "text")
\ No newline at end of file
+        return cls.BY_ID.get(type_id, ("📌", "Текст", "Неизвестный тип", "text"))
+    
+    @classmethod
+    def resolve_type_id(cls, field_data: dict) -> str:
+        """Определяет type_id поля по любому из встречающихся представлений типа"""
+        type_id = field_data.get('type_id')
+        if type_id in cls.TYPE_IDS:
+            return type_id
+        
+        value = field_data.get('type', 'text')
+        value = getattr(value, 'value', value)
+        if value in cls.TYPE_IDS:
+            return value
+        if value in cls.ENUM_IDS:
+            return cls.ENUM_IDS[value]
+        return cls.get_type_id(value)
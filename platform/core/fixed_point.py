@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+"""
+Денежные и процентные значения как целые числа с фиксированной точкой
+
+Значение хранится целым числом десятитысячных долей (SCALE знаков после
+запятой): 1234,5 ₽ -> 12345000. Сложение и сравнение - обычные операции
+над int, умножение и деление округляются «половина вверх» один раз.
+Число знаков в настройках поля (decimals) влияет только на отображение,
+поэтому его изменение не требует перезаписи колонки.
+"""
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any, Iterable, List, Optional
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+SCALE = 4
+FACTOR = 10 ** SCALE
+
+# Типы полей, которые хранятся с фиксированной точкой
+FIXED_TYPES = ('money', 'percent')
+
+# С какого размера колонки агрегаты считаются через numpy
+NUMPY_MIN_SIZE = 10000
+_INT64_MAX = 2 ** 63 - 1
+
+
+def div_round(a: int, b: int) -> int:
+    """Целочисленное деление с округлением половины от нуля"""
+    q, r = divmod(abs(a), abs(b))
+    if 2 * r >= abs(b):
+        q += 1
+    return q if (a >= 0) == (b > 0) else -q
+
+
+def to_units(value: Any) -> Optional[int]:
+    """
+    Значение пользователя (число, Decimal или строка вида «1 234,50 ₽»)
+    в целые доли. Целое число означает целые рубли/проценты.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"Не число: {value!r}")
+    if isinstance(value, int):
+        return value * FACTOR
+    if isinstance(value, float):
+        value = Decimal(repr(value))
+    elif isinstance(value, str):
+        text = value.replace(' ', '').replace(' ', '').replace(',', '.')
+        text = text.rstrip('₽$€%').strip()
+        try:
+            value = Decimal(text)
+        except InvalidOperation:
+            raise ValueError(f"Не число: {value!r}")
+    elif not isinstance(value, Decimal):
+        raise ValueError(f"Не число: {value!r}")
+    if not value.is_finite():
+        raise ValueError(f"Не число: {value!r}")
+    return int(value.scaleb(SCALE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_units_or_none(value: Any) -> Optional[int]:
+    """to_units для миграции: нечисловые значения становятся пустыми"""
+    try:
+        return to_units(value)
+    except ValueError:
+        return None
+
+
+def from_units(units: int) -> Decimal:
+    return Decimal(units).scaleb(-SCALE)
+
+
+def to_float(units: int) -> float:
+    return units / FACTOR
+
+
+def mul(a: int, b: int) -> int:
+    return div_round(a * b, FACTOR)
+
+
+def div(a: int, b: int) -> Optional[int]:
+    """Частное в долях; при делении на ноль - None"""
+    if b == 0:
+        return None
+    return div_round(a * FACTOR, b)
+
+
+def round_units(units: int, decimals: int) -> int:
+    """Округление до decimals знаков без выхода из целых чисел"""
+    if decimals >= SCALE:
+        return units
+    step = 10 ** (SCALE - max(decimals, 0))
+    return div_round(units, step) * step
+
+
+def format_units(units: int, decimals: int = 2, thousands: bool = True, suffix: str = "") -> str:
+    """«1 234,50 ₽» - без промежуточного float"""
+    rounded = round_units(units, decimals)
+    whole, fraction = divmod(abs(rounded), FACTOR)
+    text = f"{whole:,}".replace(',', ' ') if thousands else str(whole)
+    if decimals > 0:
+        text += ',' + str(fraction).zfill(SCALE)[:min(decimals, SCALE)].ljust(decimals, '0')
+    if rounded < 0:
+        text = '-' + text
+    return f"{text} {suffix}" if suffix else text
+
+
+def format_plain(units: int) -> str:
+    """Число без группировки и с точкой - для экспорта и смены типа на текст"""
+    text = f"{from_units(units):f}"
+    return text.rstrip('0').rstrip('.') if '.' in text else text
+
+
+# ========== АГРЕГАТЫ ПО КОЛОНКЕ ==========
+
+def _present(values: Iterable[Optional[int]]) -> List[int]:
+    return [value for value in values if value is not None]
+
+
+def sum_units(values: Iterable[Optional[int]]) -> int:
+    """
+    Точная сумма. Большие колонки суммируются в numpy int64, если
+    сумма гарантированно помещается в 64 бита; иначе - int Python.
+    """
+    values = _present(values)
+    if numpy is not None and len(values) >= NUMPY_MIN_SIZE:
+        array = numpy.fromiter(values, dtype=numpy.int64, count=len(values))
+        if int(numpy.abs(array).max()) * len(values) <= _INT64_MAX:
+            return int(array.sum(dtype=numpy.int64))
+    return sum(values)
+
+
+def avg_units(values: Iterable[Optional[int]]) -> Optional[int]:
+    values = _present(values)
+    if not values:
+        return None
+    return div_round(sum_units(values), len(values))
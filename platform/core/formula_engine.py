@@ -0,0 +1,997 @@
+# -*- coding: utf-8 -*-
+
+"""
+Вычисление формул вычисляемых полей
+
+Синтаксис - как в редакторе формул: [Поле], числа, строки в кавычках,
+операторы + - * / = <> > < >= <= &, функции SUM(...), ЕСЛИ(усл; да; нет),
+И, ИЛИ, НЕ(). Аргументы разделяются точкой с запятой, дробная часть
+числа отделяется точкой или запятой.
+
+Формула разбирается один раз и превращается в дерево замыканий: функция
+для каждого узла выбирается заранее по типам операндов. Деньги и проценты
+на всём пути вычисления остаются целыми долями (fixed_point). Пустое
+значение в арифметике даёт пустой результат. SUM/AVG/COUNT/MIN/MAX от
+одного поля считаются по всей колонке один раз на вычисление (с
+FormulaCache - один раз до изменения данных таблицы), а YEAR/MONTH/DAY
+от поля-даты - сразу для всех записей прохода.
+"""
+
+import datetime
+import math
+import operator
+import re
+import sys
+import threading
+from collections import OrderedDict
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from . import date_codec, fixed_point, list_codec
+from .fixed_point import FACTOR
+from .memory import accountant, deep_size, sampled_size
+from .tracing import span
+
+
+class FormulaError(ValueError):
+    """Ошибка в тексте формулы"""
+
+    def __init__(self, message: str, position: Optional[int] = None):
+        super().__init__(message if position is None else f"{message} (позиция {position + 1})")
+        self.position = position
+
+
+# Тип значения в формуле по типу поля; остальные поля - текст
+FIELD_KINDS = {
+    'integer': 'int',
+    'rating': 'int',
+    'float': 'float',
+    'money': 'fixed',
+    'percent': 'percent',
+    'boolean': 'bool',
+    'date': 'date',
+    'time': 'time',
+    'datetime': 'datetime',
+    'formula': 'any',
+}
+
+# Тип поля для отображения результата формулы
+RESULT_TYPE_IDS = {
+    'int': 'integer', 'fixed': 'money', 'percent': 'percent', 'float': 'float', 'bool': 'boolean',
+    'date': 'date', 'time': 'time', 'datetime': 'datetime',
+}
+
+# percent - значение поля «Процент» как хранится: доли целых процентов (20% -> 200000).
+# В арифметику и сравнения оно входит долей единицы (fixed: 20% -> 0,2)
+NUMERIC = ('int', 'fixed', 'percent', 'float')
+DATES = ('date', 'time', 'datetime')
+_RANK = {'int': 0, 'fixed': 1, 'float': 2}
+PERCENT_FACTOR = 100
+
+
+class Node:
+    """Узел скомпилированной формулы: тип результата и функция (запись, контекст) -> значение"""
+
+    __slots__ = ('kind', 'fn', 'field_id', 'const', 'value')
+
+    def __init__(self, kind: str, fn: Callable, field_id: Optional[str] = None):
+        self.kind = kind
+        self.fn = fn
+        self.field_id = field_id
+        self.const = False
+        self.value = None
+
+
+def constant(kind: str, value: Any) -> Node:
+    node = Node(kind, lambda record, context: value)
+    node.const = True
+    node.value = value
+    return node
+
+
+class FormulaContext:
+    """
+    Данные для одного прохода вычисления: колонки, готовые агрегаты и,
+    при вычислении набора записей, сами записи и номер текущей.
+    column_aggregates - агрегаты по колонкам, общие для нескольких
+    проходов (см. FormulaCache); без него они живут один проход.
+    """
+
+    def __init__(self, column_source: Optional[Callable[[str], List]] = None,
+                 records: Optional[List] = None, column_aggregates: Optional[Dict] = None):
+        self.column_source = column_source
+        self.columns: Dict[str, List] = {}
+        self.aggregates: Dict[Any, Any] = {}
+        self.column_aggregates = self.aggregates if column_aggregates is None else column_aggregates
+        self.records = records
+        self.local_columns: Dict[str, List] = {}
+        self.row = 0
+
+    def column(self, field_id: str) -> List:
+        values = self.columns.get(field_id)
+        if values is None:
+            if self.column_source is None:
+                raise FormulaError("Для агрегата по колонке нужны данные всей таблицы")
+            values = self.columns[field_id] = list(self.column_source(field_id))
+        return values
+
+    def local_column(self, field_id: str) -> List:
+        """Значения поля в записях текущего прохода (в их порядке)"""
+        values = self.local_columns.get(field_id)
+        if values is None:
+            values = self.local_columns[field_id] = [record.get(field_id) for record in self.records]
+        return values
+
+    def aggregate(self, key: Any, compute: Callable[[], Any]) -> Any:
+        if key not in self.aggregates:
+            self.aggregates[key] = compute()
+        return self.aggregates[key]
+
+    def column_aggregate(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        """Агрегат по всей колонке; key - (функция, field_id)"""
+        if key not in self.column_aggregates:
+            self.column_aggregates[key] = compute()
+        return self.column_aggregates[key]
+
+
+# ========== ПРИВЕДЕНИЕ ТИПОВ ==========
+
+def _any_to_fixed(value):
+    return fixed_point.to_units_or_none(value)
+
+
+def _any_to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _any_to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+_CONVERT = {
+    ('int', 'fixed'): lambda value: value * FACTOR,
+    ('int', 'float'): float,
+    ('fixed', 'float'): fixed_point.to_float,
+    ('percent', 'fixed'): lambda units: fixed_point.div_round(units, PERCENT_FACTOR),
+    ('percent', 'float'): lambda units: units / (FACTOR * PERCENT_FACTOR),
+    ('any', 'fixed'): _any_to_fixed,
+    ('any', 'float'): _any_to_float,
+    ('any', 'int'): _any_to_int,
+    ('date', 'datetime'): lambda days: days * date_codec.SECONDS_PER_DAY,
+    ('any', 'date'): date_codec.stored_converter('date'),
+    ('any', 'datetime'): date_codec.stored_converter('datetime'),
+}
+
+
+def _float_text(value: float) -> str:
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+_TEXT = {
+    'int': str,
+    'fixed': fixed_point.format_plain,
+    'percent': fixed_point.format_plain,
+    'float': _float_text,
+    'bool': lambda value: 'Да' if value else 'Нет',
+    'date': date_codec.format_date,
+    'time': date_codec.format_time,
+    'datetime': date_codec.format_datetime,
+    'any': str,
+}
+
+
+def _map(node: Node, kind: str, func: Callable) -> Node:
+    """Узел, применяющий func к непустому результату node"""
+    if node.const:
+        return constant(kind, None if node.value is None else func(node.value))
+    fn = node.fn
+
+    def evaluate(record, context):
+        value = fn(record, context)
+        return None if value is None else func(value)
+    return Node(kind, evaluate)
+
+
+def coerce(node: Node, kind: str) -> Node:
+    if node.kind == kind:
+        return node
+    convert = _CONVERT.get((node.kind, kind))
+    if convert is None:
+        raise FormulaError(f"Нельзя привести значение типа {node.kind} к {kind}")
+    return _map(node, kind, convert)
+
+
+def to_text(node: Node) -> Node:
+    if node.kind == 'text':
+        return node
+    text = _map(node, 'text', _TEXT[node.kind])
+    if text.const:
+        return constant('text', text.value or '')
+    fn = text.fn
+    return Node('text', lambda record, context: fn(record, context) or '')
+
+
+def to_bool(node: Node) -> Node:
+    if node.kind == 'bool':
+        return node
+    fn = node.fn
+    return Node('bool', lambda record, context: bool(fn(record, context)))
+
+
+def common_numeric(nodes: List[Node]) -> str:
+    """Общий тип операндов; проценты считаются долями (fixed)"""
+    kinds = {node.kind for node in nodes}
+    if 'any' in kinds:
+        return 'any'
+    if not kinds <= set(NUMERIC):
+        raise FormulaError("Ожидается число")
+    return max(('fixed' if kind == 'percent' else kind for kind in kinds), key=_RANK.get)
+
+
+# ========== ОПЕРАТОРЫ ==========
+
+def _float_div(a, b):
+    return None if b == 0 else a / b
+
+
+def _any_arith(op):
+    func = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': _float_div}[op]
+
+    def apply(a, b):
+        try:
+            return func(a, b)
+        except TypeError:
+            return None
+    return apply
+
+
+_ARITH = {
+    'int': {'+': operator.add, '-': operator.sub, '*': operator.mul},
+    'fixed': {'+': operator.add, '-': operator.sub, '*': fixed_point.mul, '/': fixed_point.div},
+    'float': {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': _float_div},
+    'any': {op: _any_arith(op) for op in '+-*/'},
+}
+
+_COMPARE = {
+    '=': operator.eq, '<>': operator.ne,
+    '>': operator.gt, '<': operator.lt,
+    '>=': operator.ge, '<=': operator.le,
+}
+
+
+def _binary(kind: str, func: Callable, left: Node, right: Node) -> Node:
+    if left.const and right.const:
+        if left.value is None or right.value is None:
+            return constant(kind, None)
+        return constant(kind, func(left.value, right.value))
+    lf, rf = left.fn, right.fn
+
+    def evaluate(record, context):
+        a = lf(record, context)
+        if a is None:
+            return None
+        b = rf(record, context)
+        if b is None:
+            return None
+        return func(a, b)
+    return Node(kind, evaluate)
+
+
+def _date_arithmetic(op: str, left: Node, right: Node) -> Node:
+    """
+    Дата ± целое - сдвиг на дни; разность дат - число дней
+    (целое для дат, дробное для дат со временем).
+    """
+    day = date_codec.SECONDS_PER_DAY
+    if op == '+' and left.kind == 'int' and right.kind in DATES:
+        left, right = right, left
+
+    if op in '+-' and left.kind in ('date', 'datetime') and right.kind in ('int', 'fixed'):
+        # Дате - целые дни, дате со временем - дни с дробной частью в секундах
+        if left.kind == 'date':
+            to_offset = (lambda days: days) if right.kind == 'int' else (
+                lambda units: fixed_point.div_round(units, fixed_point.FACTOR))
+        else:
+            to_offset = (lambda days: days * day) if right.kind == 'int' else (
+                lambda units: fixed_point.div_round(units * day, fixed_point.FACTOR))
+        offset = _map(right, 'int', to_offset)
+        return _binary(left.kind, operator.add if op == '+' else operator.sub, left, offset)
+
+    if op == '-' and left.kind in DATES and right.kind in DATES:
+        if left.kind == right.kind == 'date':
+            return _binary('int', operator.sub, left, right)
+        if left.kind == right.kind == 'time':
+            return _binary('int', operator.sub, left, right)
+        if 'time' in (left.kind, right.kind):
+            raise FormulaError("Нельзя вычитать время и дату")
+        left, right = coerce(left, 'datetime'), coerce(right, 'datetime')
+        return _binary('fixed', lambda a, b: fixed_point.div_round((a - b) * fixed_point.FACTOR, day), left, right)
+
+    raise FormulaError(f"Операция {op} неприменима к датам")
+
+
+def arithmetic(op: str, left: Node, right: Node) -> Node:
+    if left.kind in DATES or right.kind in DATES:
+        return _date_arithmetic(op, left, right)
+    kind = common_numeric([left, right])
+    if op == '/' and kind == 'int':
+        # Частное целых - с фиксированной точкой, без потери точности во float
+        kind = 'fixed'
+    if kind != 'any':
+        left, right = coerce(left, kind), coerce(right, kind)
+    return _binary(kind, _ARITH[kind][op], left, right)
+
+
+def compare(op: str, left: Node, right: Node) -> Node:
+    func = _COMPARE[op]
+    # Дата сравнивается с текстом-константой: [Дата] > "01.01.2024"
+    if left.kind in DATES and right.const and right.kind == 'text':
+        right = constant(left.kind, date_codec.to_stored(right.value, left.kind))
+    elif right.kind in DATES and left.const and left.kind == 'text':
+        left = constant(right.kind, date_codec.to_stored(left.value, right.kind))
+
+    kinds = {left.kind, right.kind}
+    if kinds == {'date', 'datetime'}:
+        left, right = coerce(left, 'datetime'), coerce(right, 'datetime')
+    elif kinds <= set(NUMERIC):
+        kind = common_numeric([left, right])
+        left, right = coerce(left, kind), coerce(right, kind)
+    elif 'any' in kinds:
+        inner = func
+
+        def func(a, b):
+            try:
+                return inner(a, b)
+            except TypeError:
+                return None
+    elif len(kinds) > 1:
+        raise FormulaError("Сравнение значений разных типов")
+    return _binary('bool', func, left, right)
+
+
+def concat(left: Node, right: Node) -> Node:
+    return _binary('text', operator.add, to_text(left), to_text(right))
+
+
+def logical(op: str, left: Node, right: Node) -> Node:
+    lf, rf = to_bool(left).fn, to_bool(right).fn
+    if op == 'И':
+        return Node('bool', lambda record, context: lf(record, context) and rf(record, context))
+    return Node('bool', lambda record, context: lf(record, context) or rf(record, context))
+
+
+def negate(node: Node) -> Node:
+    if node.kind not in NUMERIC and node.kind != 'any':
+        raise FormulaError("Ожидается число")
+    return _map(node, node.kind, operator.neg)
+
+
+# ========== ФУНКЦИИ ==========
+
+# Имя функции -> построитель узла по узлам аргументов
+FUNCTIONS: Dict[str, Callable[[List[Node]], Node]] = {}
+
+
+def register_function(name: str, builder: Callable[[List[Node]], Node], *aliases: str):
+    """Регистрирует функцию формул (имя без учёта регистра)"""
+    for key in (name,) + aliases:
+        FUNCTIONS[key.upper()] = builder
+
+
+def _arity(name: str, args: List[Node], low: int, high: int):
+    if not low <= len(args) <= high:
+        raise FormulaError(f"{name}: неверное число аргументов")
+
+
+def _present(values: Iterable) -> List:
+    return [value for value in values if value is not None]
+
+
+def _sum(kind: str, values: List):
+    if kind == 'float':
+        return math.fsum(values)
+    if kind == 'any':
+        return sum(value for value in values if isinstance(value, (int, float)))
+    return fixed_point.sum_units(values)
+
+
+def _avg(kind: str, values: List):
+    if not values:
+        return None
+    if kind == 'int':
+        return fixed_point.div_round(fixed_point.sum_units(values) * FACTOR, len(values))
+    if kind in ('fixed', 'percent'):
+        return fixed_point.avg_units(values)
+    total = _sum(kind, values)
+    return total / len(values)
+
+
+_AGGREGATES = {
+    'SUM': (lambda kind: kind, lambda kind, values: _sum(kind, values)),
+    'AVG': (lambda kind: 'fixed' if kind == 'int' else kind, _avg),
+    'MIN': (lambda kind: kind, lambda kind, values: min(values) if values else None),
+    'MAX': (lambda kind: kind, lambda kind, values: max(values) if values else None),
+    'COUNT': (lambda kind: 'int', lambda kind, values: len(values)),
+}
+
+
+def _aggregate_builder(name: str):
+    result_kind, compute = _AGGREGATES[name]
+
+    def build(args: List[Node]) -> Node:
+        if not args:
+            raise FormulaError(f"{name}: нужен хотя бы один аргумент")
+
+        if len(args) == 1 and args[0].field_id is not None:
+            # По колонке: один раз на проход вычисления
+            field = args[0]
+            # Агрегат колонки процентов - тоже процент (в хранимых долях)
+            kind = field.kind if name == 'COUNT' or field.kind == 'percent' else common_numeric([field])
+            field_id = field.field_id
+            key = (name, field_id)
+
+            def evaluate(record, context):
+                return context.column_aggregate(key, lambda: compute(kind, _present(context.column(field_id))))
+            return Node(result_kind(kind), evaluate)
+
+        # По аргументам в пределах записи
+        if name == 'COUNT':
+            fns = [arg.fn for arg in args]
+            return Node('int', lambda record, context: sum(fn(record, context) is not None for fn in fns))
+        kind = common_numeric(args)
+        fns = [coerce(arg, kind).fn if kind != 'any' else arg.fn for arg in args]
+        return Node(result_kind(kind), lambda record, context: compute(
+            kind, _present(fn(record, context) for fn in fns)
+        ))
+    return build
+
+
+for _name in _AGGREGATES:
+    register_function(_name, _aggregate_builder(_name))
+
+
+def _round_float(value: float, decimals: int) -> float:
+    quantum = Decimal(1).scaleb(-decimals)
+    return float(Decimal(repr(value)).quantize(quantum, rounding=ROUND_HALF_UP))
+
+
+def _round_int(value: int, decimals: int) -> int:
+    if decimals >= 0:
+        return value
+    step = 10 ** -decimals
+    return fixed_point.div_round(value, step) * step
+
+
+def _build_round(args: List[Node]) -> Node:
+    _arity('ROUND', args, 1, 2)
+    decimals = 0
+    if len(args) == 2:
+        if not args[1].const or args[1].kind != 'int':
+            raise FormulaError("ROUND: число знаков должно быть целым числом")
+        decimals = args[1].value
+    kind = common_numeric(args[:1])
+    value = coerce(args[0], kind) if kind != 'any' else args[0]
+    if kind == 'fixed':
+        return _map(value, kind, lambda units: fixed_point.round_units(units, decimals))
+    if kind == 'int':
+        return _map(value, kind, lambda number: _round_int(number, decimals))
+    return _map(value, kind, lambda number: _round_float(number, decimals))
+
+
+def _build_abs(args: List[Node]) -> Node:
+    _arity('ABS', args, 1, 1)
+    common_numeric(args)
+    return _map(args[0], args[0].kind, abs)
+
+
+def _text_function(name: str, func: Callable[[str], Any], kind: str = 'text'):
+    def build(args: List[Node]) -> Node:
+        _arity(name, args, 1, 1)
+        fn = to_text(args[0]).fn
+        return Node(kind, lambda record, context: func(fn(record, context)))
+    return build
+
+
+def _int_argument(node: Node) -> Node:
+    if node.kind == 'percent':
+        node = coerce(node, 'fixed')
+    if node.kind == 'fixed':
+        return _map(node, 'int', lambda units: fixed_point.div_round(units, FACTOR))
+    if node.kind == 'float':
+        return _map(node, 'int', lambda value: int(_round_float(value, 0)))
+    return coerce(node, 'int')
+
+
+def _build_left_right(name: str):
+    def build(args: List[Node]) -> Node:
+        _arity(name, args, 1, 2)
+        text = to_text(args[0]).fn
+        count = _int_argument(args[1]).fn if len(args) == 2 else (lambda record, context: 1)
+
+        def evaluate(record, context):
+            value, n = text(record, context), count(record, context)
+            if n is None:
+                return None
+            n = max(n, 0)
+            return value[:n] if name == 'LEFT' else (value[-n:] if n else '')
+        return Node('text', evaluate)
+    return build
+
+
+def _build_mid(args: List[Node]) -> Node:
+    _arity('MID', args, 3, 3)
+    text = to_text(args[0]).fn
+    start, count = _int_argument(args[1]).fn, _int_argument(args[2]).fn
+
+    def evaluate(record, context):
+        value, first, n = text(record, context), start(record, context), count(record, context)
+        if first is None or n is None:
+            return None
+        first = max(first, 1) - 1
+        return value[first:first + max(n, 0)]
+    return Node('text', evaluate)
+
+
+def _build_if(args: List[Node]) -> Node:
+    _arity('ЕСЛИ', args, 2, 3)
+    condition = to_bool(args[0]).fn
+    branches = args[1:] if len(args) == 3 else [args[1], constant(args[1].kind, None)]
+
+    kinds = {branch.kind for branch in branches}
+    if len(kinds) == 1:
+        kind = kinds.pop()
+    elif kinds <= set(NUMERIC):
+        kind = common_numeric(branches)
+        branches = [coerce(branch, kind) for branch in branches]
+    else:
+        kind = 'any'
+    yes, no = branches[0].fn, branches[1].fn
+
+    def evaluate(record, context):
+        return yes(record, context) if condition(record, context) else no(record, context)
+    return Node(kind, evaluate)
+
+
+def _build_not(args: List[Node]) -> Node:
+    _arity('НЕ', args, 1, 1)
+    fn = to_bool(args[0]).fn
+    return Node('bool', lambda record, context: not fn(record, context))
+
+
+def _date_part_builder(name: str, part: str):
+    index = {'year': 0, 'month': 1, 'day': 2}[part]
+
+    def build(args: List[Node]) -> Node:
+        _arity(name, args, 1, 1)
+        arg = args[0]
+        if arg.kind == 'text' and arg.const:
+            arg = constant('date', date_codec.to_stored(arg.value, 'date'))
+        if arg.kind not in ('date', 'datetime', 'any'):
+            raise FormulaError(f"{name}: ожидается дата")
+
+        divisor = date_codec.SECONDS_PER_DAY if arg.kind == 'datetime' else 1
+        if arg.kind == 'any':
+            arg = coerce(arg, 'date')
+
+        def scalar(value):
+            return date_codec.civil_from_days(value // divisor)[index]
+
+        if arg.field_id is None:
+            return _map(arg, 'int', scalar)
+
+        # Поле-дата: часть даты считается сразу для всех записей прохода
+        field_id, key, get = arg.field_id, id(arg), arg.fn
+
+        def evaluate(record, context):
+            if context.records is None:
+                value = get(record, context)
+                return None if value is None else scalar(value)
+            column = context.aggregate(
+                key, lambda: date_codec.date_parts(context.local_column(field_id), part, divisor)
+            )
+            return column[context.row]
+        return Node('int', evaluate)
+    return build
+
+
+def _now_builder(kind: str):
+    def build(args: List[Node]) -> Node:
+        if args:
+            raise FormulaError("NOW: функция без аргументов")
+        key = object()
+
+        def current():
+            now = datetime.datetime.now().replace(microsecond=0)
+            return date_codec.datetime_to_seconds(now) if kind == 'datetime' else date_codec.date_to_days(now.date())
+
+        # Одно значение на весь проход, чтобы у всех записей было одинаковое «сейчас»
+        return Node(kind, lambda record, context: context.aggregate(id(key), current))
+    return build
+
+
+register_function('YEAR', _date_part_builder('YEAR', 'year'), 'ГОД')
+register_function('MONTH', _date_part_builder('MONTH', 'month'), 'МЕСЯЦ')
+register_function('DAY', _date_part_builder('DAY', 'day'), 'ДЕНЬ')
+register_function('NOW', _now_builder('datetime'), 'ТДАТА')
+register_function('TODAY', _now_builder('date'), 'СЕГОДНЯ')
+register_function('ROUND', _build_round)
+register_function('ABS', _build_abs)
+register_function('UPPER', _text_function('UPPER', str.upper))
+register_function('LOWER', _text_function('LOWER', str.lower))
+register_function('PROPER', _text_function('PROPER', str.title))
+register_function('TRIM', _text_function('TRIM', lambda value: ' '.join(value.split())))
+register_function('LEN', _text_function('LEN', len, kind='int'))
+register_function('LEFT', _build_left_right('LEFT'))
+register_function('RIGHT', _build_left_right('RIGHT'))
+register_function('MID', _build_mid)
+register_function('ЕСЛИ', _build_if, 'IF')
+register_function('НЕ', _build_not, 'NOT')
+
+
+# ========== РАЗБОР ==========
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<field>\[[^\]]*\])
+      | (?P<number>\d+(?:[.,]\d+)?)
+      | (?P<string>"[^"]*")
+      | (?P<op><>|>=|<=|[-+*/=<>&();])
+      | (?P<name>[^\W\d]\w*)
+    )""", re.VERBOSE)
+
+
+def tokenize(text: str) -> List[tuple]:
+    tokens = []
+    position = 0
+    end = len(text.rstrip())
+    while position < end:
+        match = _TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise FormulaError("Непонятный символ", position)
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind), match.start(kind)))
+        position = match.end()
+    tokens.append(('end', '', end))
+    return tokens
+
+
+class _Parser:
+    """Рекурсивный спуск; приоритет: ИЛИ < И < сравнение < & < + - < * / < унарный минус"""
+
+    def __init__(self, engine: 'FormulaEngine', text: str):
+        self.engine = engine
+        self.tokens = tokenize(text)
+        self.index = 0
+        self.fields: List[str] = []
+
+    def peek(self):
+        return self.tokens[self.index]
+
+    def take(self):
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def accept(self, kind: str, value: Optional[str] = None) -> bool:
+        token_kind, token_value, _ = self.peek()
+        if token_kind == kind and (value is None or token_value.upper() == value):
+            self.index += 1
+            return True
+        return False
+
+    def expect(self, value: str):
+        if not self.accept('op', value):
+            raise FormulaError(f"Ожидается «{value}»", self.peek()[2])
+
+    def parse(self) -> Node:
+        node = self.parse_or()
+        if self.peek()[0] != 'end':
+            raise FormulaError("Лишний текст в формуле", self.peek()[2])
+        return node
+
+    def parse_or(self) -> Node:
+        node = self.parse_and()
+        while self.accept('name', 'ИЛИ'):
+            node = logical('ИЛИ', node, self.parse_and())
+        return node
+
+    def parse_and(self) -> Node:
+        node = self.parse_comparison()
+        while self.accept('name', 'И'):
+            node = logical('И', node, self.parse_comparison())
+        return node
+
+    def parse_comparison(self) -> Node:
+        node = self.parse_concat()
+        kind, value, _ = self.peek()
+        if kind == 'op' and value in _COMPARE:
+            self.take()
+            node = compare(value, node, self.parse_concat())
+        return node
+
+    def parse_concat(self) -> Node:
+        node = self.parse_additive()
+        while self.accept('op', '&'):
+            node = concat(node, self.parse_additive())
+        return node
+
+    def parse_additive(self) -> Node:
+        node = self.parse_term()
+        while self.peek()[0] == 'op' and self.peek()[1] in '+-':
+            op = self.take()[1]
+            node = arithmetic(op, node, self.parse_term())
+        return node
+
+    def parse_term(self) -> Node:
+        node = self.parse_unary()
+        while self.peek()[0] == 'op' and self.peek()[1] in '*/':
+            op = self.take()[1]
+            node = arithmetic(op, node, self.parse_unary())
+        return node
+
+    def parse_unary(self) -> Node:
+        if self.accept('op', '-'):
+            return negate(self.parse_unary())
+        if self.accept('op', '+'):
+            return self.parse_unary()
+        return self.parse_primary()
+
+    def parse_primary(self) -> Node:
+        kind, value, position = self.take()
+
+        if kind == 'number':
+            if ',' in value or '.' in value:
+                return constant('fixed', fixed_point.to_units(value))
+            return constant('int', int(value))
+
+        if kind == 'string':
+            return constant('text', value[1:-1])
+
+        if kind == 'field':
+            node = self.engine.field_node(value[1:-1].strip(), position)
+            self.fields.append(node.field_id)
+            return node
+
+        if kind == 'op' and value == '(':
+            node = self.parse_or()
+            self.expect(')')
+            return node
+
+        if kind == 'name':
+            builder = FUNCTIONS.get(value.upper())
+            if builder is None:
+                raise FormulaError(f"Неизвестная функция {value}", position)
+            self.expect('(')
+            args = []
+            if not self.accept('op', ')'):
+                args.append(self.parse_or())
+                while self.accept('op', ';'):
+                    args.append(self.parse_or())
+                self.expect(')')
+            try:
+                return builder(args)
+            except FormulaError as e:
+                raise FormulaError(str(e), position) if e.position is None else e
+
+        raise FormulaError("Ожидается значение", position)
+
+
+# ========== ФОРМУЛЫ ТАБЛИЦЫ ==========
+
+class Formula:
+    """Скомпилированная формула"""
+
+    def __init__(self, text: str, node: Node, fields: List[str]):
+        self.text = text
+        self.kind = node.kind
+        self.fields = fields
+        self._fn = node.fn
+
+    @property
+    def result_type_id(self) -> str:
+        """Тип поля, в котором показывается результат"""
+        return RESULT_TYPE_IDS.get(self.kind, 'text')
+
+    def as_text(self, value: Any) -> Optional[str]:
+        """Результат в виде текста - так он хранится в колонке вычисляемого поля"""
+        if value is None:
+            return None
+        return _TEXT.get(self.kind, str)(value)
+
+    def evaluate(self, record, context: Optional[FormulaContext] = None) -> Any:
+        """Значение для одной записи (Row или словаря по id полей)"""
+        return self._fn(record, context or FormulaContext())
+
+    def evaluate_all(self, records: Iterable, column_source: Optional[Callable[[str], List]] = None,
+                     column_aggregates: Optional[Dict] = None) -> List:
+        """
+        Значения для набора записей. Агрегаты по колонкам считаются по
+        этим же записям или, если передан column_source, по всей таблице
+        (и сохраняются в column_aggregates, если он передан).
+        """
+        records = records if isinstance(records, list) else list(records)
+        if column_source is None:
+            column_source = lambda field_id: [record.get(field_id) for record in records]
+        context = FormulaContext(column_source, records, column_aggregates)
+        fn = self._fn
+        results = []
+        with span('formula.evaluate_all', formula=self.text, records=len(records)):
+            for row, record in enumerate(records):
+                context.row = row
+                results.append(fn(record, context))
+        return results
+
+
+class FormulaEngine:
+    """Компилятор формул для полей одной таблицы (или без таблицы - для проверки синтаксиса)"""
+
+    def __init__(self, table=None):
+        self.table = table
+        self.by_name: Dict[str, Any] = {}
+        if table is not None:
+            for field in table.fields:
+                for name in (field.id, field.name_en, field.name_ru):
+                    if name:
+                        self.by_name.setdefault(name.lower(), field)
+        self._compiled: Dict[str, Formula] = {}
+
+    def field_node(self, name: str, position: int) -> Node:
+        if self.table is None:
+            return Node('any', lambda record, context: record.get(name), field_id=name)
+
+        field = self.by_name.get(name.lower())
+        if field is None:
+            raise FormulaError(f"Нет поля [{name}]", position)
+
+        field_id = field.id
+        kind = FIELD_KINDS.get(field.type_id, 'text')
+        if field.type_id == 'list':
+            # В записи - код варианта, в формуле - его подпись
+            decode = list_codec.decoder(field)
+
+            def get(record, context):
+                value = decode(record.get(field_id))
+                return '' if value is None else str(value)
+        elif kind == 'text':
+            def get(record, context):
+                value = record.get(field_id)
+                return '' if value is None else str(value)
+        elif kind == 'bool':
+            def get(record, context):
+                value = record.get(field_id)
+                return None if value is None else bool(value)
+        else:
+            def get(record, context):
+                return record.get(field_id)
+        return Node(kind, get, field_id=field_id)
+
+    def compile(self, text: str) -> Formula:
+        formula = self._compiled.get(text)
+        if formula is None:
+            parser = _Parser(self, text)
+            node = parser.parse()
+            formula = self._compiled[text] = Formula(text, node, parser.fields)
+        return formula
+
+
+# ========== КЭШ ==========
+
+class FormulaCache:
+    """
+    Колонки таблиц и агрегаты по ним между вычислениями. Пересчёт
+    нескольких вычисляемых полей читает каждую колонку один раз, а SUM и
+    другие агрегаты по колонке считаются один раз, а не на каждый пакет
+    записей. Результаты вычисляемого поля кладутся сюда же (store) как его
+    новая колонка - зависимая формула не перечитывает их из базы. При
+    изменении данных таблица (или колонка) сбрасывается через invalidate();
+    при нехватке памяти давние колонки вытесняются.
+    """
+
+    def __init__(self, max_columns: int = 64):
+        self.max_columns = max_columns
+        self.columns: OrderedDict = OrderedDict()          # (table_id, field_id) -> значения
+        self.aggregates: Dict[str, Dict[tuple, Any]] = {}  # table_id -> {(функция, field_id): значение}
+        # Растёт при каждом изменении данных: результаты, посчитанные до него, не сохраняются
+        self.generation = 0
+        self.lock = threading.Lock()
+        accountant.register(self, "Колонки и агрегаты формул", 'formulas', FormulaCache.memory_usage,
+                            trim=FormulaCache.trim, details=FormulaCache.memory_details)
+
+    def column(self, table_id: str, field_id: str, load: Callable[[], List]) -> List:
+        key = (table_id, field_id)
+        with self.lock:
+            values = self.columns.get(key)
+            if values is not None:
+                self.columns.move_to_end(key)
+                accountant.touch(self, "Колонки и агрегаты формул")
+                return values
+        values = list(load())
+        with self.lock:
+            self._put(key, values)
+        accountant.touch(self, "Колонки и агрегаты формул")
+        return values
+
+    def store(self, table_id: str, field_id: str, values: List, generation: int):
+        """
+        Новые значения колонки (результаты вычисляемого поля в порядке id
+        записей). generation - значение self.generation до начала расчёта:
+        если данные за это время менялись, результаты не сохраняются.
+        """
+        with self.lock:
+            self.columns.pop((table_id, field_id), None)
+            self._evict(table_id, field_id)
+            if generation == self.generation:
+                self._put((table_id, field_id), values)
+        accountant.touch(self, "Колонки и агрегаты формул")
+
+    def _put(self, key: tuple, values: List):
+        self.columns[key] = values
+        while len(self.columns) > self.max_columns:
+            self._evict(*self.columns.popitem(last=False)[0])
+
+    def table_aggregates(self, table_id: str) -> Dict[tuple, Any]:
+        """Словарь агрегатов таблицы - для Formula.evaluate_all(column_aggregates=...)"""
+        with self.lock:
+            return self.aggregates.setdefault(table_id, {})
+
+    def _evict(self, table_id: str, field_id: str):
+        # Агрегаты зависят от колонки - уходят вместе с ней
+        aggregates = self.aggregates.get(table_id)
+        if aggregates:
+            for key in [key for key in aggregates if key[1] == field_id]:
+                del aggregates[key]
+
+    def invalidate(self, table_id: str, field_id: Optional[str] = None):
+        with self.lock:
+            if field_id is None:
+                self.generation += 1
+            for key in [key for key in self.columns if key[0] == table_id and field_id in (None, key[1])]:
+                del self.columns[key]
+            if field_id is None:
+                self.aggregates.pop(table_id, None)
+            else:
+                self._evict(table_id, field_id)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.columns.clear()
+            self.aggregates.clear()
+
+    def memory_details(self) -> List[tuple]:
+        with self.lock:
+            columns = list(self.columns.items())
+            aggregates = list(self.aggregates.items())
+        sizes: Dict[str, int] = {}
+        for (table_id, _), values in columns:
+            sizes[table_id] = sizes.get(table_id, 0) + sys.getsizeof(values) + sampled_size(values)
+        for table_id, values in aggregates:
+            sizes[table_id] = sizes.get(table_id, 0) + deep_size(values)
+        return list(sizes.items())
+
+    def memory_usage(self) -> tuple:
+        return sum(size for _, size in self.memory_details()), len(self.columns)
+
+    def trim(self, target_bytes: int):
+        """Вытесняет давно не использованные колонки (с их агрегатами)"""
+        total, _ = self.memory_usage()
+        with self.lock:
+            while self.columns and total > target_bytes:
+                (table_id, field_id), values = self.columns.popitem(last=False)
+                self._evict(table_id, field_id)
+                total -= sys.getsizeof(values) + sampled_size(values)
+
+
+def check_syntax(text: str) -> Optional[str]:
+    """Текст ошибки или None, если формула разбирается"""
+    try:
+        FormulaEngine().compile(text)
+    except FormulaError as e:
+        return str(e)
+    return None
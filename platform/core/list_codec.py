@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+Словарное кодирование полей «Список»
+
+Варианты списка хранятся в определении поля: options - подписи,
+option_codes - постоянные целые коды тех же вариантов. В записях лежит
+только код, поэтому переименование варианта меняет одну строку в схеме,
+а фильтры и группировки сравнивают целые числа. Код удалённого варианта
+не выдаётся повторно (option_next_code), чтобы старые записи не получили
+чужую подпись.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+def ensure_codes(field) -> List[int]:
+    """Коды вариантов поля; у старых полей назначаются по порядку с 1"""
+    options = field.get('options') or []
+    codes = field.get('option_codes')
+    if not codes or len(codes) != len(options):
+        codes = list(range(1, len(options) + 1))
+        field['option_codes'] = codes
+        field['option_next_code'] = len(options) + 1
+    elif 'option_next_code' not in field:
+        field['option_next_code'] = max(codes, default=0) + 1
+    return codes
+
+
+def set_options(field, labels: List[str]):
+    """
+    Новый список подписей с сохранением кодов: совпадающие подписи
+    сохраняют код, изменённая подпись на месте удалённой - переименование
+    (тот же код), остальные получают новые коды.
+    """
+    old_labels = list(field.get('options') or [])
+    old_codes = ensure_codes(field)
+    next_code = field.get('option_next_code', max(old_codes, default=0) + 1)
+
+    by_label = {}
+    for label, code in zip(old_labels, old_codes):
+        by_label.setdefault(label, code)
+
+    used = set()
+    codes: List[Optional[int]] = []
+    for label in labels:
+        code = by_label.get(label)
+        if code is not None and code not in used:
+            used.add(code)
+            codes.append(code)
+        else:
+            codes.append(None)
+
+    for index, code in enumerate(codes):
+        if code is not None:
+            continue
+        renamed = old_codes[index] if index < len(old_codes) else None
+        if renamed is not None and renamed not in used and old_labels[index] not in labels:
+            code = renamed
+        else:
+            code = next_code
+            next_code += 1
+        used.add(code)
+        codes[index] = code
+
+    field['options'] = list(labels)
+    field['option_codes'] = codes
+    field['option_next_code'] = next_code
+
+
+def add_options(field, labels: Iterable[str]):
+    """Добавляет недостающие подписи в конец списка (например, при смене типа на список)"""
+    options = list(field.get('options') or [])
+    known = set(options)
+    new = []
+    for label in labels:
+        if label not in (None, '') and label not in known:
+            known.add(label)
+            new.append(str(label))
+    if new:
+        ensure_codes(field)
+        set_options(field, options + new)
+
+
+def label_map(field) -> Dict[str, int]:
+    codes = ensure_codes(field)
+    return dict(zip(field.get('options') or [], codes))
+
+
+def code_map(field) -> Dict[int, str]:
+    codes = ensure_codes(field)
+    return dict(zip(codes, field.get('options') or []))
+
+
+def encoder(field) -> Callable[[Any], Optional[int]]:
+    """Подпись -> код; целое число считается уже кодом"""
+    labels = label_map(field)
+
+    def encode(value):
+        if value is None or value == '':
+            return None
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        code = labels.get(str(value))
+        if code is None:
+            raise ValueError(f"Нет варианта «{value}» в списке")
+        return code
+    return encode
+
+
+def decoder(field) -> Callable[[Any], Any]:
+    """Код -> подпись; неизвестный код (удалённый вариант) - пустое значение"""
+    codes = code_map(field)
+
+    def decode(stored):
+        if isinstance(stored, int):
+            return codes.get(stored)
+        return stored
+    return decode
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+
+"""
+Учёт памяти по проекту, таблицам и кэшам
+
+Кэши регистрируются в общем учёте (accountant.register) вместе с
+функцией оценки размера и, если их можно сокращать, функцией вытеснения.
+Владелец кэша хранится по слабой ссылке: закрытый просмотрщик или база
+исчезают из учёта сами. Размеры приблизительные - по sys.getsizeof
+с выборкой элементов, а не точный подсчёт каждого объекта.
+
+Бюджеты (байт на категорию и общий) хранятся в ~/.lowcode/memory.json;
+enforce() сокращает кэши категорий, вышедших за бюджет, а при
+превышении общего бюджета - кэши, к которым дольше всего не обращались
+(кэши отмечают обращения через accountant.touch).
+Для поиска остального (чего нет среди кэшей) есть снимки tracemalloc.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Категории учёта: id -> подпись
+CATEGORIES = {
+    'project': "Определения проекта",
+    'data': "Страницы данных",
+    'index': "Битовые индексы",
+    'statistics': "Статистика колонок",
+    'formulas': "Формулы",
+    'thumbnails': "Миниатюры",
+}
+
+DEFAULT_BUDGETS = {
+    'total': 512 * MB,
+    'data': 128 * MB,
+    'index': 128 * MB,
+    'statistics': 32 * MB,
+    'formulas': 64 * MB,
+    'thumbnails': 64 * MB,
+}
+
+# При вытеснении кэш сокращается до этой доли бюджета - чтобы не вытеснять снова сразу же
+TRIM_TARGET = 0.8
+
+# Сколько элементов коллекции измеряется для оценки её размера
+SIZE_SAMPLE = 50
+
+
+def default_budget_file() -> str:
+    return os.path.join(os.path.expanduser("~"), ".lowcode", "memory.json")
+
+
+# ========== ОЦЕНКА РАЗМЕРА ==========
+
+def deep_size(obj: Any, seen: Optional[set] = None, depth: int = 6) -> int:
+    """Размер объекта с содержимым (словари, списки, кортежи, __dict__/__slots__)"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen or depth < 0:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_size(key, seen, depth - 1) + deep_size(value, seen, depth - 1)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sampled_size(obj, seen, depth - 1)
+    else:
+        if hasattr(obj, '__dict__'):
+            size += deep_size(vars(obj), seen, depth - 1)
+        for cls in type(obj).__mro__:
+            slots = cls.__dict__.get('__slots__', ())
+            for slot in (slots,) if isinstance(slots, str) else slots:
+                if hasattr(obj, slot):
+                    size += deep_size(getattr(obj, slot), seen, depth - 1)
+    return size
+
+
+def sampled_size(items: Iterable, seen: Optional[set] = None, depth: int = 5) -> int:
+    """Размер элементов коллекции по выборке из первых SIZE_SAMPLE (без самого контейнера)"""
+    items = items if isinstance(items, (list, tuple)) else list(items)
+    if not items:
+        return 0
+    seen = set() if seen is None else seen
+    sample = items[:SIZE_SAMPLE]
+    measured = sum(deep_size(item, seen, depth) for item in sample)
+    return measured * len(items) // len(sample)
+
+
+# ========== УЧЁТ ==========
+
+@dataclass
+class MemoryUsage:
+    name: str
+    category: str
+    bytes: int
+    items: int = 0
+    evictable: bool = False
+    owner: Any = None
+    details: List[Tuple[str, int]] = field(default_factory=list)
+    provider: Any = field(default=None, repr=False)
+    last_used: float = 0.0
+
+
+class _Provider:
+    __slots__ = ('name', 'category', 'owner', 'size', 'trim', 'details', 'last_used')
+
+    def __init__(self, name, category, owner, size, trim, details):
+        self.name = name
+        self.category = category
+        self.owner = owner
+        self.size = size
+        self.trim = trim
+        self.details = details
+        self.last_used = time.monotonic()
+
+
+class MemoryAccountant:
+    """
+    Реестр кэшей. size(owner) -> (байт, элементов); trim(owner, байт) -
+    сократить кэш примерно до заданного размера; details(owner) ->
+    [(имя, байт)] - разбивка для отчёта (например, по таблицам).
+    """
+
+    def __init__(self, budget_file: Optional[str] = None):
+        self.budget_file = budget_file or default_budget_file()
+        self.budgets: Dict[str, int] = dict(DEFAULT_BUDGETS)
+        self._providers: Dict[Tuple[int, str], _Provider] = {}
+        self._lock = threading.Lock()
+        self.load_budgets()
+
+    def register(self, owner: Any, name: str, category: str,
+                 size: Callable[[Any], Tuple[int, int]],
+                 trim: Optional[Callable[[Any, int], None]] = None,
+                 details: Optional[Callable[[Any], List[Tuple[str, int]]]] = None):
+        # У одного владельца может быть несколько кэшей
+        key = (id(owner), name)
+
+        def forget(_, key=key):
+            with self._lock:
+                self._providers.pop(key, None)
+
+        provider = _Provider(name, category, weakref.ref(owner, forget), size, trim, details)
+        with self._lock:
+            self._providers[key] = provider
+
+    def touch(self, owner: Any, name: str):
+        """Отмечает обращение к кэшу - для порядка вытеснения по общему бюджету"""
+        provider = self._providers.get((id(owner), name))
+        if provider is not None:
+            provider.last_used = time.monotonic()
+
+    def unregister(self, owner: Any):
+        with self._lock:
+            for key in [key for key in self._providers if key[0] == id(owner)]:
+                del self._providers[key]
+
+    def _alive(self) -> List[Tuple[_Provider, Any]]:
+        with self._lock:
+            providers = list(self._providers.values())
+        return [(provider, owner) for provider in providers for owner in (provider.owner(),) if owner is not None]
+
+    def usage(self, with_details: bool = False) -> List[MemoryUsage]:
+        result = []
+        for provider, owner in self._alive():
+            try:
+                size, items = provider.size(owner)
+                details = provider.details(owner) if with_details and provider.details else []
+            except Exception as e:
+                # Владелец мог быть закрыт (например, удалённый C++-объект Qt)
+                logger.debug("Оценка памяти %s не удалась: %s", provider.name, e)
+                continue
+            result.append(MemoryUsage(provider.name, provider.category, size, items,
+                                      provider.trim is not None, owner, details, provider, provider.last_used))
+        return result
+
+    def by_category(self, usage: Optional[List[MemoryUsage]] = None) -> Dict[str, int]:
+        totals = {category: 0 for category in CATEGORIES}
+        for entry in usage if usage is not None else self.usage():
+            totals[entry.category] = totals.get(entry.category, 0) + entry.bytes
+        return totals
+
+    # ========== БЮДЖЕТЫ ==========
+
+    def load_budgets(self):
+        try:
+            with open(self.budget_file, encoding='utf-8') as f:
+                stored = json.load(f)
+            self.budgets.update({key: int(value) for key, value in stored.items() if key in DEFAULT_BUDGETS})
+        except FileNotFoundError:
+            pass
+        except (ValueError, OSError) as e:
+            logger.warning("Не удалось прочитать бюджеты памяти %s: %s", self.budget_file, e)
+
+    def save_budgets(self):
+        os.makedirs(os.path.dirname(self.budget_file), exist_ok=True)
+        with open(self.budget_file, 'w', encoding='utf-8') as f:
+            json.dump(self.budgets, f, indent=2)
+
+    def _trim(self, entry: MemoryUsage, target: int) -> int:
+        provider = entry.provider
+        if provider is None or provider.trim is None:
+            return 0
+        try:
+            provider.trim(entry.owner, max(0, target))
+            after, _ = provider.size(entry.owner)
+        except Exception as e:
+            logger.debug("Вытеснение %s не удалось: %s", entry.name, e)
+            return 0
+        return max(0, entry.bytes - after)
+
+    def enforce(self) -> int:
+        """Сокращает кэши сверх бюджетов; возвращает примерно освобождённые байты"""
+        usage = [entry for entry in self.usage() if entry.evictable]
+        freed = 0
+        for category, total in self.by_category(usage).items():
+            budget = self.budgets.get(category)
+            if not budget or total <= budget:
+                continue
+            # Каждый кэш категории сокращается пропорционально своей доле
+            for entry in usage:
+                if entry.category == category and entry.bytes:
+                    share = entry.bytes / total
+                    released = self._trim(entry, int(budget * TRIM_TARGET * share))
+                    entry.bytes -= released
+                    freed += released
+
+        budget = self.budgets.get('total')
+        total = sum(entry.bytes for entry in usage)
+        if budget and total > budget:
+            excess = total - int(budget * TRIM_TARGET)
+            # Давно не использованные кэши - первыми
+            for entry in sorted(usage, key=lambda entry: entry.last_used):
+                if excess <= 0:
+                    break
+                released = self._trim(entry, entry.bytes - excess)
+                excess -= released
+                freed += released
+        if freed:
+            logger.info("Вытеснено из кэшей: %.1f МБ", freed / MB)
+        return freed
+
+
+accountant = MemoryAccountant()
+
+
+# ========== TRACEMALLOC ==========
+
+def start_tracing(frames: int = 1):
+    """Включает tracemalloc (замедляет выделение памяти - только для диагностики)"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing():
+    tracemalloc.stop()
+
+
+def traced_memory() -> Tuple[int, int]:
+    """(текущий объём, пик) выделенного Python, если трассировка включена"""
+    return tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+
+
+def top_allocations(limit: int = 25, group_by: str = 'filename') -> List[Tuple[str, int, int]]:
+    """Крупнейшие места выделения памяти: [(место, байт, блоков)]"""
+    if not tracemalloc.is_tracing():
+        return []
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+    result = []
+    for stat in snapshot.statistics(group_by)[:limit]:
+        frame = stat.traceback[0]
+        location = frame.filename if group_by == 'filename' else f"{frame.filename}:{frame.lineno}"
+        result.append((location, stat.size, stat.count))
+    return result
+
+
+def process_memory() -> Optional[int]:
+    """Пиковый RSS процесса, байт (где доступен модуль resource)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux - килобайты, macOS - байты
+    return peak if sys.platform == 'darwin' else peak * 1024
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+"""
+Типизированная схема проекта: таблицы и поля
+
+TableDef и FieldDef хранят атрибуты в __slots__, а type_id - интернированной
+строкой, поэтому тип проверяется сравнением атрибута. Для совместимости с
+кодом, который работает с таблицами и полями как со словарями, объекты
+поддерживают get(), [], in и update(). Редкие свойства (формат текста,
+ширина и т.п.) лежат в словаре extra, который создаётся только при
+необходимости.
+"""
+
+import sys
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .field_types import FieldType
+from .translator import Translator
+
+
+# Версия формата схемы в файле .ncp (файлы без номера - версия 0)
+SCHEMA_VERSION = 1
+
+
+class SchemaObject:
+    """Общая часть TableDef и FieldDef: доступ к атрибутам как к ключам словаря"""
+
+    __slots__ = ('extra',)
+
+    FIELDS: tuple = ()
+    # Старые имена ключей, которые ещё встречаются в коде и файлах
+    ALIASES = {'display_name': 'name_ru'}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __getitem__(self, key: str) -> Any:
+        key = self.ALIASES.get(key, key)
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        key = self.ALIASES.get(key, key)
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        key = self.ALIASES.get(key, key)
+        return key in self.FIELDS or (self.extra is not None and key in self.extra)
+
+    def keys(self) -> Iterator[str]:
+        yield from self.FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def update(self, values: Dict[str, Any]):
+        for key, value in values.items():
+            self[key] = value
+
+    def _load_extra(self, data: Dict[str, Any], known: frozenset):
+        extra = {key: value for key, value in data.items() if key not in known}
+        self.extra = extra or None
+
+
+class FieldDef(SchemaObject):
+    """Определение поля таблицы"""
+
+    __slots__ = ('id', 'name_ru', 'name_en', 'type_id', 'required', 'unique', 'default', 'format')
+
+    FIELDS = ('id', 'name_ru', 'name_en', 'type_id', 'required', 'unique', 'default', 'format')
+    _KNOWN = frozenset(FIELDS) | {'type'}
+
+    def __init__(self, id: str, name_ru: str = "", name_en: str = "", type_id: str = "text",
+                 required: bool = False, unique: bool = False, default: Any = None,
+                 format: Optional[Dict] = None, extra: Optional[Dict] = None):
+        self.id = id
+        self.name_ru = name_ru
+        self.name_en = name_en
+        self.type_id = sys.intern(type_id)
+        self.required = required
+        self.unique = unique
+        self.default = default
+        self.format = format or None
+        self.extra = extra or None
+
+    # ----- тип -----
+
+    @property
+    def type_name(self) -> str:
+        """Русское название типа (как в FieldType.TYPES)"""
+        return FieldType.get_type_by_id(self.type_id)[1]
+
+    @property
+    def is_reference(self) -> bool:
+        return self.type_id in FieldType.REFERENCE_TYPES
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'type':
+            return self.type_name
+        if key == 'format':
+            # Словарь формата создаётся при первом обращении, чтобы изменения в нём сохранялись
+            if self.format is None:
+                self.format = {}
+            return self.format
+        return super().__getitem__(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key in ('type', 'type_id'):
+            self.type_id = sys.intern(FieldType.resolve_type_id({key: value}))
+        else:
+            super().__setitem__(key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key == 'type' or super().__contains__(key)
+
+    # ----- сериализация -----
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FieldDef':
+        """Ожидает нормализованные данные (см. upgrade_project_data)"""
+        if isinstance(data, FieldDef):
+            return data
+        field = cls(
+            id=data.get('id', ''),
+            name_ru=data.get('name_ru', ''),
+            name_en=data.get('name_en', ''),
+            type_id=data.get('type_id', 'text'),
+            required=data.get('required', False),
+            unique=data.get('unique', False),
+            default=data.get('default'),
+            format=data.get('format'),
+        )
+        field._load_extra(data, cls._KNOWN)
+        return field
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'id': self.id,
+            'name_ru': self.name_ru,
+            'name_en': self.name_en,
+            'type_id': self.type_id,
+            'required': self.required,
+            'unique': self.unique,
+            'default': self.default,
+            'format': self.format or {},
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self) -> str:
+        return f"FieldDef({self.id!r}, {self.type_id!r})"
+
+
+class TableDef(SchemaObject):
+    """Определение таблицы проекта"""
+
+    __slots__ = ('id', 'name_ru', 'name_en', 'icon', 'fields', 'references', 'referenced_by')
+
+    FIELDS = ('id', 'name_ru', 'name_en', 'icon', 'fields', 'references', 'referenced_by')
+    _KNOWN = frozenset(FIELDS)
+
+    def __init__(self, id: str, name_ru: str = "", name_en: str = "", icon: str = "📊",
+                 fields: Optional[List[FieldDef]] = None, references: Optional[List] = None,
+                 referenced_by: Optional[List] = None, extra: Optional[Dict] = None):
+        self.id = id
+        self.name_ru = name_ru
+        self.name_en = name_en
+        self.icon = icon
+        self.fields = fields if fields is not None else []
+        self.references = references if references is not None else []
+        self.referenced_by = referenced_by if referenced_by is not None else []
+        self.extra = extra or None
+
+    def __setitem__(self, key: str, value: Any):
+        if key == 'fields':
+            value = [
+                field if isinstance(field, FieldDef) else FieldDef.from_dict(normalize_field(field))
+                for field in value
+            ]
+        super().__setitem__(key, value)
+
+    def field(self, field_id: str) -> Optional[FieldDef]:
+        for field in self.fields:
+            if field.id == field_id:
+                return field
+        return None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TableDef':
+        if isinstance(data, TableDef):
+            return data
+        table = cls(
+            id=data.get('id', ''),
+            name_ru=data.get('name_ru', ''),
+            name_en=data.get('name_en', ''),
+            icon=data.get('icon', '📊'),
+            fields=[FieldDef.from_dict(field) for field in data.get('fields', [])],
+            references=data.get('references', []),
+            referenced_by=data.get('referenced_by', []),
+        )
+        table._load_extra(data, cls._KNOWN)
+        return table
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'id': self.id,
+            'name_ru': self.name_ru,
+            'name_en': self.name_en,
+            'icon': self.icon,
+            'fields': [field.to_dict() for field in self.fields],
+            'references': self.references,
+            'referenced_by': self.referenced_by,
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self) -> str:
+        return f"TableDef({self.id!r}, fields={len(self.fields)})"
+
+
+# ========== НОРМАЛИЗАЦИЯ И ОБНОВЛЕНИЕ ФОРМАТА ==========
+
+def normalize_field(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Приводит поле к каноническому виду: тип - только type_id,
+    название - name_ru/name_en (вместо display_name).
+    """
+    data = dict(data)
+    data['type_id'] = FieldType.resolve_type_id(data)
+    data.pop('type', None)
+    if 'display_name' in data:
+        display_name = data.pop('display_name')
+        if not data.get('name_ru'):
+            data['name_ru'] = display_name
+    return data
+
+
+def normalize_table(data: Dict[str, Any]) -> Dict[str, Any]:
+    data = dict(data)
+    if 'display_name' in data:
+        display_name = data.pop('display_name')
+        if not data.get('name_ru'):
+            data['name_ru'] = display_name
+
+    fields = [normalize_field(field) for field in data.get('fields', [])]
+
+    # Недостающие английские имена - по русским, уникально в пределах таблицы
+    Translator.assign_names(fields)
+
+    data['fields'] = fields
+    return data
+
+
+def _upgrade_0_to_1(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Версия 0: типы в трёх разных представлениях, display_name вместо name_ru"""
+    data['tables'] = [normalize_table(table) for table in data.get('tables', [])]
+    Translator.assign_names(data['tables'])
+    return data
+
+
+# Шаги обновления: версия -> функция, переводящая данные в версию + 1
+UPGRADES: Dict[int, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    0: _upgrade_0_to_1,
+}
+
+
+def upgrade_project_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Доводит данные проекта до SCHEMA_VERSION за один проход по шагам"""
+    version = data.get('schema_version', 0)
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"Проект создан более новой версией программы (схема {version})")
+
+    while version < SCHEMA_VERSION:
+        data = UPGRADES[version](data)
+        version += 1
+
+    data['schema_version'] = SCHEMA_VERSION
+    return data
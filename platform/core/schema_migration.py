@@ -0,0 +1,469 @@
+# -*- coding: utf-8 -*-
+
+"""
+Сравнение схемы таблицы с базой данных и миграция данных
+
+Схема, которую сохраняет конструктор, сравнивается со схемой, физически
+применённой в базе, и превращается в минимальный набор шагов:
+- новое поле - ALTER TABLE ADD COLUMN;
+- удалённое поле - только отметка в метаданных (колонка вычищается
+  позже через Database.compact, чтобы не перезаписывать таблицу);
+- переименование и перестановка полей - ничего, колонки названы по id;
+- смена типа с тем же классом хранения - только метаданные;
+- смена типа, требующая преобразования значений, - перезапись колонки
+  пакетами в отдельных транзакциях (MigrationJob в фоновом потоке).
+"""
+
+import math
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import date_codec, fixed_point, list_codec
+from .database import Database, data_table, quote, storage_type
+from .field_types import FieldType
+from .schema import FieldDef, TableDef
+
+
+# (старый type_id, новый type_id) -> функция преобразования одного значения
+CONVERTERS: Dict[Tuple[str, str], Callable] = {}
+
+# Смены типа, при которых данные теряются: (старый, новый) -> что именно
+# пропадёт. Конструктор показывает это и спрашивает подтверждения.
+LOSSY_CHANGES: Dict[Tuple[str, str], str] = {}
+
+
+def register_converter(old_type: str, new_type: str, func: Callable, lossy: Optional[str] = None):
+    """Регистрирует преобразование значений при смене типа поля; lossy - какие данные оно теряет"""
+    CONVERTERS[(old_type, new_type)] = func
+    if lossy:
+        LOSSY_CHANGES[(old_type, new_type)] = lossy
+
+
+# Преобразования, которым нужно определение поля (например, справочник списка):
+# (старый type_id, новый type_id) -> фабрика(поле) -> функция преобразования
+FIELD_CONVERTERS: Dict[Tuple[str, str], Callable[[FieldDef], Callable]] = {}
+
+
+def register_field_converter(old_type: str, new_type: str, factory: Callable[[FieldDef], Callable]):
+    FIELD_CONVERTERS[(old_type, new_type)] = factory
+
+
+def _converter(step: 'MigrationStep') -> Optional[Callable]:
+    factory = FIELD_CONVERTERS.get((step.old_type, step.new_type))
+    if factory is not None and step.field is not None:
+        return factory(step.field)
+    return CONVERTERS.get((step.old_type, step.new_type))
+
+
+# Тип, которым считается колонка с данным классом хранения, если он
+# не совпадает с записанным в схеме (колонка создана до смены хранения типа)
+STORAGE_TYPE_IDS = {'TEXT': 'text', 'REAL': 'float', 'INTEGER': 'integer'}
+
+
+NOT_A_NUMBER = "значения, которые не читаются как число, станут пустыми"
+
+
+def _register_fixed_point_converters():
+    type_ids = [item[3] for item in FieldType.TYPES] + ['text']
+    for fixed_type in fixed_point.FIXED_TYPES:
+        for other in type_ids:
+            if other in fixed_point.FIXED_TYPES:
+                continue
+            if storage_type(other) == 'TEXT':
+                register_converter(other, fixed_type, fixed_point.to_units_or_none, NOT_A_NUMBER)
+            elif storage_type(other) != 'INTEGER':
+                register_converter(other, fixed_type, fixed_point.to_units_or_none)
+            if storage_type(other) == 'TEXT':
+                register_converter(fixed_type, other, fixed_point.format_plain)
+        register_converter('integer', fixed_type, fixed_point.to_units_or_none)
+        register_converter(fixed_type, 'integer', lambda units: fixed_point.div_round(units, fixed_point.FACTOR))
+        register_converter(fixed_type, 'float', fixed_point.to_float)
+
+
+def _register_date_converters():
+    type_ids = [item[3] for item in FieldType.TYPES] + ['text']
+    for date_type in date_codec.DATE_TYPES:
+        for other in type_ids:
+            if storage_type(other) == 'TEXT':
+                register_converter(other, date_type, date_codec.stored_converter(date_type),
+                                   "значения, которые не читаются как дата или время, станут пустыми")
+                register_converter(date_type, other, date_codec.formatter(date_type))
+
+    day = date_codec.SECONDS_PER_DAY
+    register_converter('date', 'datetime', lambda days: days * day)
+    register_converter('datetime', 'date', lambda seconds: seconds // day,
+                       "время будет отброшено, останется только дата")
+    register_converter('datetime', 'time', lambda seconds: seconds % day,
+                       "дата будет отброшена, останется только время")
+    # Время без даты - время в день 01.01.1970 (секунды от полуночи те же)
+    register_converter('time', 'datetime', lambda seconds: seconds)
+    # У даты нет времени дня - значения не сохраняются
+    register_converter('date', 'time', lambda days: None, "значения будут удалены: у даты нет времени дня")
+
+
+def _number_text(value) -> str:
+    return str(value).replace(' ', '').replace('\u00a0', '').replace(',', '.')
+
+
+def _to_integer_or_none(value) -> Optional[int]:
+    """Целое из текста («1 234», «12,5» - с округлением); нечисловое - пусто, а не 0, как у CAST"""
+    units = fixed_point.to_units_or_none(_number_text(value))
+    return None if units is None else fixed_point.div_round(units, fixed_point.FACTOR)
+
+
+def _to_float_or_none(value) -> Optional[float]:
+    try:
+        number = float(_number_text(value))
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+_BOOLEAN_TEXT = {
+    '1': 1, 'true': 1, 'да': 1, 'yes': 1, 'истина': 1,
+    '0': 0, 'false': 0, 'нет': 0, 'no': 0, 'ложь': 0,
+}
+
+
+def _to_boolean_or_none(value) -> Optional[int]:
+    return _BOOLEAN_TEXT.get(str(value).strip().lower())
+
+
+def _register_number_converters():
+    # Без них текст переводился бы через CAST, и нечисловое значение молча становилось 0
+    parsers = {
+        'integer': (_to_integer_or_none, NOT_A_NUMBER + ", дробная часть округлится"),
+        'rating': (_to_integer_or_none, NOT_A_NUMBER + ", дробная часть округлится"),
+        'float': (_to_float_or_none, NOT_A_NUMBER),
+        'boolean': (_to_boolean_or_none, "значения, кроме да/нет (1/0), станут пустыми"),
+    }
+    for other in [item[3] for item in FieldType.TYPES] + ['text']:
+        if storage_type(other) == 'TEXT':
+            for number_type, (parse, lossy) in parsers.items():
+                register_converter(other, number_type, parse, lossy)
+
+
+def _list_to_label(field: FieldDef) -> Callable:
+    decode = list_codec.decoder(field)
+    return lambda code: decode(code)
+
+
+def _label_to_list(field: FieldDef) -> Callable:
+    labels = list_codec.label_map(field)
+    return lambda label: labels.get(str(label))
+
+
+def _register_list_converters():
+    for other in [item[3] for item in FieldType.TYPES] + ['text']:
+        if storage_type(other) == 'TEXT':
+            register_field_converter(other, 'list', _label_to_list)
+            register_field_converter('list', other, _list_to_label)
+
+
+_register_fixed_point_converters()
+_register_date_converters()
+_register_number_converters()
+_register_list_converters()
+
+
+@dataclass
+class MigrationStep:
+    """Один шаг миграции"""
+    action: str            # create_table, add_column, drop_column, change_type
+    field_id: str = ""
+    old_type: str = ""
+    new_type: str = ""
+    rewrite: bool = False  # нужна перезапись значений колонки
+    field: Optional[FieldDef] = field(default=None, repr=False, compare=False)
+
+    def describe(self) -> str:
+        if self.action == 'create_table':
+            return "Создание таблицы"
+        if self.action == 'add_column':
+            return f"Новое поле {self.field_id} ({self.new_type})"
+        if self.action == 'drop_column':
+            return f"Удаление поля {self.field_id}"
+        mode = "с преобразованием данных" if self.rewrite else "без перезаписи"
+        return f"Тип поля {self.field_id}: {self.old_type} → {self.new_type} ({mode})"
+
+
+@dataclass
+class MigrationPlan:
+    """План миграции одной таблицы"""
+    table_id: str
+    columns: Dict[str, str]
+    steps: List[MigrationStep] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.steps
+
+    @property
+    def rewrite_steps(self) -> List[MigrationStep]:
+        return [step for step in self.steps if step.rewrite]
+
+    @property
+    def needs_rewrite(self) -> bool:
+        return any(step.rewrite for step in self.steps)
+
+    @property
+    def lossy_steps(self) -> List[MigrationStep]:
+        """Смены типа, при которых теряются данные (см. LOSSY_CHANGES)"""
+        return [step for step in self.rewrite_steps if (step.old_type, step.new_type) in LOSSY_CHANGES]
+
+
+def table_columns(table: TableDef) -> Dict[str, str]:
+    """Колонки, которые должны быть в базе для определения таблицы: {field_id: type_id}"""
+    return {field_def.id: field_def.type_id for field_def in table.fields}
+
+
+def diff_table(applied: Optional[Dict[str, str]], table: TableDef) -> MigrationPlan:
+    """Сравнивает применённую схему с новым определением таблицы"""
+    columns = table_columns(table)
+    plan = MigrationPlan(table_id=table.id, columns=columns)
+
+    if applied is None:
+        plan.steps.append(MigrationStep('create_table'))
+        return plan
+
+    for field_id, new_type in columns.items():
+        old_type = applied.get(field_id)
+        if old_type is None:
+            plan.steps.append(MigrationStep('add_column', field_id, new_type=new_type))
+        elif old_type != new_type:
+            rewrite = (
+                storage_type(old_type) != storage_type(new_type)
+                or (old_type, new_type) in CONVERTERS
+                or (old_type, new_type) in FIELD_CONVERTERS
+            )
+            plan.steps.append(MigrationStep(
+                'change_type', field_id, old_type, new_type, rewrite, table.field(field_id)
+            ))
+
+    for field_id, old_type in applied.items():
+        if field_id not in columns:
+            plan.steps.append(MigrationStep('drop_column', field_id, old_type=old_type))
+
+    return plan
+
+
+class MigrationInProgress(RuntimeError):
+    """Таблицу нельзя менять, пока не закончено преобразование её данных"""
+
+
+def unused_column(connection: sqlite3.Connection, table: str, base: str, reserved: Iterable[str] = ()) -> str:
+    """Имя колонки на основе base, которого ещё нет в таблице (и среди reserved)"""
+    taken = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")} | set(reserved)
+    name, number = base, 1
+    while name in taken:
+        number += 1
+        name = f"{base}{number}"
+    return name
+
+
+class SchemaMigrator:
+    """Применяет планы миграции к базе данных проекта"""
+
+    BATCH_SIZE = 20000
+
+    def __init__(self, database: Database):
+        self.database = database
+
+    def plan(self, table: TableDef) -> MigrationPlan:
+        with self.database.lock:
+            applied = self.database.applied_schema(table.id)
+            storage = self.database.column_storage(table.id) if applied is not None else {}
+        plan = diff_table(applied, table)
+
+        # Колонки, класс хранения которых отстал от своего типа, перезаписываются
+        changed = {step.field_id for step in plan.steps}
+        for field_id, type_id in plan.columns.items():
+            actual = storage.get(field_id)
+            if field_id in changed or actual is None or actual == storage_type(type_id):
+                continue
+            old_type = STORAGE_TYPE_IDS.get(actual, 'text')
+            plan.steps.append(MigrationStep(
+                'change_type', field_id, old_type, type_id, rewrite=True, field=table.field(field_id)
+            ))
+        return plan
+
+    def apply_metadata(self, plan: MigrationPlan):
+        """
+        Быстрая часть миграции: создание таблицы, новые колонки, удаления
+        и смены типа без перезаписи. Поля, которые требуют преобразования,
+        остаются в базе со старым типом до выполнения rewrite().
+        """
+        if plan.is_empty:
+            return
+
+        db = self.database
+        table = data_table(plan.table_id)
+
+        with db.lock, db.connection:
+            connection = db.connection
+            applied = db.applied_schema(plan.table_id) or {}
+            dropped = db.dropped_columns(plan.table_id)
+
+            for step in plan.steps:
+                if step.action == 'create_table':
+                    columns_sql = ''.join(
+                        f", {quote(field_id)} {storage_type(type_id)}"
+                        for field_id, type_id in plan.columns.items()
+                    )
+                    connection.execute(
+                        f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY{columns_sql})"
+                    )
+                    applied = dict(plan.columns)
+
+                elif step.action == 'add_column':
+                    if step.field_id in dropped:
+                        # Поле вернули до очистки - старые значения не должны «воскреснуть»
+                        dropped.remove(step.field_id)
+                        connection.execute(f"ALTER TABLE {table} DROP COLUMN {quote(step.field_id)}")
+                    connection.execute(
+                        f"ALTER TABLE {table} ADD COLUMN {quote(step.field_id)} {storage_type(step.new_type)}"
+                    )
+                    applied[step.field_id] = step.new_type
+
+                elif step.action == 'drop_column':
+                    applied.pop(step.field_id, None)
+                    dropped.append(step.field_id)
+
+                elif step.action == 'change_type' and not step.rewrite:
+                    applied[step.field_id] = step.new_type
+
+            db.save_schema(plan.table_id, applied, dropped)
+
+    def rewrite(self, plan: MigrationPlan, progress: Optional[Callable[[float], None]] = None,
+                cancel: Optional[threading.Event] = None):
+        """
+        Перезапись колонок со сменой типа. Значения пишутся в теневую
+        колонку пакетами по BATCH_SIZE строк, каждый пакет - отдельная
+        транзакция; в конце колонки меняются местами переименованием.
+        Теневая колонка каждый раз новая; если миграция прервана, она
+        уходит в список на очистку, а повторный запуск начинает заново.
+        """
+        steps = plan.rewrite_steps
+        if not steps:
+            return
+
+        connection = self.database.connect()
+        try:
+            table = data_table(plan.table_id)
+            low, high, count = connection.execute(
+                f"SELECT MIN(id), MAX(id), COUNT(*) FROM {table}"
+            ).fetchone()
+            total = max(count * len(steps), 1)
+            done = 0
+
+            for step in steps:
+                with self.database.lock, connection:
+                    shadow = unused_column(connection, table, f"{step.field_id}__new")
+                    connection.execute(
+                        f"ALTER TABLE {table} ADD COLUMN {quote(shadow)} {storage_type(step.new_type)}"
+                    )
+
+                try:
+                    if count:
+                        for start in range(low, high + 1, self.BATCH_SIZE):
+                            if cancel is not None and cancel.is_set():
+                                self._retire_column(connection, plan.table_id, shadow)
+                                return
+                            end = start + self.BATCH_SIZE - 1
+                            with connection:
+                                done += self._rewrite_batch(connection, table, step, shadow, start, end)
+                            if progress:
+                                progress(min(done / total, 1.0))
+                except Exception:
+                    self._retire_column(connection, plan.table_id, shadow)
+                    raise
+
+                self._swap_columns(connection, plan.table_id, step, shadow)
+        finally:
+            connection.close()
+
+        if progress:
+            progress(1.0)
+
+    def _rewrite_batch(self, connection, table, step, shadow, start, end) -> int:
+        column = quote(step.field_id)
+        converter = _converter(step)
+
+        if converter is None:
+            cursor = connection.execute(
+                f"UPDATE {table} SET {quote(shadow)} = CAST({column} AS {storage_type(step.new_type)}) "
+                f"WHERE id BETWEEN ? AND ?",
+                (start, end)
+            )
+            return cursor.rowcount
+
+        rows = connection.execute(
+            f"SELECT id, {column} FROM {table} WHERE id BETWEEN ? AND ?", (start, end)
+        ).fetchall()
+        connection.executemany(
+            f"UPDATE {table} SET {quote(shadow)} = ? WHERE id = ?",
+            [(converter(value) if value is not None else None, row_id) for row_id, value in rows]
+        )
+        return len(rows)
+
+    def _retire_column(self, connection: sqlite3.Connection, table_id: str, column: str):
+        """Недописанная теневая колонка - в список на очистку (Database.compact)"""
+        with self.database.lock, connection:
+            applied = self.database.applied_schema(table_id, connection) or {}
+            dropped = self.database.dropped_columns(table_id, connection)
+            dropped.append(column)
+            self.database.save_schema(table_id, applied, dropped, connection)
+
+    def _swap_columns(self, connection: sqlite3.Connection, table_id: str, step: MigrationStep, shadow: str):
+        """Новая колонка занимает имя поля, старая уходит в список на очистку"""
+        table = data_table(table_id)
+        with self.database.lock, connection:
+            applied = self.database.applied_schema(table_id, connection) or {}
+            dropped = self.database.dropped_columns(table_id, connection)
+
+            retired = unused_column(connection, table, f"{step.field_id}__old", dropped)
+            connection.execute(f"ALTER TABLE {table} RENAME COLUMN {quote(step.field_id)} TO {quote(retired)}")
+            connection.execute(f"ALTER TABLE {table} RENAME COLUMN {quote(shadow)} TO {quote(step.field_id)}")
+
+            applied[step.field_id] = step.new_type
+            dropped.append(retired)
+            self.database.save_schema(table_id, applied, dropped, connection)
+
+
+class MigrationJob(threading.Thread):
+    """
+    Фоновое выполнение перезаписи данных с отслеживанием прогресса.
+    on_done(job) вызывается из фонового потока, когда перезапись
+    закончилась (успешно, с ошибкой или отменой).
+    """
+
+    def __init__(self, migrator: SchemaMigrator, plan: MigrationPlan,
+                 on_done: Optional[Callable[['MigrationJob'], None]] = None):
+        super().__init__(daemon=True)
+        self.migrator = migrator
+        self.plan = plan
+        self.on_done = on_done
+        self.progress = 0.0
+        self.error: Optional[Exception] = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return not self.is_alive()
+
+    def run(self):
+        try:
+            self.migrator.rewrite(self.plan, self._set_progress, self.cancel_event)
+        except Exception as e:
+            self.error = e
+        finally:
+            if self.on_done is not None:
+                self.on_done(self)
+
+    def _set_progress(self, value: float):
+        self.progress = value
+
+    def cancel(self):
+        self.cancel_event.set()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""
+Сериализация файлов проекта
+
+Менеджер проектов работает с JSON через общий интерфейс: байты на входе
+и на выходе, режим «красивого» (с отступами) или компактного вывода.
+Быстрая библиотека orjson используется, если установлена; иначе - json
+из стандартной библиотеки. Вывод обоих вариантов читается любым из них.
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+
+class JsonSerializer:
+    """Стандартный модуль json"""
+
+    name = 'json'
+
+    def dumps(self, data: Any, pretty: bool = True) -> bytes:
+        if pretty:
+            text = json.dumps(data, ensure_ascii=False, indent=2)
+        else:
+            text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        return text.encode('utf-8')
+
+    def loads(self, content: bytes) -> Any:
+        return json.loads(content)
+
+
+class OrjsonSerializer:
+    """orjson: в разы быстрее стандартного модуля на больших проектах"""
+
+    name = 'orjson'
+
+    def __init__(self, module):
+        self.module = module
+
+    def dumps(self, data: Any, pretty: bool = True) -> bytes:
+        option = self.module.OPT_INDENT_2 if pretty else 0
+        return self.module.dumps(data, option=option)
+
+    def loads(self, content: bytes) -> Any:
+        return self.module.loads(content)
+
+
+def _load_orjson() -> Optional[OrjsonSerializer]:
+    # orjson при инициализации импортирует uuid, а тот - модуль platform из
+    # стандартной библиотеки. При запуске из корня репозитория его заслоняет
+    # пакет приложения, uuid падает, а расширение orjson после этого
+    # завершает процесс без исключения. Поэтому сначала проверяется uuid.
+    try:
+        import uuid  # noqa: F401
+    except Exception:
+        return None
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return OrjsonSerializer(orjson)
+
+
+# Имя -> фабрика; фабрика возвращает None, если библиотека недоступна
+BACKENDS: Dict[str, Callable[[], Any]] = {
+    'orjson': _load_orjson,
+    'json': JsonSerializer,
+}
+
+# Порядок выбора при автоопределении
+PREFERRED = ('orjson', 'json')
+
+_instances: Dict[str, Any] = {}
+
+
+def get_serializer(name: Optional[str] = None):
+    """
+    Сериализатор по имени или самый быстрый из доступных.
+    Если запрошенная библиотека не установлена - ValueError.
+    """
+    names = (name,) if name else PREFERRED
+    for backend in names:
+        if backend not in _instances:
+            factory = BACKENDS.get(backend)
+            if factory is None:
+                raise ValueError(f"Неизвестный сериализатор: {backend}")
+            _instances[backend] = factory()
+        if _instances[backend] is not None:
+            return _instances[backend]
+    raise ValueError(f"Сериализатор недоступен: {name}")
+
+
+def available_backends() -> List[str]:
+    result = []
+    for backend in PREFERRED:
+        try:
+            get_serializer(backend)
+        except ValueError:
+            continue
+        result.append(backend)
+    return result
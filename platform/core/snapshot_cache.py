@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""
+Кэш разобранных проектов для быстрого повторного открытия
+
+Для каждого файла .ncp хранится снимок уже нормализованного проекта
+(pickle). Снимок действителен, пока у файла те же размер и время
+изменения; если время изменилось, а размер нет, сверяется хэш
+содержимого - это всё равно дешевле разбора JSON. Общий размер кэша
+ограничен: при превышении удаляются давно не использованные снимки.
+"""
+
+import hashlib
+import os
+import pickle
+from typing import Any, Optional
+
+from .schema import SCHEMA_VERSION, FieldDef, TableDef
+
+
+# Меняется при несовместимом изменении классов, попадающих в снимок
+# (раскладка слотов TableDef/FieldDef сверяется и без этого - см. model_layout)
+CACHE_FORMAT = 2
+
+
+def model_layout() -> tuple:
+    """Слоты классов модели: снимок со старой раскладкой не распаковывается"""
+    return tuple(
+        (cls.__name__, cls.__slots__)
+        for model in (TableDef, FieldDef)
+        for cls in model.__mro__ if '__slots__' in cls.__dict__
+    )
+
+
+def default_cache_folder() -> str:
+    return os.path.join(os.path.expanduser("~"), ".lowcode", "snapshots")
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class SnapshotCache:
+    """Снимки проектов на диске с LRU-ограничением по размеру"""
+
+    DEFAULT_BUDGET = 256 * 1024 * 1024
+
+    def __init__(self, folder: Optional[str] = None, budget_bytes: int = DEFAULT_BUDGET):
+        self.folder = folder or default_cache_folder()
+        self.budget_bytes = budget_bytes
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _entry_path(self, filename: str) -> str:
+        key = hashlib.sha1(os.path.abspath(filename).encode('utf-8')).hexdigest()
+        return os.path.join(self.folder, f"{key}.snap")
+
+    def load(self, filename: str) -> Optional[Any]:
+        """Проект из снимка или None, если снимка нет или он устарел"""
+        entry = self._entry_path(filename)
+        try:
+            stat = os.stat(filename)
+            with open(entry, 'rb') as f:
+                header = pickle.load(f)
+
+                if (header.get('format') != CACHE_FORMAT
+                        or header.get('layout') != model_layout()
+                        or header.get('schema_version') != SCHEMA_VERSION
+                        or header.get('path') != os.path.abspath(filename)
+                        or header.get('size') != stat.st_size):
+                    return None
+
+                if header.get('mtime_ns') != stat.st_mtime_ns:
+                    with open(filename, 'rb') as source:
+                        if content_hash(source.read()) != header.get('hash'):
+                            return None
+
+                project = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Повреждённый или несовместимый снимок (распаковка может бросить что угодно:
+            # TypeError, ValueError...) - проект разбирается из файла, снимок удаляется
+            self.invalidate(filename)
+            return None
+
+        # Время изменения снимка - отметка последнего использования для LRU
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return project
+
+    def store(self, filename: str, project: Any, data: bytes):
+        """Сохраняет снимок проекта; data - содержимое файла, из которого он получен"""
+        entry = self._entry_path(filename)
+        header = {
+            'format': CACHE_FORMAT,
+            'layout': model_layout(),
+            'schema_version': SCHEMA_VERSION,
+            'path': os.path.abspath(filename),
+            'size': len(data),
+            'mtime_ns': os.stat(filename).st_mtime_ns,
+            'hash': content_hash(data),
+        }
+
+        temp = entry + '.tmp'
+        try:
+            with open(temp, 'wb') as f:
+                pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(project, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, entry)
+        except (OSError, pickle.PicklingError):
+            if os.path.exists(temp):
+                os.remove(temp)
+            return
+
+        self.evict()
+
+    def invalidate(self, filename: str):
+        try:
+            os.remove(self._entry_path(filename))
+        except OSError:
+            pass
+
+    def evict(self):
+        """Удаляет самые давно использованные снимки сверх бюджета"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.folder):
+            if not name.endswith('.snap'):
+                continue
+            path = os.path.join(self.folder, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.budget_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
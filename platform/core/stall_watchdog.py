@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+"""
+Обнаружение зависаний GUI-потока
+
+GUI-поток периодически вызывает beat() (в MainWindow - по QTimer).
+Сторожевой поток проверяет, как давно был последний вызов: если дольше
+порога, цикл событий чем-то занят синхронно. Тогда снимается стек
+GUI-потока (sys._current_frames) и повторно - пока зависание длится,
+а в файл отчётов (JSON по строке на запись) пишутся две записи: сразу
+при обнаружении (на случай, если приложение так и не отвиснет) и по
+окончании - с длительностью и всеми снятыми стеками, сгруппированными
+по совпадению. К отчёту прикладывается контекст - открытый конструктор,
+таблица, последнее действие меню, - который GUI-поток обновляет сам
+через set_context(): из сторожевого потока к виджетам обращаться нельзя.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STALL_THRESHOLD = 0.5    # с без heartbeat - зависание
+CHECK_INTERVAL = 0.05    # с между проверками сторожевого потока
+MAX_SAMPLES = 50         # стеков за одно зависание
+MAX_STACK_DEPTH = 40
+
+_active: Optional['StallWatchdog'] = None
+
+
+def default_report_file() -> str:
+    return os.path.join(os.path.expanduser("~"), ".lowcode", "stalls.jsonl")
+
+
+def set_context(**values):
+    """Обновляет контекст работающего сторожа (если он запущен); вызывается из GUI-потока"""
+    if _active is not None:
+        _active.set_context(**values)
+
+
+class StallWatchdog:
+    """Сторожевой поток для одного (GUI-)потока"""
+
+    def __init__(self, threshold: float = STALL_THRESHOLD, report_file: Optional[str] = None,
+                 thread_id: Optional[int] = None, interval: float = 0.1):
+        self.threshold = threshold
+        self.report_file = report_file or default_report_file()
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval              # период heartbeat - для расчёта задержки цикла событий
+        self.context: Dict[str, Any] = {}
+        self.latencies: deque = deque(maxlen=1000)
+        self.stalls = 0
+        self._last_beat = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+
+    # ========== GUI-ПОТОК ==========
+
+    def beat(self):
+        now = time.monotonic()
+        self.latencies.append(max(0.0, now - self._last_beat - self.interval))
+        self._last_beat = now
+
+    def set_context(self, **values):
+        # Новый словарь целиком: сторожевой поток читает его без блокировки
+        self.context = {**self.context, **values}
+
+    def start(self):
+        global _active
+        if self._thread is not None:
+            return
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stall-watchdog", daemon=True)
+        self._thread.start()
+        _active = self
+
+    def stop(self):
+        global _active
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        if _active is self:
+            _active = None
+
+    def latency_summary(self) -> Dict[str, float]:
+        """Задержка цикла событий относительно периода heartbeat, мс"""
+        values = sorted(self.latencies)
+        if not values:
+            return {'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        return {
+            'p50_ms': values[len(values) // 2] * 1000,
+            'p95_ms': values[min(len(values) - 1, len(values) * 95 // 100)] * 1000,
+            'max_ms': values[-1] * 1000,
+        }
+
+    # ========== СТОРОЖЕВОЙ ПОТОК ==========
+
+    def _stack(self) -> List[str]:
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return []
+        entries = traceback.extract_stack(frame, limit=MAX_STACK_DEPTH)
+        return [f"{entry.filename}:{entry.lineno} {entry.name}" + (f" | {entry.line}" if entry.line else "")
+                for entry in entries]
+
+    def _run(self):
+        stall_started = None   # время последнего heartbeat перед зависанием
+        samples: List[tuple] = []
+        context: Dict[str, Any] = {}
+        next_sample = 0.0
+
+        while not self._stop.wait(CHECK_INTERVAL):
+            last_beat = self._last_beat
+            now = time.monotonic()
+            if now - last_beat < self.threshold:
+                if stall_started is not None:
+                    self._finish(stall_started, last_beat - stall_started, samples, context)
+                    stall_started = None
+                continue
+
+            if stall_started is None or last_beat != stall_started:
+                if stall_started is not None:
+                    # heartbeat был, но следующий снова запаздывает - это уже новое зависание
+                    self._finish(stall_started, last_beat - stall_started, samples, context)
+                stall_started = last_beat
+                samples = []
+                context = dict(self.context)
+                self.stalls += 1
+                stack = self._stack()
+                samples.append(tuple(stack))
+                self._write({'state': 'stalled', 'duration_ms': round((now - last_beat) * 1000),
+                             'context': context, 'stack': stack})
+                logger.warning("Интерфейс не отвечает %.0f мс (%s)", (now - last_beat) * 1000, context)
+                next_sample = now + self.threshold
+            elif now >= next_sample and len(samples) < MAX_SAMPLES:
+                samples.append(tuple(self._stack()))
+                next_sample = now + self.threshold
+
+        if stall_started is not None:
+            self._finish(stall_started, time.monotonic() - stall_started, samples, context)
+
+    def _finish(self, started: float, duration: float, samples: List[tuple], context: Dict[str, Any]):
+        # Одинаковые стеки группируются: самый частый - там, где GUI-поток провёл больше всего времени
+        groups = Counter(samples).most_common()
+        self._write({
+            'state': 'finished',
+            'duration_ms': round(duration * 1000),
+            'context': context,
+            'samples': len(samples),
+            'stacks': [{'count': count, 'stack': list(stack)} for stack, count in groups],
+        })
+        logger.warning("Зависание интерфейса %.0f мс, стеков: %d (%s)", duration * 1000, len(samples), context)
+
+    def _write(self, report: Dict[str, Any]):
+        report = {'time': datetime.now().isoformat(timespec='milliseconds'), 'pid': os.getpid(), **report}
+        try:
+            with self._write_lock:
+                os.makedirs(os.path.dirname(self.report_file), exist_ok=True)
+                with open(self.report_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(report, ensure_ascii=False) + '\n')
+        except OSError as e:
+            logger.error("Не удалось записать отчёт о зависании %s: %s", self.report_file, e)
+
+
+def read_reports(path: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    """Последние отчёты из файла (для просмотра и анализа)"""
+    try:
+        with open(path or default_report_file(), encoding='utf-8') as f:
+            lines = deque(f, maxlen=limit)
+    except FileNotFoundError:
+        return []
+    reports = []
+    for line in lines:
+        try:
+            reports.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return reports
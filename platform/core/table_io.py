@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+"""
+Импорт и экспорт данных таблицы (CSV, JSON)
+
+Экспорт пишет значения так, как их видит пользователь (через кодеки
+полей), потоково - пакетами из iter_records. Импорт сопоставляет колонки
+файла с полями по id, русскому или английскому имени и добавляет записи
+пакетами через ProjectManager.add_records: значения проходят те же
+кодеки, что и при вводе, а строки с ошибками пропускаются и попадают в
+отчёт.
+"""
+
+import csv
+import json
+import os
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .schema import FieldDef, TableDef
+from .value_codecs import formatter
+
+FORMATS = ('csv', 'json')
+BATCH_SIZE = 5000
+
+
+class _ExportDialect(csv.excel):
+    """CSV экспорта: разделитель «;» (Excel с русской локалью открывает такие файлы сразу)"""
+    delimiter = ';'
+
+
+_TRUE = ('да', 'true', '1', 'yes', 'истина', '+')
+_FALSE = ('нет', 'false', '0', 'no', 'ложь', '-')
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат файла: {fmt or path}")
+    return fmt
+
+
+def _export_formatter(field: FieldDef) -> Callable[[Any], str]:
+    if field.type_id == 'boolean':
+        return lambda value: '' if value is None else ('Да' if value else 'Нет')
+    return formatter(field)
+
+
+def _parse_bool(text: str) -> Optional[int]:
+    lowered = text.strip().lower()
+    if lowered in _TRUE:
+        return 1
+    if lowered in _FALSE:
+        return 0
+    raise ValueError(f"Не Да/Нет: {text!r}")
+
+
+def _parse_number(cast):
+    def parse(text: str):
+        try:
+            return cast(text.replace(' ', '').replace(' ', '').replace(',', '.'))
+        except ValueError:
+            raise ValueError(f"Не число: {text!r}")
+    return parse
+
+
+# Разбор текста для типов без кодека (у денег, дат и списков разбор - в кодеке)
+_PARSERS = {
+    'boolean': _parse_bool,
+    'integer': _parse_number(int),
+    'rating': _parse_number(int),
+    'float': _parse_number(float),
+}
+
+
+# ========== ЭКСПОРТ ==========
+
+def export_table(project_manager, table_id: str, path: str, fmt: Optional[str] = None,
+                 raw: bool = False) -> int:
+    """
+    Выгружает записи таблицы в файл, возвращает их число.
+    raw=True - хранимые значения (коды, доли, номера дней) без форматирования.
+    """
+    fmt = detect_format(path, fmt)
+    table = project_manager.get_table(table_id)
+    fields = [f for f in table.fields if f.get('visible', True)]
+    names = [f.name_ru or f.id for f in fields]
+    formatters = [(lambda value: value) if raw else _export_formatter(f) for f in fields]
+
+    def rows() -> Iterator[List[Any]]:
+        for record in project_manager.iter_records(table_id, BATCH_SIZE):
+            yield [format_value(record.get(f.id)) for f, format_value in zip(fields, formatters)]
+
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as output:
+        if fmt == 'csv':
+            writer = csv.writer(output, dialect=_ExportDialect)
+            writer.writerow(names)
+            for row in rows():
+                writer.writerow(row)
+                count += 1
+        else:
+            output.write('[')
+            for row in rows():
+                output.write(',\n' if count else '\n')
+                output.write(json.dumps(dict(zip(names, row)), ensure_ascii=False))
+                count += 1
+            output.write('\n]\n')
+    return count
+
+
+# ========== ИМПОРТ ==========
+
+def match_columns(table: TableDef, columns: List[str]) -> Dict[str, FieldDef]:
+    """Колонка файла -> поле (по id, имени, английскому имени; без учёта регистра)"""
+    by_name: Dict[str, FieldDef] = {}
+    for field in table.fields:
+        if field.type_id == 'formula':
+            continue
+        for name in (field.id, field.name_ru, field.name_en):
+            if name:
+                by_name.setdefault(name.strip().lower(), field)
+    return {column: by_name[column.strip().lower()] for column in columns if column.strip().lower() in by_name}
+
+
+def _read_rows(path: str, fmt: str) -> Iterator[Dict[str, Any]]:
+    if fmt == 'csv':
+        with open(path, encoding='utf-8-sig', newline='') as source:
+            sample = source.read(4096)
+            source.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=';,\t') if sample else _ExportDialect
+            except csv.Error:
+                # В файле с одной колонкой разделитель не угадать - читаем как файл экспорта
+                dialect = _ExportDialect
+            yield from csv.DictReader(source, dialect=dialect)
+    else:
+        with open(path, encoding='utf-8') as source:
+            yield from json.load(source)
+
+
+def import_table(project_manager, table_id: str, path: str, fmt: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Добавляет записи из файла в таблицу.
+    Возвращает {'imported': n, 'skipped': n, 'errors': [(строка, текст)...], 'ignored_columns': [...]}
+    """
+    fmt = detect_format(path, fmt)
+    table = project_manager.get_table(table_id)
+    # Хранилище таблицы создаётся при первой записи - в новую таблицу ещё ничего не писали
+    if project_manager.database.applied_schema(table_id) is None:
+        project_manager.update_table(table)
+    mapping: Optional[Dict[str, FieldDef]] = None
+    imported = 0
+    errors: List[tuple] = []
+    ignored: List[str] = []
+    batch: List[Dict[str, Any]] = []
+    numbers: List[int] = []  # номера строк файла для записей пакета
+
+    def flush():
+        nonlocal imported
+        batch_errors: List[tuple] = []
+        imported += project_manager.add_records(table_id, batch, errors=batch_errors)
+        errors.extend((numbers[index], message) for index, message in batch_errors)
+        batch.clear()
+        numbers.clear()
+
+    for number, row in enumerate(_read_rows(path, fmt)):
+        if mapping is None:
+            mapping = match_columns(table, list(row))
+            ignored = [column for column in row if column not in mapping]
+        record = {}
+        try:
+            for column, field in mapping.items():
+                value = row.get(column)
+                if isinstance(value, str):
+                    if value.strip() == '':
+                        value = None
+                    elif field.type_id in _PARSERS:
+                        value = _PARSERS[field.type_id](value)
+                record[field.id] = value
+        except ValueError as e:
+            errors.append((number + 1, str(e)))
+            continue
+        batch.append(record)
+        numbers.append(number + 1)
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+    return {'imported': imported, 'skipped': len(errors), 'errors': errors, 'ignored_columns': ignored}
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+"""
+Замеры времени операций (спаны)
+
+    with span('designer.table_selected', table=table_id):
+        ...
+
+    @traced('project.load')
+    def load_project(...):
+        ...
+
+По умолчанию запись выключена: span() возвращает общий пустой объект,
+а traced() вызывает функцию напрямую - цена одна проверка флага. Включается
+enable() (из диалога профилирования) или переменной окружения
+LOWCODE_TRACE=1. Записанные спаны хранятся в кольцевом буфере и
+выгружаются в формате Chrome trace events (chrome://tracing, Perfetto)
+или сводкой: число вызовов и p50/p95/p99 по каждой операции.
+"""
+
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+# Сколько последних спанов хранится
+MAX_EVENTS = 100_000
+
+_enabled = os.environ.get('LOWCODE_TRACE', '') not in ('', '0')
+_events: deque = deque(maxlen=MAX_EVENTS)
+_origin_ns = time.perf_counter_ns()
+
+
+class _NullSpan:
+    """Спан при выключенной записи: ничего не делает"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name: str, args: Dict[str, Any]):
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        # (имя, начало мкс, длительность мкс, поток, аргументы); append у deque потокобезопасен
+        _events.append((self.name, (self.start - _origin_ns) // 1000, (end - self.start) // 1000,
+                        threading.get_ident(), self.args))
+        return False
+
+    def set(self, **args):
+        """Дополнительные аргументы, известные только по ходу операции"""
+        self.args.update(args)
+
+
+def span(name: str, **args):
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, args)
+
+
+def traced(name: Optional[str] = None):
+    """Декоратор: вызов функции - спан с именем name (по умолчанию - имя функции)"""
+    def decorate(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enable(flag: bool = True):
+    global _enabled
+    _enabled = flag
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def clear():
+    _events.clear()
+
+
+def events() -> List[tuple]:
+    return list(_events)
+
+
+# ========== ВЫГРУЗКА ==========
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Процентиль по рангу в отсортированном списке"""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summary() -> List[Dict[str, Any]]:
+    """По операциям: число вызовов, суммарное время и p50/p95/p99/max в мс; самые долгие - первыми"""
+    durations: Dict[str, List[int]] = {}
+    for name, _, duration, _, _ in events():
+        durations.setdefault(name, []).append(duration)
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        rows.append({
+            'name': name,
+            'count': len(values),
+            'total_ms': sum(values) / 1000,
+            'p50_ms': percentile(values, 0.50) / 1000,
+            'p95_ms': percentile(values, 0.95) / 1000,
+            'p99_ms': percentile(values, 0.99) / 1000,
+            'max_ms': values[-1] / 1000,
+        })
+    rows.sort(key=lambda row: row['total_ms'], reverse=True)
+    return rows
+
+
+def chrome_trace() -> Dict[str, Any]:
+    pid = os.getpid()
+    return {
+        'traceEvents': [
+            {
+                'name': name,
+                'cat': name.split('.', 1)[0],
+                'ph': 'X',
+                'ts': start,
+                'dur': duration,
+                'pid': pid,
+                'tid': thread,
+                'args': {key: str(value) for key, value in args.items()},
+            }
+            for name, start, duration, thread, args in events()
+        ],
+        'displayTimeUnit': 'ms',
+    }
+
+
+def export_chrome_trace(path: str) -> int:
+    """Пишет спаны в файл для chrome://tracing; возвращает их число"""
+    trace = chrome_trace()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(trace, f, ensure_ascii=False)
+    return len(trace['traceEvents'])
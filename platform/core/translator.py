@@ -5,12 +5,13 @@
 """
 
 import re
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
 
 
 class Translator:
     """Класс для транслитерации и перевода"""
-    
+
     TRANSLIT_DICT = {
         'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e',
         'ж': 'zh', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm',
@@ -19,34 +20,77 @@ class Translator:
         'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
         ' ': '_', '-': '_', '—': '_', '.': '_', ',': '_', '(': '', ')': ''
     }
-    
-    _cache: Dict[str, str] = {}
-    
+
+    # Таблица для str.translate строится один раз
+    _TRANSLATE_TABLE = str.maketrans(TRANSLIT_DICT)
+    _UNDERSCORES = re.compile(r'_{2,}')
+
+    CACHE_SIZE = 4096
+
     @classmethod
     def to_english(cls, russian_text: str) -> str:
         if not russian_text:
             return ""
-        
-        if russian_text in cls._cache:
-            return cls._cache[russian_text]
-        
-        text = russian_text.lower()
-        
-        result = ''
-        for char in text:
-            result += cls.TRANSLIT_DICT.get(char, char)
-        
-        while '__' in result:
-            result = result.replace('__', '_')
-        
-        result = result.strip('_')
-        
-        if result and result[0].isdigit():
-            result = 'f_' + result
-        
-        cls._cache[russian_text] = result
-        return result
-    
+        return _transliterate(russian_text)
+
+    @classmethod
+    def to_english_many(cls, texts: Iterable[str]) -> List[str]:
+        """Перевод списка названий за один вызов"""
+        return [_transliterate(text) if text else "" for text in texts]
+
+    @classmethod
+    def assign_names(cls, items: List[Dict], names: Optional['UniqueNames'] = None) -> 'UniqueNames':
+        """
+        Заполняет недостающие name_en по name_ru для списка таблиц или полей
+        (например, при обновлении формата проекта). Имена уникальны в пределах
+        списка: повторы получают суффикс _2, _3...
+        """
+        if names is None:
+            names = UniqueNames(item['name_en'] for item in items if item.get('name_en'))
+        missing = [item for item in items if not item.get('name_en') and item.get('name_ru')]
+        for item, name in zip(missing, cls.to_english_many(item['name_ru'] for item in missing)):
+            item['name_en'] = names.add(name)
+        return names
+
     @classmethod
     def clear_cache(cls):
-        cls._cache.clear()
\ No newline at end of file
+        _transliterate.cache_clear()
+
+
+class UniqueNames:
+    """Набор занятых идентификаторов с выдачей свободного суффикса за O(1)"""
+
+    __slots__ = ('taken', '_next_suffix')
+
+    def __init__(self, taken: Iterable[str] = ()):
+        self.taken: Set[str] = set(taken)
+        self._next_suffix: Dict[str, int] = {}
+
+    def add(self, name: str) -> str:
+        """Регистрирует имя и возвращает его уникальный вариант"""
+        base = name or 'field'
+        candidate = base
+        if candidate in self.taken:
+            suffix = self._next_suffix.get(base, 2)
+            candidate = f"{base}_{suffix}"
+            while candidate in self.taken:
+                suffix += 1
+                candidate = f"{base}_{suffix}"
+            self._next_suffix[base] = suffix + 1
+        self.taken.add(candidate)
+        return candidate
+
+    def discard(self, name: str):
+        """Освобождает имя (удалённое поле или таблица)"""
+        self.taken.discard(name)
+
+
+@lru_cache(maxsize=Translator.CACHE_SIZE)
+def _transliterate(russian_text: str) -> str:
+    result = russian_text.lower().translate(Translator._TRANSLATE_TABLE)
+    result = Translator._UNDERSCORES.sub('_', result).strip('_')
+
+    if result and result[0].isdigit():
+        result = 'f_' + result
+
+    return result
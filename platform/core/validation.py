@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+Проверка данных таблиц на соответствие определению
+
+Проверки выполняются запросами к базе, без чтения записей в Python:
+обязательные поля, уникальность, класс хранения значений (например,
+текст в колонке денег после неудачного импорта), коды удалённых
+вариантов списка, ошибки в формулах и незавершённая миграция схемы.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .database import Database, data_table, quote, storage_type
+from .formula_engine import FormulaEngine, FormulaError
+from .list_codec import ensure_codes
+from .schema import TableDef
+
+# Сколько id записей приводится в примере для одной проблемы
+SAMPLE_IDS = 20
+
+# Допустимые typeof() для класса хранения колонки
+_STORAGE_TYPEOF = {
+    'INTEGER': ('integer',),
+    'REAL': ('real', 'integer'),
+    'TEXT': ('text',),
+}
+
+
+@dataclass
+class ValidationIssue:
+    table_id: str
+    field_id: Optional[str]
+    code: str           # required, unique, storage, list_code, formula, schema
+    message: str
+    count: int = 0      # число затронутых записей
+    record_ids: List[int] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return {
+            'table_id': self.table_id,
+            'field_id': self.field_id,
+            'code': self.code,
+            'message': self.message,
+            'count': self.count,
+            'record_ids': self.record_ids,
+        }
+
+
+def _matching(database: Database, table_id: str, condition: str, params: list = ()) -> tuple:
+    """(число записей, первые id) под условием"""
+    table = data_table(table_id)
+    with database.lock:
+        count = database.connection.execute(f"SELECT COUNT(*) FROM {table} WHERE {condition}", params).fetchone()[0]
+        ids = [row[0] for row in database.connection.execute(
+            f"SELECT id FROM {table} WHERE {condition} ORDER BY id LIMIT {SAMPLE_IDS}", params
+        )] if count else []
+    return count, ids
+
+
+def validate_table(database: Database, table: TableDef) -> List[ValidationIssue]:
+    issues: List[ValidationIssue] = []
+    # None - в таблицу ещё ничего не писали и хранилище не создано: данных нет, проверять нечего
+    applied = database.applied_schema(table.id)
+
+    def issue(field_def, code, message, count=0, ids=()):
+        issues.append(ValidationIssue(table.id, field_def.id if field_def else None, code, message, count, list(ids)))
+
+    engine = FormulaEngine(table)
+    for field_def in table.fields:
+        name = field_def.name_ru or field_def.id
+        if field_def.type_id == 'formula':
+            try:
+                engine.compile(field_def.get('formula') or '""')
+            except FormulaError as e:
+                issue(field_def, 'formula', f"«{name}»: {e}")
+
+        if applied is None:
+            continue
+        if field_def.id not in applied:
+            issue(field_def, 'schema', f"«{name}»: нет колонки в базе")
+            continue
+        if applied[field_def.id] != field_def.type_id:
+            issue(field_def, 'schema', f"«{name}»: миграция на тип {field_def.type_id} не завершена")
+            continue
+        column = quote(field_def.id)
+
+        if field_def.get('required', False):
+            count, ids = _matching(database, table.id, f"{column} IS NULL OR {column} = ''")
+            if count:
+                issue(field_def, 'required', f"«{name}»: пустое обязательное поле", count, ids)
+
+        if field_def.get('unique', False):
+            with database.lock:
+                duplicates = database.connection.execute(
+                    f"SELECT COUNT(*), SUM(n) FROM (SELECT COUNT(*) AS n FROM {data_table(table.id)} "
+                    f"WHERE {column} IS NOT NULL GROUP BY {column} HAVING n > 1)"
+                ).fetchone()
+            if duplicates[0]:
+                issue(field_def, 'unique', f"«{name}»: повторяющихся значений - {duplicates[0]}", duplicates[1])
+
+        allowed = _STORAGE_TYPEOF[storage_type(field_def.type_id)]
+        marks = ', '.join('?' * len(allowed))
+        count, ids = _matching(
+            database, table.id, f"{column} IS NOT NULL AND typeof({column}) NOT IN ({marks})", list(allowed)
+        )
+        if count:
+            issue(field_def, 'storage', f"«{name}»: значения не того типа", count, ids)
+
+        if field_def.type_id == 'list':
+            codes = ensure_codes(field_def)
+            marks = ', '.join('?' * len(codes)) or 'NULL'
+            count, ids = _matching(
+                database, table.id, f"typeof({column}) = 'integer' AND {column} NOT IN ({marks})", list(codes)
+            )
+            if count:
+                issue(field_def, 'list_code', f"«{name}»: значения удалённых вариантов списка", count, ids)
+    return issues
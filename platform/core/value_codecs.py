@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+"""
+Преобразование значений полей между видом для пользователя и хранением
+
+Для типов, которые хранятся не «как есть» (деньги, проценты, даты,
+варианты списка), кодек
+переводит введённое значение в хранимое (encode), обратно (decode),
+строит функцию отображения для колонки (formatter) и переводит текст
+поиска в условие на хранимые значения (search). Типы без кодека
+записываются без изменений и показываются через str().
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+from . import date_codec, fixed_point, list_codec
+from .schema import FieldDef, TableDef
+
+
+class FixedPointCodec:
+    """Деньги и проценты: целые десятитысячные доли"""
+
+    def encode(self, value: Any, field: FieldDef) -> Optional[int]:
+        return fixed_point.to_units(value)
+
+    def decode(self, stored: Any, field: FieldDef) -> Any:
+        if isinstance(stored, int):
+            return fixed_point.from_units(stored)
+        return stored
+
+    def formatter(self, field: FieldDef) -> Callable[[Any], str]:
+        decimals = field.get('decimals', 2)
+        thousands = field.get('use_thousands', True)
+        if field.get('type_id') == 'money':
+            # '₽ (Рубль)' -> '₽'
+            suffix = str(field.get('currency', '')).split(' ')[0]
+        else:
+            suffix = '%' if field.get('show_percent_sign', True) else ''
+
+        def format_value(stored):
+            if isinstance(stored, int):
+                return fixed_point.format_units(stored, decimals, thousands, suffix)
+            return '' if stored is None else str(stored)
+        return format_value
+
+    def search(self, text: str, field: FieldDef) -> Optional[List[int]]:
+        """Текст поиска, который читается как число, - точное значение"""
+        try:
+            return [fixed_point.to_units(text)]
+        except ValueError:
+            return None
+
+
+class DateCodec:
+    """Дата - номер дня, время и дата со временем - секунды"""
+
+    def encode(self, value: Any, field: FieldDef) -> Optional[int]:
+        return date_codec.to_stored(value, field.type_id, field.get('date_format'), field.get('time_format'))
+
+    def decode(self, stored: Any, field: FieldDef) -> Any:
+        if isinstance(stored, int):
+            return date_codec.from_stored(stored, field.type_id)
+        return stored
+
+    def formatter(self, field: FieldDef) -> Callable[[Any], str]:
+        return date_codec.formatter(field.get('type_id'), field.get('date_format'), field.get('time_format'))
+
+    def search(self, text: str, field: FieldDef) -> Any:
+        """Текст поиска, который читается как дата/время; дата без времени - весь день"""
+        try:
+            stored = self.encode(text, field)
+        except ValueError:
+            return None
+        if field.type_id == 'datetime' and ' ' not in text.strip() and 'T' not in text:
+            return (stored, stored + date_codec.SECONDS_PER_DAY - 1)
+        return [stored]
+
+
+class ListCodec:
+    """Список - код варианта из определения поля"""
+
+    def encode(self, value: Any, field: FieldDef) -> Optional[int]:
+        return list_codec.encoder(field)(value)
+
+    def encoder(self, field: FieldDef) -> Callable[[Any], Optional[int]]:
+        return list_codec.encoder(field)
+
+    def decode(self, stored: Any, field: FieldDef) -> Any:
+        return list_codec.decoder(field)(stored)
+
+    def formatter(self, field: FieldDef) -> Callable[[Any], str]:
+        decode = list_codec.decoder(field)
+
+        def format_value(stored):
+            label = decode(stored)
+            return '' if label is None else str(label)
+        return format_value
+
+    def search(self, text: str, field: FieldDef) -> Optional[List[int]]:
+        """Коды вариантов, в подписи которых есть текст поиска"""
+        needle = text.casefold()
+        codes = [code for label, code in list_codec.label_map(field).items() if needle in label.casefold()]
+        return codes or None
+
+
+# type_id -> кодек
+CODECS: Dict[str, Any] = {type_id: FixedPointCodec() for type_id in fixed_point.FIXED_TYPES}
+CODECS.update({type_id: DateCodec() for type_id in date_codec.DATE_TYPES})
+CODECS['list'] = ListCodec()
+
+
+def register_codec(type_id: str, codec: Any):
+    """Регистрирует кодек для типа поля"""
+    CODECS[type_id] = codec
+
+
+def _plain(stored: Any) -> str:
+    return '' if stored is None else str(stored)
+
+
+def formatter(field: FieldDef) -> Callable[[Any], str]:
+    """Функция отображения значений колонки (строится один раз на колонку)"""
+    codec = CODECS.get(field.get('type_id'))
+    return codec.formatter(field) if codec is not None else _plain
+
+
+def field_encoders(table: TableDef) -> Dict[str, Callable[[Any], Any]]:
+    """{field_id: encode} только для полей, которым нужен кодек"""
+    encoders = {}
+    for field in table.fields:
+        codec = CODECS.get(field.type_id)
+        if codec is None:
+            continue
+        if hasattr(codec, 'encoder'):
+            # Кодек со справочником строит его один раз на вызов, а не на каждое значение
+            encoders[field.id] = codec.encoder(field)
+        else:
+            encoders[field.id] = lambda value, codec=codec, field=field: codec.encode(value, field)
+    return encoders
+
+
+def search_values(table: TableDef, text: str) -> Dict[str, Any]:
+    """
+    Текст поиска в хранимом виде для полей с кодеком: {field_id: условие
+    как в filter} (см. database.Search). Поля, для которых текст ничего
+    не значит (например, «абв» для даты), не попадают в результат.
+    """
+    values = {}
+    for field in table.fields:
+        codec = CODECS.get(field.type_id)
+        search = getattr(codec, 'search', None)
+        if search is None:
+            continue
+        value = search(text, field)
+        if value is not None:
+            values[field.id] = value
+    return values
+
+
+def encode_filter(filter: Optional[Dict[str, Any]], encoders: Dict[str, Callable[[Any], Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Условия фильтра (см. Database._where) в хранимом виде: границы
+    диапазона (от, до) и значения списков кодируются так же, как значения.
+    """
+    if not filter or not encoders:
+        return filter
+    result = {}
+    for field_id, value in filter.items():
+        encode = encoders.get(field_id)
+        if encode is None or value is None:
+            result[field_id] = value
+        elif isinstance(value, tuple):
+            result[field_id] = tuple(None if bound is None else encode(bound) for bound in value)
+        elif isinstance(value, (list, set, frozenset)):
+            result[field_id] = [encode(item) for item in value]
+        else:
+            result[field_id] = encode(value)
+    return result
+
+
+def encode_values(values: Dict[str, Any], encoders: Dict[str, Callable[[Any], Any]]) -> Dict[str, Any]:
+    """Значения записи в хранимом виде; ValueError - если значение не подходит типу"""
+    if not encoders:
+        return values
+    return {
+        field_id: encoders[field_id](value) if field_id in encoders else value
+        for field_id, value in values.items()
+    }
@@ -81,27 +81,27 @@ class FieldTilePanel(QWidget):
         grid_layout.setContentsMargins(0, 0, 0, 0)
         grid_layout.setSpacing(4)
 
-        # Все типы полей
+        # Все типы полей (type_id из FieldType.TYPES)
         fields = [
-            ("TEXT", "📝", "Текст"),
-            ("TEXT_MULTILINE", "📄", "Многостр."),
-            ("INTEGER", "🔢", "Число"),
-            ("FLOAT", "🔢", "Дробное"),
-            ("DATE", "📅", "Дата"),
-            ("TIME", "⏰", "Время"),
-            ("DATETIME", "📆", "Дата/время"),
-            ("BOOLEAN", "✅", "Да/Нет"),
-            ("LIST", "📋", "Список"),
-            ("REFERENCE", "🔗", "Ссылка"),
-            ("PHONE", "📞", "Телефон"),
-            ("EMAIL", "✉️", "Email"),
-            ("MONEY", "💰", "Деньги"),
-            ("PERCENT", "📊", "Процент"),
-            ("FILE", "📎", "Файл"),
-            ("IMAGE", "🖼️", "Изобр."),
-            ("COLOR", "🎨", "Цвет"),
-            ("RATING", "⭐", "Рейтинг"),
-            ("CALCULATED", "🧮", "Вычисл."),
+            ("text", "📝", "Текст"),
+            ("text_multiline", "📄", "Многостр."),
+            ("integer", "🔢", "Число"),
+            ("float", "🔢", "Дробное"),
+            ("date", "📅", "Дата"),
+            ("time", "⏰", "Время"),
+            ("datetime", "📆", "Дата/время"),
+            ("boolean", "✅", "Да/Нет"),
+            ("list", "📋", "Список"),
+            ("reference", "🔗", "Ссылка"),
+            ("phone", "📞", "Телефон"),
+            ("email", "✉️", "Email"),
+            ("money", "💰", "Деньги"),
+            ("percent", "📊", "Процент"),
+            ("file", "📎", "Файл"),
+            ("image", "🖼️", "Изобр."),
+            ("color", "🎨", "Цвет"),
+            ("rating", "⭐", "Рейтинг"),
+            ("formula", "🧮", "Вычисл."),
         ]
 
         row, col = 0, 0
@@ -9,6 +9,8 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 
+from ..core.field_types import FieldType
+
 
 class FieldWidget(QFrame):
     """Виджет для отображения поля в конструкторе"""
@@ -17,6 +19,19 @@ class FieldWidget(QFrame):
     fieldMoved = pyqtSignal(int, int)
     fieldDeleted = pyqtSignal(object)
 
+    # Короткие подписи типов, которые не помещаются целиком
+    SHORT_TYPE_NAMES = {
+        'text_multiline': 'Многостр.',
+        'integer': 'Целое',
+        'float': 'Дробное',
+        'datetime': 'Дата/время',
+        'reference_multiple': 'Ссылки',
+        'phone': 'Тел.',
+        'percent': '%',
+        'image': 'Изобр.',
+        'formula': 'Вычисл.',
+    }
+
     def __init__(self, field_data, parent=None):
         super().__init__(parent)
         self.field_data = field_data
@@ -80,62 +95,15 @@ class FieldWidget(QFrame):
         """Обновляет отображение поля"""
         self.field_data = field_data
 
-        # Иконка в зависимости от типа
-        type_icons = {
-            'TEXT': '📝',
-            'TEXT_MULTILINE': '📄',
-            'INTEGER': '🔢',
-            'FLOAT': '🔢',
-            'DATE': '📅',
-            'TIME': '⏰',
-            'DATETIME': '📆',
-            'BOOLEAN': '✅',
-            'LIST': '📋',
-            'REFERENCE': '🔗',
-            'PHONE': '📞',
-            'EMAIL': '✉️',
-            'MONEY': '💰',
-            'PERCENT': '📊',
-            'FILE': '📎',
-            'IMAGE': '🖼️',
-            'COLOR': '🎨',
-            'RATING': '⭐',
-            'CALCULATED': '🧮',
-        }
-
-        field_type = field_data.get('type', 'TEXT')
-        if hasattr(field_type, 'value'):
-            field_type = field_type.value
-
-        icon = type_icons.get(field_type, '📌')
+        # Иконка и подпись по каноническому type_id
+        icon, type_name, _, type_id = FieldType.get_type_by_id(field_data.type_id)
         self.icon_label.setText(icon)
 
         # Название
-        self.name_label.setText(field_data.get('display_name', 'Поле'))
+        self.name_label.setText(field_data.name_ru or 'Поле')
 
         # Тип для отображения
-        type_names = {
-            'TEXT': 'Текст',
-            'TEXT_MULTILINE': 'Многостр.',
-            'INTEGER': 'Целое',
-            'FLOAT': 'Дробное',
-            'DATE': 'Дата',
-            'TIME': 'Время',
-            'DATETIME': 'Дата/время',
-            'BOOLEAN': 'Да/Нет',
-            'LIST': 'Список',
-            'REFERENCE': 'Ссылка',
-            'PHONE': 'Тел.',
-            'EMAIL': 'Email',
-            'MONEY': 'Деньги',
-            'PERCENT': '%',
-            'FILE': 'Файл',
-            'IMAGE': 'Изобр.',
-            'COLOR': 'Цвет',
-            'RATING': 'Рейтинг',
-            'CALCULATED': 'Вычисл.',
-        }
-        self.type_label.setText(type_names.get(field_type, field_type))
+        self.type_label.setText(self.SHORT_TYPE_NAMES.get(type_id, type_name))
 
         # Обязательное поле - добавляем звёздочку
         if field_data.get('required'):
@@ -5,10 +5,19 @@
 Конструктор таблиц (основной файл)
 """
 
+import copy
+
 from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 
+from ..core.field_types import FieldType
+from ..core.list_codec import set_options
+from ..core.schema import FieldDef, TableDef
+from ..core.schema_migration import MigrationInProgress
+from ..core.stall_watchdog import set_context
+from ..core.tracing import span
+from ..core.translator import Translator, UniqueNames
 from ..widgets.property_panel import PropertyPanel
 from ..widgets.table_viewer import TableViewer
 from ..dialogs.formula_dialog import FormulaDialog
@@ -30,6 +39,12 @@ class TableDesigner(QWidget):
         self.current_table = None
         self.current_field = None
         self.fields = []  # список полей текущей таблицы
+        # Занятые id и английские имена полей - обновляются при добавлении и удалении
+        self.field_ids = set()
+        self.field_names = UniqueNames()
+        # Набираемые варианты списков {id поля: подписи} - применяются один раз,
+        # когда правка закончена (см. apply_pending_options)
+        self.pending_options = {}
 
         self.setup_ui()
         self.connect_signals()
@@ -206,23 +221,30 @@ class TableDesigner(QWidget):
 
     def on_table_selected(self, table_data):
         """Выбрана таблица в списке"""
-        self.current_table = table_data
-        self.load_table_fields(table_data)
+        set_context(table=table_data.get('name_ru') or table_data.get('id'))
+        with span('designer.table_selected', table=table_data.get('id')):
+            self.current_table = table_data
+            self.load_table_fields(table_data)
 
-        # Загружаем данные таблицы для просмотра
-        data = self.project_manager.get_table_data(table_data['id'])
-        self.table_viewer.set_table(table_data, data)
+            # Данные таблицы читаются просмотрщиком постранично
+            self.table_viewer.set_source(table_data, self.project_manager)
 
-        # Показываем свойства таблицы
-        self.properties_panel.set_table(table_data)
+            # Показываем свойства таблицы
+            self.properties_panel.set_table(table_data, self.table_statistics())
 
         self.tableChanged.emit()
 
+    def table_statistics(self):
+        """Статистика колонок проекта для профиля данных (None без проекта)"""
+        if self.project_manager is None or self.project_manager.current_project is None:
+            return None
+        return self.project_manager.statistics
+
     def on_table_created(self, table_data):
         """Создана новая таблица"""
         self.current_table = table_data
         self.clear_fields()
-        self.properties_panel.set_table(table_data)
+        self.properties_panel.set_table(table_data, self.table_statistics())
 
     def on_table_deleted(self, table_id):
         """Удалена таблица"""
@@ -237,15 +259,23 @@ class TableDesigner(QWidget):
         fields = table_data.get('fields', [])
 
         for field in fields:
-            self.add_field_widget(field)
+            self.add_field_widget(self.field_copy(field))
+
+    @staticmethod
+    def field_copy(field):
+        """Конструктор правит копии полей: определение в проекте меняется только при сохранении"""
+        return FieldDef.from_dict(copy.deepcopy(FieldDef.from_dict(field).to_dict()))
 
     def clear_fields(self):
         """Очищает область полей"""
+        self.apply_pending_options()
         while self.fields_layout.count():
             item = self.fields_layout.takeAt(0)
             if item.widget():
                 item.widget().deleteLater()
         self.fields = []
+        self.field_ids = set()
+        self.field_names = UniqueNames()
 
     def add_field_widget(self, field_data):
         """Добавляет виджет поля в область"""
@@ -261,108 +291,113 @@ class TableDesigner(QWidget):
             'widget': widget,
             'data': field_data
         })
+        self.field_ids.add(field_data['id'])
+        if field_data.get('name_en'):
+            self.field_names.taken.add(field_data['name_en'])
 
     # ========== МЕТОДЫ ДЛЯ РАБОТЫ С ПОЛЯМИ ==========
 
-    def on_field_tile_clicked(self, field_type):
+    def on_field_tile_clicked(self, type_id):
         """Клик по плитке поля - создание нового поля"""
         if not self.current_table:
             QMessageBox.warning(self, "Внимание", "Сначала выберите или создайте таблицу")
             return
 
         # Создаём новое поле
-        field_data = self.create_new_field(field_type)
+        field_data = self.create_new_field(type_id)
         self.add_field_widget(field_data)
 
         # Выделяем новое поле
         self.on_field_clicked(field_data)
 
-    def create_new_field(self, field_type):
+    # Свойства нового поля по типу (type_id)
+    FIELD_DEFAULTS = {
+        'text': {
+            'text_format': 'Как написано',
+            'max_length': 255,
+            'input_mask': 'Без маски',
+        },
+        'text_multiline': {
+            'multiline_format': 'Обычный текст',
+            'height': 5,
+            'word_wrap': True,
+        },
+        'integer': {
+            'min_value': 0,
+            'max_value': 100,
+            'use_thousands': False,
+        },
+        'float': {
+            'decimals': 2,
+            'min_value': 0,
+            'max_value': 100,
+            'use_thousands': False,
+        },
+        'money': {
+            'currency': '₽ (Рубль)',
+            'decimals': 2,
+            'min_value': 0,
+            'max_value': 999999,
+        },
+        'percent': {
+            'decimals': 1,
+            'show_percent_sign': True,
+            'min_value': 0,
+            'max_value': 100,
+        },
+        'date': {
+            'date_format': 'ДД.ММ.ГГГГ',
+            'time_format': 'Без времени',
+            'auto_current': False,
+        },
+        'list': {
+            'options': ['Вариант 1', 'Вариант 2', 'Вариант 3'],
+            'list_type': 'Выпадающий список',
+            'sort_type': 'Как введено',
+        },
+        'reference': {
+            'reference_table': '',
+            'reference_display': '',
+            'relation_type': 'Одна запись',
+        },
+        'formula': {
+            'formula': '',
+            'result_type': 'Текст',
+        },
+    }
+
+    def create_new_field(self, type_id):
         """Создаёт новое поле заданного типа"""
-        from ..core.field_types import FieldType
-
-        # Определяем тип
-        if isinstance(field_type, str):
-            try:
-                type_enum = FieldType[field_type]
-            except:
-                type_enum = FieldType.TEXT
-        else:
-            type_enum = field_type
-
-        # Базовая структура поля
-        field = {
-            'id': f"field_{len(self.fields) + 1}",
-            'display_name': f"Поле {len(self.fields) + 1}",
-            'type': type_enum,
-            'required': False,
-            'unique': False,
-            'default': '',
-            'description': '',
-            'width': 150,
-            'visible': True,
-            'readonly': False
-        }
-
-        # Добавляем специфические свойства в зависимости от типа
-        type_name = type_enum.value if hasattr(type_enum, 'value') else str(type_enum)
-
-        if type_name in ['TEXT', 'Текст']:
-            field['text_format'] = 'Как написано'
-            field['max_length'] = 255
-            field['input_mask'] = 'Без маски'
-
-        elif type_name in ['TEXT_MULTILINE', 'Многострочный текст']:
-            field['multiline_format'] = 'Обычный текст'
-            field['height'] = 5
-            field['word_wrap'] = True
-
-        elif type_name in ['INTEGER', 'Целое число']:
-            field['min_value'] = 0
-            field['max_value'] = 100
-            field['use_thousands'] = False
-
-        elif type_name in ['FLOAT', 'Дробное число']:
-            field['decimals'] = 2
-            field['min_value'] = 0
-            field['max_value'] = 100
-            field['use_thousands'] = False
-
-        elif type_name in ['MONEY', 'Деньги']:
-            field['currency'] = '₽ (Рубль)'
-            field['decimals'] = 2
-            field['min_value'] = 0
-            field['max_value'] = 999999
-
-        elif type_name in ['PERCENT', 'Процент']:
-            field['decimals'] = 1
-            field['show_percent_sign'] = True
-            field['min_value'] = 0
-            field['max_value'] = 100
-
-        elif type_name in ['DATE', 'Дата']:
-            field['date_format'] = 'ДД.ММ.ГГГГ'
-            field['time_format'] = 'Без времени'
-            field['auto_current'] = False
-
-        elif type_name in ['LIST', 'Список']:
-            field['options'] = ['Вариант 1', 'Вариант 2', 'Вариант 3']
-            field['list_type'] = 'Выпадающий список'
-            field['sort_type'] = 'Как введено'
-
-        elif type_name in ['REFERENCE', 'Ссылка']:
-            field['reference_table'] = ''
-            field['reference_display'] = ''
-            field['relation_type'] = 'Одна запись'
-
-        elif type_name in ['CALCULATED', 'Вычисляемое']:
-            field['formula'] = ''
-            field['result_type'] = 'Текст'
+        # id поля - имя колонки в базе, поэтому он не должен повторяться
+        # даже после удаления полей
+        number = len(self.fields) + 1
+        while f"field_{number}" in self.field_ids:
+            number += 1
+
+        name_ru = f"Поле {len(self.fields) + 1}"
+
+        field = FieldDef(
+            id=f"field_{number}",
+            name_ru=name_ru,
+            name_en=self.field_names.add(Translator.to_english(name_ru)),
+            type_id=type_id if type_id in FieldType.TYPE_IDS else 'text',
+            extra={
+                'description': '',
+                'width': 150,
+                'visible': True,
+                'readonly': False,
+            },
+        )
+
+        # Специфические свойства типа (списки копируются, чтобы не делить их между полями)
+        for name, value in self.FIELD_DEFAULTS.get(field.type_id, {}).items():
+            field[name] = list(value) if isinstance(value, list) else value
 
         return field
 
     def on_field_clicked(self, field_data):
         """Клик по полю - выделение и показ свойств"""
+        self.apply_pending_options()
         self.current_field = field_data
 
         # Снимаем выделение со всех полей
@@ -409,6 +444,8 @@ class TableDesigner(QWidget):
                 if field['data']['id'] == field_data['id']:
                     field['widget'].deleteLater()
                     self.fields.pop(i)
+                    self.field_ids.discard(field_data['id'])
+                    self.field_names.discard(field_data.get('name_en'))
                     break
 
             if self.current_field and self.current_field['id'] == field_data['id']:
@@ -420,6 +457,11 @@ class TableDesigner(QWidget):
     def on_property_changed(self, prop_name, value):
         """Изменение свойства в панели"""
         if self.current_field:
+            if prop_name == 'list_options':
+                # Коды назначаются не на каждое нажатие клавиши, а по окончании правки
+                labels = [line.strip() for line in value.split('\n') if line.strip()]
+                self.pending_options[self.current_field['id']] = labels
+                return
             self.current_field[prop_name] = value
 
             # Обновляем отображение поля
@@ -428,6 +470,20 @@ class TableDesigner(QWidget):
                     field['widget'].update_display(self.current_field)
                     break
 
+    def apply_pending_options(self):
+        """
+        Применяет набранные варианты списков к полям. Сравнение идёт
+        с вариантами поля до правки, поэтому промежуточные строки набора
+        не занимают коды (см. list_codec.set_options).
+        """
+        pending, self.pending_options = self.pending_options, {}
+        for field in self.fields:
+            labels = pending.get(field['data']['id'])
+            if labels is None or labels == list(field['data'].get('options') or []):
+                continue
+            set_options(field['data'], labels)
+            field['widget'].update_display(field['data'])
+
     def update_field_order(self):
         """Обновляет порядок полей"""
         for i, field in enumerate(self.fields):
@@ -437,21 +493,74 @@ class TableDesigner(QWidget):
 
     def save_table(self):
         """Сохраняет текущую таблицу"""
+        set_context(action="Сохранение таблицы")
         if not self.current_table:
             QMessageBox.warning(self, "Внимание", "Нет таблицы для сохранения")
             return
 
-        # Собираем поля
-        fields_data = [field['data'] for field in self.fields]
-
-        # Обновляем таблицу в project_manager
-        self.current_table['fields'] = fields_data
-        self.project_manager.update_table(self.current_table)
+        # Собираем поля - в новое определение таблицы, а не в текущее: оно
+        # заменит определение в проекте, только если сохранение состоится
+        self.apply_pending_options()
+        table = TableDef.from_dict({
+            **TableDef.from_dict(self.current_table).to_dict(),
+            'fields': [self.field_copy(field['data']) for field in self.fields],
+        })
+        lossy = self.project_manager.lossy_changes(table)
+        if lossy:
+            reply = QMessageBox.question(
+                self, "Смена типа поля",
+                "При смене типа будут потеряны данные:\n\n" + "\n".join(lossy) + "\n\nСохранить таблицу?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+
+        # Обновляем таблицу в project_manager (схема данных мигрирует сама)
+        try:
+            job = self.project_manager.update_table(table)
+        except MigrationInProgress as e:
+            QMessageBox.warning(self, "Внимание", f"{e}. Сохраните таблицу после окончания преобразования.")
+            return
 
-        # Обновляем список таблиц
+        # Открываем сохранённое определение (в нём могли появиться варианты списков)
+        field_id = self.current_field['id'] if self.current_field else None
         self.table_list.refresh()
+        self.table_list.select(table.id)
+        self.on_table_selected(table)
+        for field in self.fields:
+            if field['data']['id'] == field_id:
+                self.on_field_clicked(field['data'])
+                break
 
-        QMessageBox.information(self, "Успех", "Таблица сохранена")
+        if job is None:
+            QMessageBox.information(self, "Успех", "Таблица сохранена")
+        else:
+            self.wait_for_migration(job)
+
+    def wait_for_migration(self, job):
+        """Показывает прогресс фонового преобразования данных"""
+        progress = QProgressDialog("Преобразование данных таблицы...", None, 0, 100, self)
+        progress.setWindowTitle("Сохранение таблицы")
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setValue(0)
+
+        timer = QTimer(progress)
+
+        def poll():
+            progress.setValue(int(job.progress * 100))
+            if not job.done:
+                return
+            timer.stop()
+            progress.close()
+            if job.error:
+                QMessageBox.critical(self, "Ошибка", f"Не удалось преобразовать данные: {job.error}")
+            else:
+                self.table_viewer.refresh_table()
+                QMessageBox.information(self, "Успех", "Таблица сохранена")
+
+        timer.timeout.connect(poll)
+        timer.start(100)
 
     def toggle_preview(self):
         """Переключает режим предпросмотра"""
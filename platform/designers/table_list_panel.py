@@ -93,6 +93,13 @@ class TableListPanel(QWidget):
             item.setData(Qt.ItemDataRole.UserRole, table)
             self.list_widget.addItem(item)
 
+    def select(self, table_id):
+        """Выделяет таблицу в списке (без сигнала tableSelected)"""
+        for row, table in enumerate(self.tables):
+            if table.get('id') == table_id:
+                self.list_widget.setCurrentRow(row)
+                return
+
     def create_table(self):
         """Создаёт новую таблицу"""
         name, ok = QInputDialog.getText(self, "Новая таблица", "Введите название таблицы:")
@@ -9,6 +9,8 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 
+from ..core.formula_engine import check_syntax
+
 
 class FieldButton(QPushButton):
     """Кнопка для поля в формуле"""
@@ -405,9 +407,12 @@ class FormulaDialog(QDialog):
             self.preview_text.setText("Введите формулу")
             return
 
-        # TODO: реальный парсинг и вычисление
-        # Пока просто показываем формулу
-        self.preview_text.setText(f"Результат вычисления:\n{formula}")
+        # Поля пока не привязаны к таблице, поэтому проверяется только синтаксис
+        error = check_syntax(formula)
+        if error:
+            self.preview_text.setText(f"❌ Ошибка в формуле:\n{error}")
+        else:
+            self.preview_text.setText(f"✓ Формула корректна:\n{formula}")
 
     def get_formula(self):
         """Возвращает введённую формулу"""
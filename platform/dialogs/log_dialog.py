@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Диалог журнала: последние записи из кольцевого буфера (см. core.app_log)
+"""
+
+import logging
+
+from PyQt6.QtWidgets import *
+from PyQt6.QtCore import *
+from PyQt6.QtGui import *
+
+from ..core import app_log
+
+LEVEL_COLORS = {
+    logging.DEBUG: '#888888',
+    logging.INFO: '#e0e0e0',
+    logging.WARNING: '#dcdcaa',
+    logging.ERROR: '#f48771',
+    logging.CRITICAL: '#f48771',
+}
+
+
+class LogDialog(QDialog):
+    """Просмотр журнала с отбором по уровню и тексту; уровни модулей меняются на лету"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Журнал")
+        self.setMinimumSize(900, 520)
+        self.ring = app_log.ring_buffer()
+        self.shown_total = -1
+        self.setup_ui()
+        self.refresh()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+
+    def setup_ui(self):
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #1e1e1e;
+                color: #e0e0e0;
+            }
+            QPlainTextEdit, QLineEdit, QComboBox {
+                background-color: #252526;
+                color: #e0e0e0;
+                border: 1px solid #3c3c3c;
+                border-radius: 4px;
+                padding: 4px;
+            }
+            QPushButton {
+                background-color: #4c4c4c;
+                color: white;
+                border: none;
+                padding: 6px 14px;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #5c5c5c;
+            }
+            QLabel {
+                color: #e0e0e0;
+            }
+        """)
+        layout = QVBoxLayout(self)
+
+        filters = QHBoxLayout()
+        filters.addWidget(QLabel("Не ниже:"))
+        self.level_combo = QComboBox()
+        self.level_combo.addItems(app_log.LEVELS)
+        self.level_combo.currentIndexChanged.connect(lambda: self.refresh(force=True))
+        filters.addWidget(self.level_combo)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Поиск по тексту или модулю...")
+        self.search_edit.textChanged.connect(lambda: self.refresh(force=True))
+        filters.addWidget(self.search_edit, 1)
+        layout.addLayout(filters)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.text.setFont(QFont("Consolas", 9))
+        layout.addWidget(self.text, 1)
+
+        levels = QHBoxLayout()
+        levels.addWidget(QLabel("Уровни:"))
+        self.levels_edit = QLineEdit(self.levels_text())
+        self.levels_edit.setPlaceholderText("platform.core.database=DEBUG, platform.project_manager=INFO")
+        self.levels_edit.returnPressed.connect(self.apply_levels)
+        levels.addWidget(self.levels_edit, 1)
+        apply_btn = QPushButton("Применить")
+        apply_btn.clicked.connect(self.apply_levels)
+        levels.addWidget(apply_btn)
+        layout.addLayout(levels)
+
+        buttons = QHBoxLayout()
+        self.count_label = QLabel("")
+        buttons.addWidget(self.count_label)
+        buttons.addStretch()
+        clear_btn = QPushButton("Очистить")
+        clear_btn.clicked.connect(self.clear)
+        save_btn = QPushButton("Сохранить...")
+        save_btn.clicked.connect(self.save)
+        close_btn = QPushButton("Закрыть")
+        close_btn.clicked.connect(self.accept)
+        buttons.addWidget(clear_btn)
+        buttons.addWidget(save_btn)
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+
+    def levels_text(self):
+        return ', '.join(f"{name}={level}" if name else level for name, level in app_log.current_levels().items())
+
+    def entries(self):
+        min_level = getattr(logging, self.level_combo.currentText())
+        return self.ring.records(min_level, self.search_edit.text())
+
+    def refresh(self, force=False):
+        # Пока новых записей нет, текст не перестраивается
+        if not force and self.ring.total == self.shown_total:
+            return
+        self.shown_total = self.ring.total
+        entries = self.entries()
+        lines = []
+        for entry in entries:
+            color = LEVEL_COLORS.get(entry.level, '#e0e0e0')
+            text = entry.format().replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+            lines.append(f'<span style="color:{color}; white-space:pre">{text}</span>')
+        self.text.clear()
+        self.text.appendHtml('<br>'.join(lines))
+        self.text.moveCursor(QTextCursor.MoveOperation.End)
+        self.count_label.setText(f"Записей: {len(entries)} из {len(self.ring.entries)}")
+
+    def apply_levels(self):
+        try:
+            app_log.set_levels(app_log.parse_levels(self.levels_edit.text()))
+        except ValueError as e:
+            QMessageBox.warning(self, "Уровни журнала", str(e))
+            return
+        self.levels_edit.setText(self.levels_text())
+
+    def clear(self):
+        self.ring.clear()
+        self.refresh(force=True)
+
+    def save(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить журнал", "lowcode.log", "Журнал (*.log *.txt)")
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(entry.format() for entry in self.entries()))
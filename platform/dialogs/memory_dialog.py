@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Диалог памяти: кэши по категориям, открытые конструкторы, снимки tracemalloc
+и бюджеты (см. core.memory)
+"""
+
+from PyQt6.QtWidgets import *
+from PyQt6.QtCore import *
+from PyQt6.QtGui import *
+
+from ..core import memory
+from ..core.memory import CATEGORIES, MB, accountant
+
+# Примерная цена одного виджета Qt (C++-объект, QWidget-обёртка, стиль) - точнее измерить нельзя
+WIDGET_BYTES = 2048
+
+
+def format_bytes(size):
+    if size >= MB:
+        return f"{size / MB:.1f} МБ"
+    return f"{size / 1024:.1f} КБ"
+
+
+def owned_by(obj, widget):
+    """Лежит ли QObject obj внутри widget (по цепочке родителей)"""
+    if not isinstance(obj, QObject):
+        return False
+    while obj is not None:
+        if obj is widget:
+            return True
+        obj = obj.parent()
+    return False
+
+
+class MemoryDialog(QDialog):
+    """Объём кэшей и конструкторов, крупнейшие места выделения памяти, бюджеты"""
+
+    def __init__(self, tab_widget=None, parent=None):
+        super().__init__(parent)
+        self.tab_widget = tab_widget
+        self.setWindowTitle("Память")
+        self.setMinimumSize(820, 560)
+        self.setup_ui()
+        self.refresh()
+
+    def setup_ui(self):
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #1e1e1e;
+                color: #e0e0e0;
+            }
+            QTreeWidget, QTableWidget, QSpinBox {
+                background-color: #252526;
+                color: #e0e0e0;
+                border: 1px solid #3c3c3c;
+            }
+            QHeaderView::section {
+                background-color: #2d2d2d;
+                color: #e0e0e0;
+                padding: 4px;
+                border: none;
+                border-right: 1px solid #3c3c3c;
+            }
+            QTabWidget::pane {
+                border: 1px solid #3c3c3c;
+            }
+            QTabBar::tab {
+                background-color: #2d2d2d;
+                color: #e0e0e0;
+                padding: 6px 14px;
+            }
+            QTabBar::tab:selected {
+                background-color: #1e1e1e;
+            }
+            QPushButton {
+                background-color: #4c4c4c;
+                color: white;
+                border: none;
+                padding: 6px 14px;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #5c5c5c;
+            }
+            QLabel {
+                color: #e0e0e0;
+            }
+        """)
+        layout = QVBoxLayout(self)
+        tabs = QTabWidget()
+        layout.addWidget(tabs, 1)
+
+        # Кэши и конструкторы
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Объект", "Размер", "Элементов"])
+        self.tree.header().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        tabs.addTab(self.tree, "Учёт")
+
+        # tracemalloc
+        allocations = QWidget()
+        allocations_layout = QVBoxLayout(allocations)
+        tracing_row = QHBoxLayout()
+        self.tracing_btn = QPushButton()
+        self.tracing_btn.clicked.connect(self.toggle_tracing)
+        tracing_row.addWidget(self.tracing_btn)
+        self.group_combo = QComboBox()
+        self.group_combo.addItem("По файлам", 'filename')
+        self.group_combo.addItem("По строкам", 'lineno')
+        self.group_combo.currentIndexChanged.connect(self.refresh_allocations)
+        tracing_row.addWidget(self.group_combo)
+        snapshot_btn = QPushButton("Снимок")
+        snapshot_btn.clicked.connect(self.refresh_allocations)
+        tracing_row.addWidget(snapshot_btn)
+        tracing_row.addStretch()
+        self.traced_label = QLabel("")
+        tracing_row.addWidget(self.traced_label)
+        allocations_layout.addLayout(tracing_row)
+        self.allocations = QTableWidget(0, 3)
+        self.allocations.setHorizontalHeaderLabels(["Место", "Размер", "Блоков"])
+        self.allocations.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.allocations.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.allocations.verticalHeader().setVisible(False)
+        allocations_layout.addWidget(self.allocations, 1)
+        tabs.addTab(allocations, "Выделения")
+
+        # Бюджеты
+        budgets = QWidget()
+        budgets_layout = QFormLayout(budgets)
+        self.budget_spins = {}
+        for key in memory.DEFAULT_BUDGETS:
+            spin = QSpinBox()
+            spin.setRange(0, 64 * 1024)
+            spin.setSuffix(" МБ")
+            spin.setSpecialValueText("без ограничения")
+            spin.setValue(accountant.budgets.get(key, 0) // MB)
+            self.budget_spins[key] = spin
+            budgets_layout.addRow("Всего:" if key == 'total' else CATEGORIES[key] + ":", spin)
+        save_btn = QPushButton("Сохранить бюджеты")
+        save_btn.clicked.connect(self.save_budgets)
+        budgets_layout.addRow(save_btn)
+        tabs.addTab(budgets, "Бюджеты")
+
+        buttons = QHBoxLayout()
+        self.total_label = QLabel("")
+        buttons.addWidget(self.total_label)
+        buttons.addStretch()
+        trim_btn = QPushButton("Освободить сейчас")
+        trim_btn.clicked.connect(self.enforce)
+        refresh_btn = QPushButton("Обновить")
+        refresh_btn.clicked.connect(self.refresh)
+        close_btn = QPushButton("Закрыть")
+        close_btn.clicked.connect(self.accept)
+        buttons.addWidget(trim_btn)
+        buttons.addWidget(refresh_btn)
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+
+    def add_item(self, parent, name, size, items=None):
+        item = QTreeWidgetItem(parent, [name, format_bytes(size), "" if items is None else str(items)])
+        item.setTextAlignment(1, Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        item.setTextAlignment(2, Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        return item
+
+    def refresh(self):
+        usage = accountant.usage(with_details=True)
+        totals = accountant.by_category(usage)
+        self.tree.clear()
+
+        for category, title in CATEGORIES.items():
+            entries = [entry for entry in usage if entry.category == category]
+            budget = accountant.budgets.get(category)
+            label = f"{title} (бюджет {format_bytes(budget)})" if budget else title
+            category_item = self.add_item(self.tree, label, totals.get(category, 0))
+            for entry in entries:
+                entry_item = self.add_item(category_item, entry.name, entry.bytes, entry.items)
+                for name, size in entry.details:
+                    self.add_item(entry_item, name, size)
+
+        # Конструкторы: виджеты вкладки и кэши, которые ей принадлежат
+        if self.tab_widget is not None:
+            designers_item = self.add_item(self.tree, "Открытые конструкторы", 0)
+            designers_total = 0
+            for index in range(self.tab_widget.count()):
+                tab = self.tab_widget.widget(index)
+                widgets = len(tab.findChildren(QWidget)) + 1
+                owned = [entry for entry in usage if owned_by(entry.owner, tab)]
+                size = widgets * WIDGET_BYTES + sum(entry.bytes for entry in owned)
+                designers_total += size
+                tab_item = self.add_item(designers_item, self.tab_widget.tabText(index), size)
+                self.add_item(tab_item, f"Виджеты ({widgets})", widgets * WIDGET_BYTES, widgets)
+                for entry in owned:
+                    self.add_item(tab_item, entry.name, entry.bytes, entry.items)
+            designers_item.setText(1, format_bytes(designers_total))
+
+        self.tree.expandToDepth(0)
+        total = sum(totals.values())
+        peak = memory.process_memory()
+        text = f"Кэши: {format_bytes(total)}"
+        if accountant.budgets.get('total'):
+            text += f" из {format_bytes(accountant.budgets['total'])}"
+        if peak:
+            text += f"   Пик процесса: {format_bytes(peak)}"
+        self.total_label.setText(text)
+        self.refresh_allocations()
+
+    def refresh_allocations(self):
+        tracing = memory.tracemalloc.is_tracing()
+        self.tracing_btn.setText("Остановить трассировку" if tracing else "Начать трассировку")
+        current, peak = memory.traced_memory()
+        self.traced_label.setText(f"Python: {format_bytes(current)}, пик {format_bytes(peak)}" if tracing else
+                                  "Трассировка выключена (замедляет работу)")
+        rows = memory.top_allocations(group_by=self.group_combo.currentData())
+        self.allocations.setRowCount(len(rows))
+        for row, (location, size, count) in enumerate(rows):
+            self.allocations.setItem(row, 0, QTableWidgetItem(location))
+            self.allocations.setItem(row, 1, QTableWidgetItem(format_bytes(size)))
+            self.allocations.setItem(row, 2, QTableWidgetItem(str(count)))
+
+    def toggle_tracing(self):
+        if memory.tracemalloc.is_tracing():
+            memory.stop_tracing()
+        else:
+            memory.start_tracing()
+        self.refresh_allocations()
+
+    def save_budgets(self):
+        for key, spin in self.budget_spins.items():
+            accountant.budgets[key] = spin.value() * MB
+        try:
+            accountant.save_budgets()
+        except OSError as e:
+            QMessageBox.warning(self, "Бюджеты памяти", f"Не удалось сохранить: {e}")
+        accountant.enforce()
+        self.refresh()
+
+    def enforce(self):
+        freed = accountant.enforce()
+        self.refresh()
+        self.total_label.setText(self.total_label.text() + f"   Освобождено: {format_bytes(freed)}")
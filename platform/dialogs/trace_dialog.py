@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Диалог профилирования: сводка замеров операций (см. core.tracing)
+"""
+
+from PyQt6.QtWidgets import *
+from PyQt6.QtCore import *
+from PyQt6.QtGui import *
+
+from ..core import tracing
+
+COLUMNS = [
+    ("Операция", 'name'),
+    ("Вызовов", 'count'),
+    ("Всего, мс", 'total_ms'),
+    ("p50, мс", 'p50_ms'),
+    ("p95, мс", 'p95_ms'),
+    ("p99, мс", 'p99_ms'),
+    ("Макс., мс", 'max_ms'),
+]
+
+
+class TraceDialog(QDialog):
+    """Число вызовов и p50/p95/p99 по каждой операции; выгрузка в Chrome trace"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Профилирование")
+        self.setMinimumSize(760, 460)
+        self.setup_ui()
+        self.refresh()
+
+        # Пока диалог открыт, сводка обновляется сама
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start()
+
+    def setup_ui(self):
+        self.setStyleSheet("""
+            QDialog {
+                background-color: #1e1e1e;
+                color: #e0e0e0;
+            }
+            QTableWidget {
+                background-color: #252526;
+                color: #e0e0e0;
+                gridline-color: #3c3c3c;
+                border: 1px solid #3c3c3c;
+            }
+            QHeaderView::section {
+                background-color: #2d2d2d;
+                color: #e0e0e0;
+                padding: 4px;
+                border: none;
+                border-right: 1px solid #3c3c3c;
+            }
+            QPushButton {
+                background-color: #4c4c4c;
+                color: white;
+                border: none;
+                padding: 6px 14px;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #5c5c5c;
+            }
+            QCheckBox, QLabel {
+                color: #e0e0e0;
+            }
+        """)
+        layout = QVBoxLayout(self)
+
+        top = QHBoxLayout()
+        self.enabled_check = QCheckBox("Записывать замеры")
+        self.enabled_check.setChecked(tracing.is_enabled())
+        self.enabled_check.toggled.connect(tracing.enable)
+        top.addWidget(self.enabled_check)
+        top.addStretch()
+        self.count_label = QLabel("")
+        top.addWidget(self.count_label)
+        layout.addLayout(top)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels([title for title, _ in COLUMNS])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        clear_btn = QPushButton("Очистить")
+        clear_btn.clicked.connect(self.clear)
+        export_btn = QPushButton("Экспорт (Chrome trace)...")
+        export_btn.clicked.connect(self.export)
+        close_btn = QPushButton("Закрыть")
+        close_btn.clicked.connect(self.accept)
+        buttons.addWidget(clear_btn)
+        buttons.addWidget(export_btn)
+        buttons.addStretch()
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+
+    def refresh(self):
+        rows = tracing.summary()
+        self.table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, (_, key) in enumerate(COLUMNS):
+                value = row[key]
+                item = QTableWidgetItem(f"{value:.2f}" if isinstance(value, float) else str(value))
+                if c:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(r, c, item)
+        self.count_label.setText(f"Замеров: {sum(row['count'] for row in rows)}")
+
+    def clear(self):
+        tracing.clear()
+        self.refresh()
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Экспорт замеров", "trace.json", "Chrome trace (*.json)")
+        if path:
+            count = tracing.export_chrome_trace(path)
+            self.count_label.setText(f"Выгружено замеров: {count}")
@@ -11,10 +11,16 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 
+from platform.core import app_log
+from platform.core.memory import accountant
+from platform.core.stall_watchdog import StallWatchdog
 from platform.project_manager import ProjectManager
 from platform.start_page import StartPage
 from platform.designers.table_designer import TableDesigner
 from platform.dialogs.modern_message_box import ModernMessageBox
+from platform.dialogs.log_dialog import LogDialog
+from platform.dialogs.memory_dialog import MemoryDialog
+from platform.dialogs.trace_dialog import TraceDialog
 
 
 class MainWindow(QMainWindow):
@@ -24,6 +30,7 @@ class MainWindow(QMainWindow):
 
     def __init__(self):
         super().__init__()
+        app_log.configure()
         self.project_manager = None
         self.current_project_path = None
         self.current_designer = None
@@ -34,6 +41,8 @@ class MainWindow(QMainWindow):
         self.setup_ui()
         self.setup_menu()
         self.setup_status_bar()
+        self.setup_watchdog()
+        self.setup_memory_budget()
 
         # Показываем стартовую страницу
         self.show_start_page()
@@ -44,6 +53,7 @@ class MainWindow(QMainWindow):
         self.tab_widget = QTabWidget()
         self.tab_widget.setTabsClosable(True)
         self.tab_widget.tabCloseRequested.connect(self.close_tab)
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
         self.tab_widget.setStyleSheet("""
             QTabWidget::pane {
                 background-color: #1e1e1e;
@@ -71,6 +81,7 @@ class MainWindow(QMainWindow):
     def setup_menu(self):
         """Создание меню приложения"""
         menubar = self.menuBar()
+        menubar.triggered.connect(lambda action: self.watchdog_context(action=action.text()))
         menubar.setStyleSheet("""
             QMenuBar {
                 background-color: #2d2d2d;
@@ -152,6 +163,20 @@ class MainWindow(QMainWindow):
         # Меню Справка
         help_menu = menubar.addMenu("Справка")
 
+        trace_action = QAction("Профилирование...", self)
+        trace_action.triggered.connect(self.show_trace)
+        help_menu.addAction(trace_action)
+
+        log_action = QAction("Журнал...", self)
+        log_action.triggered.connect(self.show_log)
+        help_menu.addAction(log_action)
+
+        memory_action = QAction("Память...", self)
+        memory_action.triggered.connect(self.show_memory)
+        help_menu.addAction(memory_action)
+
+        help_menu.addSeparator()
+
         about_action = QAction("О программе", self)
         about_action.triggered.connect(self.show_about)
         help_menu.addAction(about_action)
@@ -168,6 +193,30 @@ class MainWindow(QMainWindow):
         self.status_label = QLabel("Готов к работе")
         self.statusBar().addWidget(self.status_label)
 
+    def setup_watchdog(self):
+        """Heartbeat цикла событий для сторожа зависаний (отчёты - в ~/.lowcode/stalls.jsonl)"""
+        self.watchdog = StallWatchdog()
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setInterval(int(self.watchdog.interval * 1000))
+        self.heartbeat.timeout.connect(self.watchdog.beat)
+        self.heartbeat.start()
+        self.watchdog.start()
+
+    def setup_memory_budget(self):
+        """Кэши сверх бюджетов памяти (~/.lowcode/memory.json) периодически сокращаются"""
+        self.memory_timer = QTimer(self)
+        self.memory_timer.setInterval(10000)
+        self.memory_timer.timeout.connect(accountant.enforce)
+        self.memory_timer.start()
+
+    def watchdog_context(self, **values):
+        if getattr(self, 'watchdog', None) is not None:
+            self.watchdog.set_context(**values)
+
+    def on_tab_changed(self, index):
+        """Активный конструктор - в контекст отчётов о зависаниях"""
+        self.watchdog_context(designer=self.tab_widget.tabText(index) if index >= 0 else None)
+
     def show_start_page(self):
         """Показывает стартовую страницу"""
         self.start_page = StartPage(self.project_manager)
@@ -392,6 +441,18 @@ class MainWindow(QMainWindow):
             "• Логики"
         )
 
+    def show_trace(self):
+        """Сводка замеров времени операций"""
+        TraceDialog(self).exec()
+
+    def show_log(self):
+        """Последние записи журнала приложения"""
+        LogDialog(self).exec()
+
+    def show_memory(self):
+        """Учёт памяти кэшей и конструкторов, бюджеты"""
+        MemoryDialog(self.tab_widget, self).exec()
+
     def closeEvent(self, event):
         """Обработка закрытия окна"""
         if self.project_manager:
@@ -404,4 +465,8 @@ class MainWindow(QMainWindow):
             else:
                 event.ignore()
         else:
-            event.accept()
\ No newline at end of file
+            event.accept()
+        if event.isAccepted():
+            self.heartbeat.stop()
+            self.memory_timer.stop()
+            self.watchdog.stop()
\ No newline at end of file
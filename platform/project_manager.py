@@ -5,11 +5,27 @@
 """
 
 import os
-import json
+import logging
 import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterator
 from dataclasses import dataclass, field
 
+from platform.core.blob_store import BlobStore
+from platform.core.column_stats import StatisticsService
+from platform.core.database import Database, Row, Search, storage_type
+from platform.core.formula_engine import Formula, FormulaCache, FormulaEngine, FormulaError
+from platform.core.list_codec import add_options, ensure_codes
+from platform.core.memory import accountant, deep_size
+from platform.core.schema import TableDef, SCHEMA_VERSION, upgrade_project_data
+from platform.core.schema_migration import LOSSY_CHANGES, MigrationInProgress, MigrationJob, SchemaMigrator
+from platform.core.serializer import get_serializer
+from platform.core.snapshot_cache import SnapshotCache
+from platform.core.tracing import traced
+from platform.core.translator import Translator, UniqueNames
+from platform.core.value_codecs import encode_filter, encode_values, field_encoders, search_values
+
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class Project:
@@ -20,7 +36,7 @@ class Project:
     created: str = field(default_factory=lambda: datetime.datetime.now().isoformat())
     modified: str = field(default_factory=lambda: datetime.datetime.now().isoformat())
     
-    tables: List[Dict] = field(default_factory=list)
+    tables: List[TableDef] = field(default_factory=list)
     forms: List[Dict] = field(default_factory=list)
     reports: List[Dict] = field(default_factory=list)
     menus: List[Dict] = field(default_factory=list)
@@ -30,6 +46,7 @@ class Project:
     
     def to_dict(self) -> Dict:
         return {
+            'schema_version': SCHEMA_VERSION,
             'name': self.name,
             'description': self.description,
             'author': self.author,
@@ -37,7 +54,7 @@ class Project:
             'modified': datetime.datetime.now().isoformat(),
             'theme': self.theme,
             'database_type': self.database_type,
-            'tables': self.tables,
+            'tables': [table.to_dict() for table in self.tables],
             'forms': self.forms,
             'reports': self.reports,
             'menus': self.menus,
@@ -45,6 +62,7 @@ class Project:
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'Project':
+        """Ожидает данные, приведённые к SCHEMA_VERSION (upgrade_project_data)"""
         return cls(
             name=data['name'],
             description=data.get('description', ''),
@@ -53,7 +71,7 @@ class Project:
             modified=data.get('modified', ''),
             theme=data.get('theme', 'dark_blue'),
             database_type=data.get('database_type', 'sqlite'),
-            tables=data.get('tables', []),
+            tables=[TableDef.from_dict(table) for table in data.get('tables', [])],
             forms=data.get('forms', []),
             reports=data.get('reports', []),
             menus=data.get('menus', [])
@@ -63,12 +81,29 @@ class Project:
 class ProjectManager:
     """Менеджер проектов"""
     
-    def __init__(self, projects_folder: str = "projects"):
+    def __init__(self, projects_folder: str = "projects", use_snapshot_cache: bool = True,
+                 serializer: Optional[str] = None, pretty: bool = True):
         self.projects_folder = projects_folder
+        # serializer - имя библиотеки JSON ('orjson', 'json'); по умолчанию самая быстрая из доступных
+        self.serializer = get_serializer(serializer)
+        # pretty=False - компактный файл без отступов (меньше и быстрее, но хуже для diff)
+        self.pretty = pretty
         self.current_project: Optional[Project] = None
+        # Занятые английские имена таблиц проекта (строится при первом создании таблицы)
+        self._table_names: Optional[UniqueNames] = None
         self.current_file: Optional[str] = None
+        self._database: Optional[Database] = None
+        self._blob_store: Optional[BlobStore] = None
+        self._statistics: Optional[StatisticsService] = None
+        # Колонки и агрегаты для формул между пересчётами (сбрасываются при изменении данных)
+        self.formula_cache = FormulaCache()
+        # Фоновые преобразования данных: table_id -> последняя задача
+        self.migrations: Dict[str, MigrationJob] = {}
+        self.snapshot_cache: Optional[SnapshotCache] = SnapshotCache() if use_snapshot_cache else None
         
         os.makedirs(projects_folder, exist_ok=True)
+        accountant.register(self, "Определения таблиц", 'project', ProjectManager.memory_usage,
+                            details=ProjectManager.memory_details)
     
     def create_project(self, name: str, description: str = "", author: str = "") -> Project:
         self.current_project = Project(
@@ -77,8 +112,11 @@ class ProjectManager:
             author=author
         )
         self.current_file = None
+        self._table_names = None
+        self.close_database()
         return self.current_project
     
+    @traced('project.save')
     def save_project(self, filename: Optional[str] = None) -> bool:
         if not self.current_project:
             return False
@@ -86,33 +124,400 @@ class ProjectManager:
         if filename:
             self.current_file = filename
         elif not self.current_file:
-            safe_name = self.current_project.name.replace(' ', '_').lower()
-            self.current_file = os.path.join(
-                self.projects_folder, 
-                f"{safe_name}.ncp"
-            )
+            self.current_file = self._default_file()
         
         try:
             data = self.current_project.to_dict()
-            with open(self.current_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            content = self.serializer.dumps(data, self.pretty)
+            with open(self.current_file, 'wb') as f:
+                f.write(content)
+            
+            if self.snapshot_cache:
+                self.snapshot_cache.store(self.current_file, self.current_project, content)
+            logger.info("Проект сохранён: %s (%d байт)", self.current_file, len(content))
             return True
-        except Exception as e:
-            print(f"Ошибка сохранения: {e}")
+        except Exception:
+            logger.exception("Ошибка сохранения: %s", self.current_file)
             return False
     
+    @traced('project.load')
     def load_project(self, filename: str) -> Optional[Project]:
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            project = self.snapshot_cache.load(filename) if self.snapshot_cache else None
+            logger.debug("Загрузка %s: %s", filename, "из кэша снимков" if project is not None else "разбор файла")
+            
+            if project is None:
+                with open(filename, 'rb') as f:
+                    content = f.read()
+                data = self.serializer.loads(content)
+                
+                # Старые форматы приводятся к каноническому один раз, при загрузке
+                project = Project.from_dict(upgrade_project_data(data))
+                if self.snapshot_cache:
+                    self.snapshot_cache.store(filename, project, content)
             
-            self.current_project = Project.from_dict(data)
+            self.current_project = project
             self.current_file = filename
+            self._table_names = None
+            self.close_database()
+            logger.info("Проект '%s' загружен: %s", project.name, filename)
             return self.current_project
-        except Exception as e:
-            print(f"Ошибка загрузки: {e}")
+        except Exception:
+            logger.exception("Ошибка загрузки: %s", filename)
+            return None
+    
+    def _default_file(self) -> str:
+        """Имя файла проекта по его названию"""
+        safe_name = self.current_project.name.replace(' ', '_').lower()
+        return os.path.join(self.projects_folder, f"{safe_name}.ncp")
+    
+    # ========== БАЗА ДАННЫХ ==========
+    
+    def database_path(self) -> str:
+        """База данных лежит рядом с файлом проекта"""
+        project_file = self.current_file or self._default_file()
+        return os.path.splitext(project_file)[0] + '.db'
+    
+    @property
+    def database(self) -> Database:
+        if self._database is None:
+            self._database = Database(self.database_path())
+        return self._database
+    
+    @property
+    def blob_store(self) -> BlobStore:
+        """Вложения полей «Файл» и «Изображение» - в папке рядом с базой"""
+        if self._blob_store is None:
+            folder = os.path.splitext(self.database_path())[0] + '_files'
+            self._blob_store = BlobStore(folder, self.database)
+        return self._blob_store
+    
+    @property
+    def statistics(self) -> StatisticsService:
+        """Статистика колонок (пересчитывается в фоне, см. column_stats)"""
+        if self._statistics is None:
+            self._statistics = StatisticsService(self.database)
+        return self._statistics
+    
+    def close_database(self):
+        self._blob_store = None
+        self.formula_cache.clear()
+        if self._statistics is not None:
+            self._statistics.shutdown()
+            self._statistics = None
+        if self._database is not None:
+            self._database.close()
+            self._database = None
+    
+    def memory_details(self) -> List[tuple]:
+        """Память определений по таблицам: [(имя таблицы, байт)]"""
+        return [(table.name_ru or table.id, deep_size(table)) for table in self.get_all_tables()]
+    
+    def memory_usage(self) -> tuple:
+        details = self.memory_details()
+        return sum(size for _, size in details), len(details)
+    
+    # ========== ТАБЛИЦЫ ==========
+    
+    def get_all_tables(self) -> List[TableDef]:
+        if not self.current_project:
+            return []
+        return self.current_project.tables
+    
+    def get_table(self, table_id: str) -> Optional[TableDef]:
+        for table in self.get_all_tables():
+            if table.id == table_id:
+                return table
+        return None
+    
+    def create_table(self, name: str) -> TableDef:
+        """Создаёт таблицу в проекте вместе с её хранилищем"""
+        tables = self.current_project.tables
+        if self._table_names is None:
+            self._table_names = UniqueNames(table.name_en for table in tables)
+        name_en = self._table_names.add(Translator.to_english(name))
+        
+        table = TableDef(
+            id=f"table_{len(tables)}_{name_en}",
+            name_ru=name,
+            name_en=name_en,
+        )
+        tables.append(table)
+        self.update_table(table)
+        return table
+    
+    def update_table(self, table: TableDef) -> Optional[MigrationJob]:
+        """
+        Сохраняет определение таблицы и приводит к нему данные в базе.
+        Если смена типов полей требует перезаписи значений, она запускается
+        в фоне - возвращается задача, за прогрессом которой можно следить.
+        Пока она не закончена, таблицу и её записи менять нельзя
+        (MigrationInProgress).
+        """
+        if not self.current_project:
+            return None
+        
+        table = TableDef.from_dict(table)
+        if self.migration(table.id) is not None:
+            raise MigrationInProgress(f"Данные таблицы «{table.name_ru}» ещё преобразуются")
+        tables = self.current_project.tables
+        for i, existing in enumerate(tables):
+            if existing.id == table.id:
+                tables[i] = table
+                break
+        else:
+            tables.append(table)
+        
+        for field_def in table.fields:
+            if field_def.type_id == 'list':
+                ensure_codes(field_def)
+        
+        migrator = SchemaMigrator(self.database)
+        plan = migrator.plan(table)
+        
+        # При переводе текста в список встречающиеся значения становятся вариантами
+        for step in plan.rewrite_steps:
+            if step.new_type == 'list' and storage_type(step.old_type) == 'TEXT':
+                add_options(step.field, self.database.distinct_values(table.id, step.field_id))
+        
+        migrator.apply_metadata(plan)
+        self._data_changed(table.id)
+        
+        if plan.needs_rewrite:
+            # Статистика и формулы, посчитанные по ходу перезаписи, видели старые значения
+            job = self.migrations[table.id] = MigrationJob(
+                migrator, plan, on_done=lambda job: self._data_changed(job.plan.table_id)
+            )
+            job.start()
+            return job
+        return None
+    
+    def _data_changed(self, table_id: str):
+        """Сбрасывает всё, что посчитано по данным таблицы (индекс сбрасывает сама база при смене схемы)"""
+        self.formula_cache.invalidate(table_id)
+        if self._statistics is not None:
+            self._statistics.invalidate(table_id)
+    
+    def lossy_changes(self, table: TableDef) -> List[str]:
+        """Описания смен типа в новом определении таблицы, при которых теряются данные"""
+        if not self.current_project:
+            return []
+        plan = SchemaMigrator(self.database).plan(TableDef.from_dict(table))
+        return [
+            f"{step.field.name_ru if step.field else step.field_id}: {LOSSY_CHANGES[(step.old_type, step.new_type)]}"
+            for step in plan.lossy_steps
+        ]
+    
+    def migration(self, table_id: str) -> Optional[MigrationJob]:
+        """Незаконченное преобразование данных таблицы или None"""
+        job = self.migrations.get(table_id)
+        if job is not None and job.done:
+            del self.migrations[table_id]
+            job = None
+        return job
+    
+    def _check_writable(self, table_id: str):
+        """
+        Пока данные таблицы преобразуются в фоне, записи в неё не меняются:
+        пакеты, которые задача уже переписала, не увидели бы изменений.
+        """
+        if self.migration(table_id) is not None:
+            table = self.get_table(table_id)
+            name = table.name_ru if table is not None else table_id
+            raise MigrationInProgress(f"Данные таблицы «{name}» ещё преобразуются")
+    
+    def delete_table(self, table_id: str):
+        if not self.current_project:
+            return
+        table = self.get_table(table_id)
+        if table is not None and self._table_names is not None:
+            self._table_names.discard(table.name_en)
+        self.current_project.tables = [t for t in self.current_project.tables if t.id != table_id]
+        self.database.drop_table(table_id)
+        self._data_changed(table_id)
+    
+    # ========== ДАННЫЕ ТАБЛИЦ ==========
+    
+    def iter_records(self, table_id: str, batch_size: int = 1000, filter: Optional[Dict] = None,
+                     order: Optional[str] = None, search: Optional[str] = None) -> Iterator[Row]:
+        """
+        Потоковое чтение записей таблицы пакетами по batch_size.
+        Значения в filter - в виде для пользователя: {'f_date': ('01.01.2024', '31.12.2024')}
+        """
+        filter = self._encode_filter(table_id, filter)
+        return self.database.iter_records(table_id, batch_size, filter, order, self._encode_search(table_id, search))
+    
+    def count(self, table_id: str, filter: Optional[Dict] = None, search: Optional[str] = None) -> int:
+        return self.database.count(
+            table_id, self._encode_filter(table_id, filter), self._encode_search(table_id, search)
+        )
+    
+    def get_page(self, table_id: str, page: int, page_size: int = 100, filter: Optional[Dict] = None,
+                 order: Optional[str] = None, search: Optional[str] = None) -> List[Row]:
+        filter = self._encode_filter(table_id, filter)
+        return self.database.get_page(table_id, page, page_size, filter, order, self._encode_search(table_id, search))
+    
+    def facet_counts(self, table_id: str, field_id: str, filter: Optional[Dict] = None,
+                     search: Optional[str] = None) -> Dict[Any, int]:
+        """Число записей по хранимым значениям поля (Да/Нет, варианты списка, оценки)"""
+        return self.database.facet_counts(
+            table_id, field_id, self._encode_filter(table_id, filter), self._encode_search(table_id, search)
+        )
+    
+    def sample_records(self, table_id: str, size: int) -> List[Row]:
+        """Случайные записи таблицы (для оценок по выборке)"""
+        return self.database.sample_records(table_id, size)
+    
+    def get_table_data(self, table_id: str) -> List[Row]:
+        """Все записи таблицы списком (для небольших таблиц; иначе - iter_records)"""
+        return list(self.iter_records(table_id))
+    
+    def _encoders(self, table_id: str) -> Dict:
+        table = self.get_table(table_id)
+        return field_encoders(table) if table is not None else {}
+    
+    def _encode_filter(self, table_id: str, filter: Optional[Dict]) -> Optional[Dict]:
+        """Фильтр в хранимом виде; условия упорядочены по статистике колонок"""
+        if not filter:
+            return filter
+        filter = encode_filter(filter, self._encoders(table_id))
+        if self._statistics is not None:
+            filter = self._statistics.plan_filter(table_id, filter)
+        return filter
+    
+    def _encode_search(self, table_id: str, search: Optional[str]) -> Optional[Search]:
+        """Поиск по тексту и по значениям полей, которые хранятся кодами и числами"""
+        if not search:
             return None
+        table = self.get_table(table_id)
+        return Search(search, search_values(table, search) if table is not None else {})
+    
+    # Значения передаются в виде для пользователя (например, деньги - «1234,50»),
+    # в базу они пишутся в хранимом виде через кодеки типов полей
+    
+    def add_record(self, table_id: str, values: Dict[str, Any]) -> int:
+        self._check_writable(table_id)
+        values = encode_values(values, self._encoders(table_id))
+        record_id = self.database.insert_record(table_id, values)
+        self.formula_cache.invalidate(table_id)
+        if self._statistics is not None:
+            self._statistics.observe_insert(table_id, [values])
+        return record_id
+    
+    def add_records(self, table_id: str, records: List[Dict[str, Any]],
+                    errors: Optional[List[tuple]] = None) -> int:
+        """
+        Добавляет записи пакетом. Если передан список errors, записи с
+        неподходящими значениями пропускаются, а в errors добавляется
+        (номер записи, текст ошибки); иначе ValueError прерывает весь пакет.
+        """
+        self._check_writable(table_id)
+        encoders = self._encoders(table_id)
+        if errors is None:
+            records = [encode_values(record, encoders) for record in records]
+        else:
+            encoded = []
+            for index, record in enumerate(records):
+                try:
+                    encoded.append(encode_values(record, encoders))
+                except ValueError as e:
+                    errors.append((index, str(e)))
+            records = encoded
+        count = self.database.insert_records(table_id, records)
+        self.formula_cache.invalidate(table_id)
+        if self._statistics is not None:
+            self._statistics.observe_insert(table_id, records)
+        return count
+    
+    def update_record(self, table_id: str, record_id: int, values: Dict[str, Any]):
+        self._check_writable(table_id)
+        self.database.update_record(table_id, record_id, encode_values(values, self._encoders(table_id)))
+        self.formula_cache.invalidate(table_id)
+        if self._statistics is not None:
+            self._statistics.note_changes(table_id)
+    
+    def delete_record(self, table_id: str, record_id: int):
+        self._check_writable(table_id)
+        self.database.delete_record(table_id, record_id)
+        self.formula_cache.invalidate(table_id)
+        if self._statistics is not None:
+            self._statistics.note_changes(table_id)
+    
+    # ========== ВЫЧИСЛЯЕМЫЕ ПОЛЯ ==========
+    
+    def formula_order(self, table: TableDef) -> List[tuple]:
+        """
+        [(field_id, Formula)] вычисляемых полей таблицы в порядке зависимостей:
+        поле, на которое ссылается формула, вычисляется раньше неё.
+        """
+        engine = FormulaEngine(table)
+        formulas: Dict[str, Formula] = {
+            field_def.id: engine.compile(field_def.get('formula'))
+            for field_def in table.fields
+            if field_def.type_id == 'formula' and field_def.get('formula')
+        }
+        ordered: List[tuple] = []
+        state: Dict[str, int] = {}  # 1 - в обходе, 2 - готово
+        
+        def visit(field_id: str):
+            if state.get(field_id) == 2:
+                return
+            if state.get(field_id) == 1:
+                raise FormulaError(f"Циклическая ссылка между вычисляемыми полями ({field_id})")
+            state[field_id] = 1
+            for dependency in formulas[field_id].fields:
+                if dependency in formulas:
+                    visit(dependency)
+            state[field_id] = 2
+            ordered.append((field_id, formulas[field_id]))
+        
+        for field_id in formulas:
+            visit(field_id)
+        return ordered
+    
+    @traced('project.recalculate')
+    def recalculate(self, table_id: str, batch_size: int = 5000) -> int:
+        """
+        Пересчитывает вычисляемые поля таблицы и записывает результаты
+        (текстом) в их колонки. Записи читаются пакетами по id, агрегаты
+        по колонкам считаются по всей таблице (колонки и агрегаты - из
+        formula_cache). Возвращает число записанных значений.
+        """
+        table = self.get_table(table_id)
+        if table is None:
+            return 0
+        self._check_writable(table_id)
+        written = 0
+        
+        def column_source(source_id: str) -> List:
+            return self.formula_cache.column(
+                table_id, source_id, lambda: [record.get(source_id) for record in self.iter_records(table_id)]
+            )
+        
+        generation = self.formula_cache.generation
+        for field_id, formula in self.formula_order(table):
+            aggregates = self.formula_cache.table_aggregates(table_id)
+            texts: List[Optional[str]] = []
+            last_id = 0
+            while True:
+                # Пакет по id, а не открытый курсор: колонка меняется по ходу чтения
+                batch = self.database.get_page(table_id, 0, batch_size, filter={'id': (last_id + 1, None)})
+                if not batch:
+                    break
+                results = [formula.as_text(value) for value in formula.evaluate_all(batch, column_source, aggregates)]
+                written += self.database.update_column(
+                    table_id, field_id, [(text, record.id) for text, record in zip(results, batch)]
+                )
+                texts.extend(results)
+                last_id = batch[-1].id
+            # Колонка поля переписана: агрегаты по ней устарели, а новые значения
+            # (их прочтёт формула, которая ссылается на это поле) уже посчитаны
+            self.formula_cache.store(table_id, field_id, texts, generation)
+        if written and self._statistics is not None:
+            self._statistics.note_changes(table_id, written)
+        return written
     
+    @traced('project.list')
     def list_projects(self) -> List[Dict]:
         projects = []
         
@@ -123,8 +528,8 @@ class ProjectManager:
             if file.endswith('.ncp'):
                 filepath = os.path.join(self.projects_folder, file)
                 try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+                    with open(filepath, 'rb') as f:
+                        data = self.serializer.loads(f.read())
                     
                     projects.append({
                         'name': data.get('name', 'Без имени'),
@@ -133,7 +538,8 @@ class ProjectManager:
                         'modified': data.get('modified', ''),
                         'description': data.get('description', '')
                     })
-                except:
+                except Exception as e:
+                    logger.warning("Ошибка чтения %s: %s", file, e)
                     continue
         
         return projects
\ No newline at end of file
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Подбор ширины колонок по выборке записей
+
+Вместо измерения каждой ячейки (как resizeColumnsToContents) меряются
+заголовок и значения из ограниченной случайной выборки, отформатированные
+кодеком типа поля. Ширина берётся по 95-му процентилю, чтобы одно длинное
+значение не растягивало колонку. Если статистика таблицы уже собрана
+(см. core.column_stats), выборка не читается: ширина считается по 95-му
+процентилю длины текста из статистики. Результат кэшируется по таблице
+и полю, поэтому повторное открытие таблицы не читает данные вовсе.
+"""
+
+from ..core.value_codecs import formatter
+
+# Сколько записей измеряется для одной таблицы
+SAMPLE_ROWS = 200
+
+MIN_COLUMN_WIDTH = 60
+MAX_COLUMN_WIDTH = 400
+
+# Ширина поля по умолчанию в конструкторе: такое значение означает «подобрать»
+DEFAULT_FIELD_WIDTH = 150
+
+# Поля и отступы ячейки/заголовка (padding из стилей таблицы + значок сортировки)
+CELL_PADDING = 16
+HEADER_PADDING = 28
+
+# Свойства поля, от которых зависит текст ячейки
+FORMAT_KEYS = ('decimals', 'use_thousands', 'currency', 'show_percent_sign',
+               'date_format', 'time_format', 'options')
+
+# Колонки без текста: ширина не зависит от значений
+FIXED_WIDTHS = {
+    'boolean': 60,
+    'image': 72,
+}
+
+
+class ColumnWidthEstimator:
+    """Оценка ширины колонок с кэшем {(таблица, поле, формат, шрифт): ширина}"""
+
+    def __init__(self, sample_rows=SAMPLE_ROWS):
+        self.sample_rows = sample_rows
+        self.cache = {}
+
+    def field_key(self, table_id, field, font_key):
+        fmt = tuple(repr(field.get(key)) for key in FORMAT_KEYS)
+        title = field.get('display_name', field.get('name', ''))
+        return (table_id, field.get('id'), field.get('type_id'), title, field.get('width'), fmt, font_key)
+
+    def widths(self, table_id, fields, fetch_sample, metrics, font_key="", lengths=None):
+        """
+        Ширина каждой колонки. lengths - {id поля: 95-й процентиль длины
+        текста} из статистики; fetch_sample(n) -> записи вызывается только
+        если хотя бы одной колонки нет ни в кэше, ни в lengths.
+        """
+        lengths = lengths or {}
+        keys = [self.field_key(table_id, field, font_key) for field in fields]
+        missing = [index for index, key in enumerate(keys) if key not in self.cache]
+        if missing:
+            sample = None
+            for index in missing:
+                length = lengths.get(fields[index].get('id'))
+                if length is None and sample is None:
+                    sample = fetch_sample(self.sample_rows) if fetch_sample else []
+                self.cache[keys[index]] = self.estimate(fields[index], sample or [], metrics, length)
+        return [self.cache[key] for key in keys]
+
+    def estimate(self, field, sample, metrics, length=None):
+        title = field.get('display_name', field.get('name', ''))
+        header = metrics.horizontalAdvance(title) + HEADER_PADDING
+
+        # Ширина, заданная в конструкторе, применяется как есть
+        width = field.get('width')
+        if isinstance(width, int) and width > 0 and width != DEFAULT_FIELD_WIDTH:
+            return width
+
+        type_id = field.get('type_id')
+        if type_id in FIXED_WIDTHS:
+            return max(header, FIXED_WIDTHS[type_id])
+
+        if length is not None:
+            content = length * metrics.averageCharWidth() + CELL_PADDING if length else 0
+        else:
+            field_id = field.get('id', field.get('name'))
+            format_value = formatter(field)
+            texts = {format_value(record.get(field_id)) for record in sample}
+            measured = sorted(metrics.horizontalAdvance(text) for text in texts if text)
+            content = measured[min(len(measured) - 1, len(measured) * 95 // 100)] + CELL_PADDING if measured else 0
+        return max(MIN_COLUMN_WIDTH, min(max(header, content), MAX_COLUMN_WIDTH))
+
+    def invalidate(self, table_id=None):
+        """Сбрасывает кэш таблицы (или весь) - например, после массового изменения данных"""
+        if table_id is None:
+            self.cache.clear()
+        else:
+            self.cache = {key: width for key, width in self.cache.items() if key[0] != table_id}
@@ -76,7 +76,7 @@ class FieldRow(QWidget):
         self.num_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(self.num_label)
         
-        icon = FieldType.get_icon(self.field_data['type'])
+        icon = FieldType.get_type_by_id(self.field_data['type_id'])[0]
         self.icon_label = QLabel(icon)
         self.icon_label.setFixedSize(20, 20)
         self.icon_label.setStyleSheet("font-size: 16px; background-color: transparent;")
@@ -108,7 +108,7 @@ class FieldRow(QWidget):
         self.name_edit.textChanged.connect(self._on_name_changed)
         layout.addWidget(self.name_edit, 1)
         
-        if FieldType.is_reference(self.field_data['type']):
+        if self.field_data['type_id'] in FieldType.REFERENCE_TYPES:
             ref_label = QLabel("🔗")
             ref_label.setFixedSize(18, 18)
             ref_label.setStyleSheet("font-size: 12px;")
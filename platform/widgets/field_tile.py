@@ -4,10 +4,14 @@
 Плитка типа поля для перетаскивания
 """
 
+import logging
+
 from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 
+logger = logging.getLogger(__name__)
+
 
 class FieldTile(QFrame):
     """Плитка типа поля для перетаскивания"""
@@ -72,7 +76,7 @@ class FieldTile(QFrame):
         if event.button() == Qt.MouseButton.LeftButton:
             self.pressed = True
             self.drag_start_position = event.pos()
-            print(f"🖱️ Нажата плитка: {self.title}")
+            logger.debug("Нажата плитка: %s", self.title)
             # Сигнал о начале
             self.dragStarted.emit()
         super().mousePressEvent(event)
@@ -84,7 +88,7 @@ class FieldTile(QFrame):
             if (event.pos() - self.drag_start_position).manhattanLength() < QApplication.startDragDistance():
                 return
             
-            print(f"🚀 Перетаскивание: {self.title}")
+            logger.debug("Перетаскивание: %s", self.title)
             
             # Создаем объект перетаскивания
             drag = QDrag(self)
@@ -104,13 +108,13 @@ class FieldTile(QFrame):
             result = drag.exec(Qt.DropAction.CopyAction)
             
             self.pressed = False
-            print(f"✅ Перетаскивание завершено: {self.title}")
+            logger.debug("Перетаскивание завершено: %s", self.title)
             self.dragFinished.emit()
     
     def mouseReleaseEvent(self, event):
         """Отпускание кнопки мыши"""
         if self.pressed and event.button() == Qt.MouseButton.LeftButton:
             self.pressed = False
-            print(f"🖱️ Отпущена плитка (без перетаскивания): {self.title}")
+            logger.debug("Отпущена плитка (без перетаскивания): %s", self.title)
             self.dragFinished.emit()
         super().mouseReleaseEvent(event)
\ No newline at end of file
@@ -9,6 +9,7 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 import re
+from contextlib import contextmanager
 
 class PropertyItem:
     """Класс для хранения информации о свойстве"""
@@ -40,6 +41,7 @@ class PropertyGrid(QTableWidget):
         self.properties = []  # список PropertyItem
         self.editors = {}     # словарь редакторов по имени свойства
         self.category_rows = {}  # строки категорий
+        self.pending_editors = {}  # строка -> PropertyItem, редактор ещё не создан
         self.setup_ui()
         
     def setup_ui(self):
@@ -93,14 +95,28 @@ class PropertyGrid(QTableWidget):
         # Подключение сигналов
         self.itemSelectionChanged.connect(self.on_selection_changed)
         self.cellDoubleClicked.connect(self.on_cell_double_clicked)
+        self.cellClicked.connect(lambda row, col: self.ensure_editor(row))
+        self.verticalScrollBar().valueChanged.connect(lambda value: self.create_visible_editors())
         
+    @contextmanager
+    def bulk_update(self):
+        """Массовое заполнение: перерисовка и сигналы приостановлены"""
+        updates_enabled = self.updatesEnabled()
+        signals_blocked = self.blockSignals(True)
+        self.setUpdatesEnabled(False)
+        try:
+            yield
+        finally:
+            self.blockSignals(signals_blocked)
+            self.setUpdatesEnabled(updates_enabled)
+
     def set_properties(self, properties):
         """Устанавливает список свойств для отображения"""
-        self.clear()
         self.properties = properties
         self.editors.clear()
         self.category_rows.clear()
-        
+        self.pending_editors.clear()
+
         # Группировка по категориям
         categories = {}
         for prop in properties:
@@ -109,46 +125,81 @@ class PropertyGrid(QTableWidget):
             if prop.category not in categories:
                 categories[prop.category] = []
             categories[prop.category].append(prop)
-        
-        # Заполнение таблицы
-        row = 0
-        for category, props in categories.items():
-            # Добавляем строку-заголовок категории
-            self.insertRow(row)
-            self.category_rows[category] = row
-            self.setSpan(row, 0, 1, 2)
-            cat_item = QTableWidgetItem(f" {category}")
-            cat_item.setBackground(QColor("#2d2d2d"))
-            cat_item.setForeground(QColor("#4ec9b0"))
-            cat_item.setFlags(Qt.ItemFlag.ItemIsEnabled)
-            font = QFont()
-            font.setBold(True)
-            cat_item.setFont(font)
-            self.setItem(row, 0, cat_item)
-            row += 1
-            
-            # Добавляем свойства категории
-            for prop in props:
-                self.insertRow(row)
-                
-                # Название свойства
-                name_item = QTableWidgetItem(f"  {prop.display_name}")
-                name_item.setFlags(Qt.ItemFlag.ItemIsEnabled)
-                name_item.setToolTip(prop.description)
-                name_item.setForeground(QColor("#9cdcfe"))
-                self.setItem(row, 0, name_item)
-                
-                # Редактор значения
-                editor = self.create_editor(prop, row)
-                if editor:
-                    self.editors[prop.name] = editor
-                    self.setCellWidget(row, 1, editor)
-                
+
+        row_count = len(categories) + sum(len(props) for props in categories.values())
+
+        cat_font = QFont(self.font())
+        cat_font.setBold(True)
+        name_metrics = self.fontMetrics()
+        name_width = 0
+
+        with self.bulk_update():
+            self.clearSpans()
+            self.setRowCount(0)
+            self.setRowCount(row_count)
+
+            # Заполнение таблицы
+            row = 0
+            for category, props in categories.items():
+                # Строка-заголовок категории
+                self.category_rows[category] = row
+                self.setSpan(row, 0, 1, 2)
+                cat_item = QTableWidgetItem(f" {category}")
+                cat_item.setBackground(QColor("#2d2d2d"))
+                cat_item.setForeground(QColor("#4ec9b0"))
+                cat_item.setFlags(Qt.ItemFlag.ItemIsEnabled)
+                cat_item.setFont(cat_font)
+                self.setItem(row, 0, cat_item)
                 row += 1
-        
-        self.setRowCount(row)
-        self.resizeColumnToContents(0)
-        
+
+                # Свойства категории; редакторы создаются позже, по мере показа строк
+                for prop in props:
+                    name_item = QTableWidgetItem(f"  {prop.display_name}")
+                    name_item.setFlags(Qt.ItemFlag.ItemIsEnabled)
+                    name_item.setToolTip(prop.description)
+                    name_item.setForeground(QColor("#9cdcfe"))
+                    self.setItem(row, 0, name_item)
+                    self.pending_editors[row] = prop
+
+                    name_width = max(name_width, name_metrics.horizontalAdvance(name_item.text()))
+                    row += 1
+
+            # Ширина колонки считается один раз по текстам, без обхода ячеек
+            self.setColumnWidth(0, name_width + 16)
+
+        self.create_visible_editors()
+
+    def create_visible_editors(self):
+        """Создаёт редакторы для строк, попавших в видимую область"""
+        if not self.pending_editors:
+            return
+
+        first = self.rowAt(0)
+        last = self.rowAt(self.viewport().height() - 1)
+        if first < 0:
+            first = 0
+        if last < 0:
+            last = self.rowCount() - 1
+
+        for row in range(first, last + 1):
+            self.ensure_editor(row)
+
+    def ensure_editor(self, row):
+        """Создаёт редактор строки, если он ещё не создан"""
+        prop = self.pending_editors.pop(row, None)
+        if prop is None:
+            return self.cellWidget(row, 1)
+
+        editor = self.create_editor(prop, row)
+        if editor:
+            self.editors[prop.name] = editor
+            self.setCellWidget(row, 1, editor)
+        return editor
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.create_visible_editors()
+
     def create_editor(self, prop, row):
         """Создаёт редактор для свойства в зависимости от типа"""
         editor = None
@@ -329,8 +380,8 @@ class PropertyGrid(QTableWidget):
     def on_cell_double_clicked(self, row, col):
         """Обработка двойного клика"""
         if col == 1:  # Кликнули по колонке со значением
-            # Фокусируемся на редакторе
-            widget = self.cellWidget(row, col)
+            # Фокусируемся на редакторе (создаём, если строка ещё не показывалась)
+            widget = self.ensure_editor(row)
             if widget:
                 widget.setFocus()
                 
@@ -5,10 +5,18 @@
 Панель свойств для конструктора таблиц
 """
 
+import html
+import weakref
+
+from PyQt6 import sip
 from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 
+from ..core.column_stats import HISTOGRAM_TYPES
+from ..core.tracing import traced
+from ..core.value_codecs import formatter
+
 
 class PropertySection(QWidget):
     """Базовый класс для секции свойств"""
@@ -18,6 +26,7 @@ class PropertySection(QWidget):
     def __init__(self, title, parent=None):
         super().__init__(parent)
         self.title = title
+        self.editors = {}  # редакторы по имени свойства
         self.setup_ui()
 
     def setup_ui(self):
@@ -70,6 +79,7 @@ class PropertySection(QWidget):
         """)
         cb.stateChanged.connect(lambda state, n=name: self.changed.emit(n, state == Qt.CheckState.Checked.value))
         self.content_layout.addWidget(cb)
+        self.editors[name] = cb
         return cb
 
     def add_lineedit(self, name, label, value="", placeholder=""):
@@ -101,6 +111,7 @@ class PropertySection(QWidget):
         layout.addWidget(lbl)
         layout.addWidget(edit)
         self.content_layout.addWidget(w)
+        self.editors[name] = edit
         return edit
 
     def add_combobox(self, name, label, value="", items=None):
@@ -144,6 +155,7 @@ class PropertySection(QWidget):
         layout.addWidget(lbl)
         layout.addWidget(cb)
         self.content_layout.addWidget(w)
+        self.editors[name] = cb
         return cb
 
     def add_spinbox(self, name, label, value=0, min_val=0, max_val=999):
@@ -173,6 +185,7 @@ class PropertySection(QWidget):
         layout.addWidget(lbl)
         layout.addWidget(sb)
         self.content_layout.addWidget(w)
+        self.editors[name] = sb
         return sb
 
     def add_textedit(self, name, label, value=""):
@@ -202,6 +215,7 @@ class PropertySection(QWidget):
         layout.addWidget(lbl)
         layout.addWidget(te)
         self.content_layout.addWidget(w)
+        self.editors[name] = te
         return te
 
     def add_button(self, label, callback):
@@ -225,6 +239,29 @@ class PropertySection(QWidget):
         self.content_layout.addWidget(btn)
         return btn
 
+    def set_values(self, values):
+        """Подставляет значения в существующие редакторы без генерации сигналов"""
+        for name, value in values.items():
+            editor = self.editors.get(name)
+            if editor is None:
+                continue
+
+            editor.blockSignals(True)
+            try:
+                if isinstance(editor, QCheckBox):
+                    editor.setChecked(bool(value))
+                elif isinstance(editor, QLineEdit):
+                    editor.setText("" if value is None else str(value))
+                elif isinstance(editor, QComboBox):
+                    index = editor.findText(str(value))
+                    editor.setCurrentIndex(index if index >= 0 else 0)
+                elif isinstance(editor, QSpinBox):
+                    editor.setValue(int(value or 0))
+                elif isinstance(editor, QTextEdit):
+                    editor.setPlainText("" if value is None else str(value))
+            finally:
+                editor.blockSignals(False)
+
 
 class PropertyPanel(QWidget):
     """
@@ -232,13 +269,31 @@ class PropertyPanel(QWidget):
     """
 
     propertyChanged = pyqtSignal(str, object)  # имя свойства, новое значение
+    statsReady = pyqtSignal(str)  # статистика таблицы посчитана в фоне (id таблицы)
+
+    # Секция специфических свойств для каждого type_id
+    TYPE_SECTIONS = {
+        'text': '_add_text_properties',
+        'text_multiline': '_add_multiline_properties',
+        'integer': '_add_number_properties',
+        'float': '_add_number_properties',
+        'money': '_add_number_properties',
+        'percent': '_add_number_properties',
+        'date': '_add_date_properties',
+        'list': '_add_list_properties',
+        'reference': '_add_reference_properties',
+        'formula': '_add_calculated_properties',
+    }
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.current_field = None
         self.current_table = None
-        self.sections = []
+        self.statistics = None     # StatisticsService проекта - для профиля данных
+        self.sections = []         # секции, показанные сейчас
+        self._section_cache = {}   # построенные секции по типу поля
         self.setup_ui()
+        self.statsReady.connect(self._on_stats_ready)
 
     def setup_ui(self):
         """Создание интерфейса панели"""
@@ -303,80 +358,75 @@ class PropertyPanel(QWidget):
         layout.addWidget(scroll)
 
     def clear(self):
-        """Очищает панель свойств"""
-        while self.content_layout.count() > 1:
-            item = self.content_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
+        """Скрывает показанные секции (сами секции остаются в кэше)"""
+        for section in self.sections:
+            section.hide()
         self.sections.clear()
         self.object_label.setText("")
 
+    def _get_section(self, key, builder):
+        """Возвращает секцию из кэша, при первом обращении создаёт её"""
+        section = self._section_cache.get(key)
+        if section is None:
+            section = builder()
+            section.changed.connect(self.propertyChanged.emit)
+            self.content_layout.insertWidget(self.content_layout.count() - 1, section)
+            self._section_cache[key] = section
+
+        section.show()
+        self.sections.append(section)
+        return section
+
+    @traced('properties.set_field')
     def set_field(self, field_data):
         """Устанавливает поле для отображения свойств"""
-        self.clear()
-        self.current_field = field_data
-
-        # Определяем тип поля
-        field_type = field_data.get('type', 'TEXT')
-        if hasattr(field_type, 'value'):
-            field_type = field_type.value
-
-        type_names = {
-            'TEXT': 'Текст',
-            'TEXT_MULTILINE': 'Многострочный текст',
-            'INTEGER': 'Целое число',
-            'FLOAT': 'Дробное число',
-            'DATE': 'Дата',
-            'TIME': 'Время',
-            'DATETIME': 'Дата и время',
-            'BOOLEAN': 'Да/Нет',
-            'LIST': 'Список',
-            'REFERENCE': 'Ссылка',
-            'PHONE': 'Телефон',
-            'EMAIL': 'Email',
-            'MONEY': 'Деньги',
-            'PERCENT': 'Процент',
-            'FILE': 'Файл',
-            'IMAGE': 'Изображение',
-            'COLOR': 'Цвет',
-            'RATING': 'Рейтинг',
-            'CALCULATED': 'Вычисляемое',
-        }
-        type_name = type_names.get(field_type, field_type)
-        self.object_label.setText(f"{type_name} • {field_data.get('display_name', '')}")
+        self.setUpdatesEnabled(False)
+        try:
+            self.clear()
+            self.current_field = field_data
+            self._show_field(field_data)
+        finally:
+            self.setUpdatesEnabled(True)
+
+    def _show_field(self, field_data):
+        """Показывает секции поля и подставляет в них значения"""
+        # Поля приходят нормализованными (FieldDef), тип - канонический type_id
+        type_id = field_data.type_id
+        self.object_label.setText(f"{field_data.type_name} • {field_data.name_ru}")
 
         # ===== ОСНОВНЫЕ СВОЙСТВА =====
-        main_section = PropertySection("ОСНОВНЫЕ")
-        main_section.changed.connect(self.propertyChanged.emit)
-
-        main_section.add_checkbox("required", "Обязательное поле", field_data.get('required', False))
-        main_section.add_checkbox("unique", "Уникальное значение", field_data.get('unique', False))
-        main_section.add_lineedit("default", "По умолчанию", field_data.get('default', ''))
-        main_section.add_lineedit("description", "Подсказка", field_data.get('description', ''))
-
-        self.content_layout.insertWidget(self.content_layout.count() - 1, main_section)
-        self.sections.append(main_section)
+        main_section = self._get_section('main', self._build_main_section)
+        main_section.set_values({
+            'required': field_data.get('required', False),
+            'unique': field_data.get('unique', False),
+            'default': field_data.get('default', ''),
+            'description': field_data.get('description', ''),
+        })
 
         # ===== СПЕЦИФИЧЕСКИЕ СВОЙСТВА =====
-        if field_type == 'TEXT':
-            self._add_text_properties(field_data)
-        elif field_type == 'TEXT_MULTILINE':
-            self._add_multiline_properties(field_data)
-        elif field_type in ['INTEGER', 'FLOAT', 'MONEY', 'PERCENT']:
-            self._add_number_properties(field_data)
-        elif field_type == 'DATE':
-            self._add_date_properties(field_data)
-        elif field_type == 'LIST':
-            self._add_list_properties(field_data)
-        elif field_type == 'REFERENCE':
-            self._add_reference_properties(field_data)
-        elif field_type == 'CALCULATED':
-            self._add_calculated_properties(field_data)
+        add_properties = self.TYPE_SECTIONS.get(type_id)
+        if add_properties:
+            getattr(self, add_properties)(field_data)
+
+    def _build_main_section(self):
+        """Секция основных свойств поля"""
+        section = PropertySection("ОСНОВНЫЕ")
+        section.add_checkbox("required", "Обязательное поле")
+        section.add_checkbox("unique", "Уникальное значение")
+        section.add_lineedit("default", "По умолчанию")
+        section.add_lineedit("description", "Подсказка")
+        return section
 
     def _add_text_properties(self, field_data):
         """Свойства для текстового поля"""
+        section = self._get_section('text', self._build_text_section)
+        section.set_values({
+            'text_format': field_data.get('text_format', 'Как написано'),
+            'max_length': field_data.get('max_length', 255),
+        })
+
+    def _build_text_section(self):
         section = PropertySection("ФОРМАТ ТЕКСТА")
-        section.changed.connect(self.propertyChanged.emit)
 
         formats = [
             "Как написано",
@@ -385,53 +435,77 @@ class PropertyPanel(QWidget):
             "все строчные",
             "Каждое Слово С Большой"
         ]
-        section.add_combobox("text_format", "Формат:", field_data.get('text_format', 'Как написано'), formats)
-        section.add_spinbox("max_length", "Макс. длина:", field_data.get('max_length', 255), 1, 65535)
-
-        self.content_layout.insertWidget(self.content_layout.count() - 1, section)
-        self.sections.append(section)
+        section.add_combobox("text_format", "Формат:", 'Как написано', formats)
+        section.add_spinbox("max_length", "Макс. длина:", 255, 1, 65535)
+        return section
 
     def _add_multiline_properties(self, field_data):
         """Свойства для многострочного текста"""
+        section = self._get_section('multiline', self._build_multiline_section)
+        section.set_values({
+            'multiline_format': field_data.get('multiline_format', 'Обычный текст'),
+            'height': field_data.get('height', 5),
+            'word_wrap': field_data.get('word_wrap', True),
+        })
+
+    def _build_multiline_section(self):
         section = PropertySection("ФОРМАТ ТЕКСТА")
-        section.changed.connect(self.propertyChanged.emit)
 
         formats = ["Обычный текст", "RTF", "HTML", "Markdown"]
-        section.add_combobox("multiline_format", "Формат:", field_data.get('multiline_format', 'Обычный текст'), formats)
-        section.add_spinbox("height", "Высота (строк):", field_data.get('height', 5), 1, 50)
-        section.add_checkbox("word_wrap", "Перенос по словам", field_data.get('word_wrap', True))
-
-        self.content_layout.insertWidget(self.content_layout.count() - 1, section)
-        self.sections.append(section)
+        section.add_combobox("multiline_format", "Формат:", 'Обычный текст', formats)
+        section.add_spinbox("height", "Высота (строк):", 5, 1, 50)
+        section.add_checkbox("word_wrap", "Перенос по словам", True)
+        return section
 
     def _add_number_properties(self, field_data):
         """Свойства для чисел"""
-        section = PropertySection("ФОРМАТ ЧИСЛА")
-        section.changed.connect(self.propertyChanged.emit)
+        # Для денег и процентов набор редакторов отличается - кэшируем отдельно
+        type_id = field_data.type_id
+        if type_id not in ('money', 'percent'):
+            type_id = 'integer'
 
-        field_type = field_data.get('type', 'INTEGER')
-        if hasattr(field_type, 'value'):
-            field_type = field_type.value
+        section = self._get_section(f'number:{type_id}', lambda: self._build_number_section(type_id))
 
-        if field_type == 'MONEY':
-            currencies = ["₽ (Рубль)", "$ (Доллар)", "€ (Евро)", "₸ (Тенге)"]
-            section.add_combobox("currency", "Валюта:", field_data.get('currency', '₽ (Рубль)'), currencies)
-            section.add_spinbox("decimals", "Знаков после запятой:", field_data.get('decimals', 2), 0, 10)
-        elif field_type == 'PERCENT':
-            section.add_checkbox("show_percent_sign", "Показывать знак %", field_data.get('show_percent_sign', True))
-            section.add_spinbox("decimals", "Знаков после запятой:", field_data.get('decimals', 1), 0, 10)
+        values = {
+            'min_value': field_data.get('min_value', 0),
+            'max_value': field_data.get('max_value', 100),
+            'use_thousands': field_data.get('use_thousands', False),
+        }
+        if type_id == 'money':
+            values['currency'] = field_data.get('currency', '₽ (Рубль)')
+            values['decimals'] = field_data.get('decimals', 2)
+        elif type_id == 'percent':
+            values['show_percent_sign'] = field_data.get('show_percent_sign', True)
+            values['decimals'] = field_data.get('decimals', 1)
+        section.set_values(values)
+
+    def _build_number_section(self, type_id):
+        section = PropertySection("ФОРМАТ ЧИСЛА")
 
-        section.add_spinbox("min_value", "Минимум:", field_data.get('min_value', 0), -999999, 999999)
-        section.add_spinbox("max_value", "Максимум:", field_data.get('max_value', 100), -999999, 999999)
-        section.add_checkbox("use_thousands", "Разделитель тысяч", field_data.get('use_thousands', False))
+        if type_id == 'money':
+            currencies = ["₽ (Рубль)", "$ (Доллар)", "€ (Евро)", "₸ (Тенге)"]
+            section.add_combobox("currency", "Валюта:", '₽ (Рубль)', currencies)
+            section.add_spinbox("decimals", "Знаков после запятой:", 2, 0, 10)
+        elif type_id == 'percent':
+            section.add_checkbox("show_percent_sign", "Показывать знак %", True)
+            section.add_spinbox("decimals", "Знаков после запятой:", 1, 0, 10)
 
-        self.content_layout.insertWidget(self.content_layout.count() - 1, section)
-        self.sections.append(section)
+        section.add_spinbox("min_value", "Минимум:", 0, -999999, 999999)
+        section.add_spinbox("max_value", "Максимум:", 100, -999999, 999999)
+        section.add_checkbox("use_thousands", "Разделитель тысяч", False)
+        return section
 
     def _add_date_properties(self, field_data):
         """Свойства для даты"""
+        section = self._get_section('date', self._build_date_section)
+        section.set_values({
+            'date_format': field_data.get('date_format', 'ДД.ММ.ГГГГ'),
+            'time_format': field_data.get('time_format', 'Без времени'),
+            'auto_current': field_data.get('auto_current', False),
+        })
+
+    def _build_date_section(self):
         section = PropertySection("ФОРМАТ ДАТЫ")
-        section.changed.connect(self.propertyChanged.emit)
 
         date_formats = [
             "ДД.ММ.ГГГГ",
@@ -442,66 +516,82 @@ class PropertyPanel(QWidget):
             "ММ/ГГГГ",
             "ГГГГ"
         ]
-        section.add_combobox("date_format", "Формат даты:", field_data.get('date_format', 'ДД.ММ.ГГГГ'), date_formats)
+        section.add_combobox("date_format", "Формат даты:", 'ДД.ММ.ГГГГ', date_formats)
 
         time_formats = ["Без времени", "ЧЧ:ММ", "ЧЧ:ММ:СС", "ЧЧ:ММ AM/PM"]
-        section.add_combobox("time_format", "Формат времени:", field_data.get('time_format', 'Без времени'), time_formats)
+        section.add_combobox("time_format", "Формат времени:", 'Без времени', time_formats)
 
-        section.add_checkbox("auto_current", "Автоматически текущая дата", field_data.get('auto_current', False))
-
-        self.content_layout.insertWidget(self.content_layout.count() - 1, section)
-        self.sections.append(section)
+        section.add_checkbox("auto_current", "Автоматически текущая дата", False)
+        return section
 
     def _add_list_properties(self, field_data):
         """Свойства для списка"""
-        section = PropertySection("ЭЛЕМЕНТЫ СПИСКА")
-        section.changed.connect(self.propertyChanged.emit)
+        section = self._get_section('list', self._build_list_section)
 
         options = field_data.get('options', [])
-        options_str = '\n'.join(options) if options else ''
-        section.add_textedit("list_options", "Варианты (по одному в строке):", options_str)
+        section.set_values({
+            'list_options': '\n'.join(options) if options else '',
+            'list_type': field_data.get('list_type', 'Выпадающий список'),
+            'sort_type': field_data.get('sort_type', 'Как введено'),
+        })
+
+    def _build_list_section(self):
+        section = PropertySection("ЭЛЕМЕНТЫ СПИСКА")
+
+        section.add_textedit("list_options", "Варианты (по одному в строке):", '')
 
         list_types = ["Выпадающий список", "Переключатели", "Флажки (множественный выбор)"]
-        section.add_combobox("list_type", "Вид:", field_data.get('list_type', 'Выпадающий список'), list_types)
+        section.add_combobox("list_type", "Вид:", 'Выпадающий список', list_types)
 
         sort_types = ["Как введено", "По алфавиту", "По алфавиту (обратный)"]
-        section.add_combobox("sort_type", "Сортировка:", field_data.get('sort_type', 'Как введено'), sort_types)
-
-        self.content_layout.insertWidget(self.content_layout.count() - 1, section)
-        self.sections.append(section)
+        section.add_combobox("sort_type", "Сортировка:", 'Как введено', sort_types)
+        return section
 
     def _add_reference_properties(self, field_data):
         """Свойства для ссылки на таблицу"""
+        section = self._get_section('reference', self._build_reference_section)
+        section.set_values({
+            'reference_table': field_data.get('reference_table', ''),
+            'reference_display': field_data.get('reference_display', ''),
+            'relation_type': field_data.get('relation_type', 'Одна запись'),
+        })
+
+    def _build_reference_section(self):
         section = PropertySection("СВЯЗЬ С ТАБЛИЦЕЙ")
-        section.changed.connect(self.propertyChanged.emit)
 
         tables = ["Клиенты", "Товары", "Заказы", "Сотрудники"]  # TODO: получать из ProjectManager
-        section.add_combobox("reference_table", "Таблица:", field_data.get('reference_table', ''), tables)
+        section.add_combobox("reference_table", "Таблица:", '', tables)
 
         fields = ["id", "Название"]  # TODO: получать из ProjectManager
-        section.add_combobox("reference_display", "Показывать поле:", field_data.get('reference_display', ''), fields)
+        section.add_combobox("reference_display", "Показывать поле:", '', fields)
 
         relation_types = ["Одна запись", "Несколько записей (множественный выбор)"]
-        section.add_combobox("relation_type", "Тип связи:", field_data.get('relation_type', 'Одна запись'), relation_types)
-
-        self.content_layout.insertWidget(self.content_layout.count() - 1, section)
-        self.sections.append(section)
+        section.add_combobox("relation_type", "Тип связи:", 'Одна запись', relation_types)
+        return section
 
     def _add_calculated_properties(self, field_data):
         """Свойства для вычисляемого поля"""
+        section = self._get_section('calculated', self._build_calculated_section)
+        self.formula_preview.setText(field_data.get('formula') or 'Формула не задана')
+        section.set_values({
+            'result_type': field_data.get('result_type', 'Текст'),
+        })
+
+    def _build_calculated_section(self):
         section = PropertySection("ВЫЧИСЛЯЕМОЕ ПОЛЕ")
-        section.changed.connect(self.propertyChanged.emit)
 
         def open_formula_editor():
             from ..dialogs.formula_dialog import FormulaDialog
-            dialog = FormulaDialog(self, field_data.get('formula', ''))
+            # Секция общая для всех вычисляемых полей - берём текущее
+            dialog = FormulaDialog(self, self.current_field.get('formula', ''))
             if dialog.exec() == QDialog.DialogCode.Accepted:
                 formula = dialog.get_formula()
+                self.formula_preview.setText(formula or 'Формула не задана')
                 self.propertyChanged.emit('formula', formula)
 
         section.add_button("🧮 РЕДАКТОР ФОРМУЛ", open_formula_editor)
 
-        self.formula_preview = QLabel(field_data.get('formula', 'Формула не задана'))
+        self.formula_preview = QLabel('Формула не задана')
         self.formula_preview.setStyleSheet("""
             QLabel {
                 background-color: #2d2d2d;
@@ -525,23 +615,113 @@ class PropertyPanel(QWidget):
         section.content_layout.addWidget(preview_container)
 
         result_types = ["Текст", "Число", "Дата", "Логический"]
-        section.add_combobox("result_type", "Тип результата:", field_data.get('result_type', 'Текст'), result_types)
-
-        self.content_layout.insertWidget(self.content_layout.count() - 1, section)
-        self.sections.append(section)
-
-    def set_table(self, table_data):
-        """Устанавливает таблицу для отображения свойств"""
-        self.clear()
-        self.current_table = table_data
-        self.object_label.setText(f"ТАБЛИЦА • {table_data.get('display_name', '')}")
-
+        section.add_combobox("result_type", "Тип результата:", 'Текст', result_types)
+        return section
+
+    @traced('properties.set_table')
+    def set_table(self, table_data, statistics=None):
+        """Устанавливает таблицу для отображения свойств (statistics - для профиля данных)"""
+        self.setUpdatesEnabled(False)
+        try:
+            self.clear()
+            self.current_table = table_data
+            self.current_field = None
+            self.statistics = statistics
+            self.object_label.setText(f"ТАБЛИЦА • {table_data.get('display_name', '')}")
+
+            section = self._get_section('table', self._build_table_section)
+            section.set_values({
+                'display_name': table_data.get('display_name', ''),
+                'description': table_data.get('description', ''),
+                'icon': table_data.get('icon', '📊'),
+                'protected': table_data.get('protected', False),
+            })
+            current_color = table_data.get('color', '#3b82f6')
+            self.color_btn.setStyleSheet(f"background-color: {current_color}; border: 1px solid #4c4c4c; border-radius: 4px;")
+
+            if statistics is not None:
+                self._get_section('profile', self._build_profile_section)
+                self._show_profile()
+        finally:
+            self.setUpdatesEnabled(True)
+
+    def _build_profile_section(self):
+        section = PropertySection("ПРОФИЛЬ ДАННЫХ")
+        self.profile_label = QLabel("")
+        self.profile_label.setWordWrap(True)
+        self.profile_label.setTextFormat(Qt.TextFormat.RichText)
+        self.profile_label.setStyleSheet("color: #e0e0e0; font-size: 11px;")
+        section.content_layout.addWidget(self.profile_label)
+        return section
+
+    def _show_profile(self):
+        """Профиль по готовой статистике; если её нет - пересчёт в фоне и statsReady"""
+        table = self.current_table
+        stats = self.statistics.ensure(table['id'], table, callback=self._stats_callback())
+        if stats is None:
+            self.profile_label.setText("<i>Сбор статистики...</i>")
+            return
+
+        lines = [f"Записей: <b>{stats.rows}</b>"]
+        if stats.sampled:
+            lines[0] += f" (выборка {stats.sample_rows})"
+        for field in table.get('fields', []):
+            column = stats.columns.get(field.get('id'))
+            if column is None:
+                continue
+            format_value = formatter(field)
+            name = html.escape(field.get('display_name', field.get('name', '')))
+            parts = [f"пусто {column.null_ratio:.0%}", f"различных ≈{column.distinct}"]
+            if column.type_id in HISTOGRAM_TYPES and column.minimum is not None:
+                parts.append(f"{format_value(column.minimum)} … {format_value(column.maximum)}")
+                if column.histogram:
+                    parts.append(self._sparkline(column.histogram))
+            else:
+                if column.top_values:
+                    value, count = column.top_values[0]
+                    parts.append(f"чаще всего «{format_value(value)}» ({count})")
+                if column.length_max:
+                    parts.append(f"длина ≈{column.length_median}, до {column.length_max}")
+            lines.append(f"<b>{name}</b>: " + html.escape(", ".join(parts)))
+        self.profile_label.setText("<br>".join(lines))
+
+    @staticmethod
+    def _sparkline(histogram):
+        """Гистограмма одной строкой символов разной высоты"""
+        bars = "▁▂▃▄▅▆▇█"
+        top = max(histogram) or 1
+        return "".join(bars[min(len(bars) - 1, count * len(bars) // (top + 1))] for count in histogram)
+
+    def _stats_callback(self):
+        """
+        Колбэк для фонового пересчёта. Панель может быть удалена раньше, чем
+        он закончится (например, вместе с закрытой вкладкой), поэтому
+        колбэк держит её по слабой ссылке и не трогает удалённый объект Qt.
+        """
+        panel = weakref.ref(self)
+
+        def ready(table_id):
+            target = panel()
+            if target is None or sip.isdeleted(target):
+                return
+            try:
+                target.statsReady.emit(table_id)
+            except RuntimeError:
+                # Удалена между проверкой и emit
+                pass
+        return ready
+
+    def _on_stats_ready(self, table_id):
+        if self.current_field is None and self.current_table is not None \
+                and self.current_table.get('id') == table_id and self.statistics is not None:
+            self._show_profile()
+
+    def _build_table_section(self):
         section = PropertySection("СВОЙСТВА ТАБЛИЦЫ")
-        section.changed.connect(self.propertyChanged.emit)
 
-        section.add_lineedit("display_name", "Название:", table_data.get('display_name', ''))
-        section.add_lineedit("description", "Описание:", table_data.get('description', ''))
-        section.add_lineedit("icon", "Иконка:", table_data.get('icon', '📊'))
+        section.add_lineedit("display_name", "Название:", '')
+        section.add_lineedit("description", "Описание:", '')
+        section.add_lineedit("icon", "Иконка:", '📊')
 
         # Цвет
         color_widget = QWidget()
@@ -551,26 +731,23 @@ class PropertyPanel(QWidget):
         color_label = QLabel("Цвет:")
         color_label.setStyleSheet("color: #9cdcfe; font-size: 12px; min-width: 100px;")
 
-        color_btn = QPushButton()
-        color_btn.setFixedSize(24, 24)
-        current_color = table_data.get('color', '#3b82f6')
-        color_btn.setStyleSheet(f"background-color: {current_color}; border: 1px solid #4c4c4c; border-radius: 4px;")
+        self.color_btn = QPushButton()
+        self.color_btn.setFixedSize(24, 24)
 
         def pick_color():
+            current_color = self.current_table.get('color', '#3b82f6')
             color = QColorDialog.getColor(QColor(current_color))
             if color.isValid():
                 hex_color = color.name()
-                color_btn.setStyleSheet(f"background-color: {hex_color}; border: 1px solid #4c4c4c; border-radius: 4px;")
+                self.color_btn.setStyleSheet(f"background-color: {hex_color}; border: 1px solid #4c4c4c; border-radius: 4px;")
                 self.propertyChanged.emit('color', hex_color)
 
-        color_btn.clicked.connect(pick_color)
+        self.color_btn.clicked.connect(pick_color)
 
         color_layout.addWidget(color_label)
-        color_layout.addWidget(color_btn)
+        color_layout.addWidget(self.color_btn)
         color_layout.addStretch()
 
         section.content_layout.addWidget(color_widget)
-        section.add_checkbox("protected", "Защитить от изменений", table_data.get('protected', False))
-
-        self.content_layout.insertWidget(self.content_layout.count() - 1, section)
-        self.sections.append(section)
\ No newline at end of file
+        section.add_checkbox("protected", "Защитить от изменений", False)
+        return section
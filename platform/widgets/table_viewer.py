@@ -5,10 +5,151 @@
 Просмотр таблицы (данные)
 """
 
+import random
+from collections import OrderedDict
+
 from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 
+from ..core.bitmap_index import INDEXED_TYPES
+from ..core.list_codec import ensure_codes
+from ..core.memory import accountant, sampled_size
+from ..core.schema_migration import MigrationInProgress
+from ..core.tracing import traced
+from ..core.value_codecs import formatter
+from .column_width import ColumnWidthEstimator
+from .thumbnail_service import ThumbnailService
+
+# Типы полей, значения которых выравниваются по правому краю
+NUMERIC_TYPES = ('integer', 'float', 'money', 'percent', 'rating')
+
+
+class RecordTableModel(QAbstractTableModel):
+    """
+    Модель данных таблицы с постраничной подгрузкой.
+    Страницы запрашиваются по мере прокрутки, в памяти держится
+    не больше MAX_PAGES последних страниц.
+    """
+
+    PAGE_SIZE = 200
+    MAX_PAGES = 20
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.fields = []
+        self.total = 0
+        self.fetch_page = None
+        self.pages = OrderedDict()
+        self.thumbnails = None   # ThumbnailService для полей-изображений
+        self.image_columns = set()
+        self.formatters = []
+        self.numeric_columns = set()
+        accountant.register(self, "Страницы данных", 'data', RecordTableModel.memory_usage,
+                            trim=RecordTableModel.trim)
+
+    def set_source(self, fields, total, fetch_page):
+        """fetch_page(номер_страницы, размер) -> список записей"""
+        self.beginResetModel()
+        self.fields = fields
+        self.total = total
+        self.fetch_page = fetch_page
+        self.pages.clear()
+        accountant.touch(self, "Страницы данных")
+        self.image_columns = {
+            column for column, field in enumerate(fields) if field.get('type_id') == 'image'
+        }
+        # Форматирование хранимых значений (деньги - целые доли) готовится один раз на колонку
+        self.formatters = [formatter(field) for field in fields]
+        self.numeric_columns = {
+            column for column, field in enumerate(fields) if field.get('type_id') in NUMERIC_TYPES
+        }
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.total
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.fields)
+
+    def page(self, number):
+        page = self.pages.get(number)
+        if page is None:
+            page = self.fetch_page(number, self.PAGE_SIZE) if self.fetch_page else []
+            self.pages[number] = page
+            accountant.touch(self, "Страницы данных")
+            while len(self.pages) > self.MAX_PAGES:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(number)
+        return page
+
+    def memory_usage(self):
+        """(байт, записей) страниц в памяти - по выборке записей"""
+        rows = [record for page in list(self.pages.values()) for record in page]
+        return sampled_size(rows), len(rows)
+
+    def trim(self, target_bytes):
+        """Вытесняет давние страницы; последняя запрошенная (на экране) остаётся"""
+        total, rows = self.memory_usage()
+        per_row = total // rows if rows else 0
+        while len(self.pages) > 1 and total > target_bytes:
+            _, page = self.pages.popitem(last=False)
+            total -= per_row * len(page)
+
+    def record(self, row):
+        if row < 0 or row >= self.total:
+            return None
+        page = self.page(row // self.PAGE_SIZE)
+        index = row % self.PAGE_SIZE
+        return page[index] if index < len(page) else None
+
+    def cell_value(self, row, column):
+        record = self.record(row)
+        if record is None:
+            return None
+        field = self.fields[column]
+        return record.get(field.get('id', field.get('name')))
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if self.thumbnails is not None and index.column() in self.image_columns:
+                return None
+            record = self.record(index.row())
+            if record is None:
+                return None
+            field = self.fields[index.column()]
+            value = record.get(field.get('id', field.get('name')))
+            return self.formatters[index.column()](value)
+
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            if index.column() in self.numeric_columns:
+                return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+            return None
+
+        if role == Qt.ItemDataRole.DecorationRole:
+            if self.thumbnails is None or index.column() not in self.image_columns:
+                return None
+            return self.thumbnails.pixmap(self.cell_value(index.row(), index.column()))
+
+        if role == Qt.ItemDataRole.UserRole:
+            return self.record(index.row())
+
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            if 0 <= section < len(self.fields):
+                field = self.fields[section]
+                return field.get('display_name', field.get('name', ''))
+            return None
+        return str(section + 1)
+
 
 class TableViewer(QWidget):
     """
@@ -22,9 +163,23 @@ class TableViewer(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.current_table = None
-        self.table_data = []
+        self.project_manager = None
+        self.table_data = []     # записи, если таблица задана списком
+        self.search_text = ""
+        self.facet_field = None  # поле, значения которого показаны на панели фасетов
+        self.facet_filter = {}   # field_id -> множество выбранных хранимых значений
+        self.model = RecordTableModel(self)
+        self.thumbnails = None
+        self.sized_table = None  # (таблица, поля), для которых уже подобрана ширина колонок
+        self.width_estimator = ColumnWidthEstimator()
         self.setup_ui()
 
+        # Перерисовка после готовых миниатюр - не чаще раза в кадр
+        self.repaint_timer = QTimer(self)
+        self.repaint_timer.setSingleShot(True)
+        self.repaint_timer.setInterval(16)
+        self.repaint_timer.timeout.connect(self.table.viewport().update)
+
     def setup_ui(self):
         """Создание интерфейса просмотра"""
         layout = QVBoxLayout(self)
@@ -111,19 +266,45 @@ class TableViewer(QWidget):
 
         layout.addWidget(toolbar)
 
+        # Панель фасетов: значения выбранного поля с числом записей
+        self.facet_bar = QWidget()
+        self.facet_bar.setStyleSheet("""
+            QWidget {
+                background-color: #252526;
+                border-bottom: 1px solid #3c3c3c;
+            }
+            QPushButton {
+                background-color: #2d2d2d;
+                color: #e0e0e0;
+                border: 1px solid #4c4c4c;
+                border-radius: 10px;
+                padding: 2px 8px;
+                font-size: 11px;
+            }
+            QPushButton:checked { background-color: #0e639c; border-color: #1177bb; }
+            QLabel { color: #9cdcfe; font-size: 11px; border: none; }
+        """)
+        self.facet_layout = QHBoxLayout(self.facet_bar)
+        self.facet_layout.setContentsMargins(8, 3, 8, 3)
+        self.facet_layout.setSpacing(4)
+        self.facet_bar.hide()
+
+        layout.addWidget(self.facet_bar)
+
         # Таблица с данными
-        self.table = QTableWidget()
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #1e1e1e;
                 color: #e0e0e0;
                 gridline-color: #3c3c3c;
                 border: none;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 4px;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #2d4f7c;
             }
             QHeaderView::section {
@@ -135,9 +316,11 @@ class TableViewer(QWidget):
                 font-size: 12px;
             }
         """)
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        self.table.itemSelectionChanged.connect(self.on_selection_changed)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        self.table.selectionModel().selectionChanged.connect(lambda selected, deselected: self.on_selection_changed())
+        self.table.verticalScrollBar().valueChanged.connect(lambda value: self.update_visible_thumbnails())
 
         layout.addWidget(self.table, 1)
 
@@ -155,38 +338,225 @@ class TableViewer(QWidget):
         layout.addWidget(status_bar)
 
     def set_table(self, table_definition, data=None):
-        """Устанавливает таблицу для отображения"""
+        """Устанавливает таблицу для отображения (данные - готовым списком)"""
         self.current_table = table_definition
+        self.project_manager = None
         self.table_data = data or []
+        self.sized_table = None
+        self.facet_field = None
+        self.facet_filter = {}
+        self.setup_thumbnails()
+        self.refresh_table()
 
-        fields = table_definition.get('fields', [])
-        self.table.setColumnCount(len(fields))
-        headers = [f.get('display_name', f.get('name', '')) for f in fields]
-        self.table.setHorizontalHeaderLabels(headers)
-
+    def set_source(self, table_definition, project_manager):
+        """Устанавливает таблицу, данные которой читаются из проекта постранично"""
+        self.current_table = table_definition
+        self.project_manager = project_manager
+        self.table_data = []
+        self.sized_table = None
+        self.facet_field = None
+        self.facet_filter = {}
+        self.setup_thumbnails()
         self.refresh_table()
 
+    def setup_thumbnails(self):
+        """Миниатюры нужны, только если в таблице есть поля-изображения"""
+        has_images = self.project_manager is not None and any(
+            field.get('type_id') == 'image' for field in self.current_table.get('fields', [])
+        )
+        blob_store = self.project_manager.blob_store if has_images else None
+
+        if self.thumbnails is not None and self.thumbnails.blob_store is not blob_store:
+            self.thumbnails.shutdown()
+            self.thumbnails = None
+        if blob_store is not None and self.thumbnails is None:
+            self.thumbnails = ThumbnailService(blob_store, parent=self)
+            self.thumbnails.thumbnailReady.connect(lambda blob_hash: self.repaint_timer.start())
+
+        self.model.thumbnails = self.thumbnails
+        row_height = self.thumbnails.size + 4 if self.thumbnails else 24
+        self.table.verticalHeader().setDefaultSectionSize(row_height)
+
+    def update_visible_thumbnails(self):
+        """Сообщает сервису миниатюр, какие строки сейчас на экране"""
+        if self.thumbnails is None or not self.model.image_columns:
+            return
+        first = self.table.rowAt(0)
+        if first < 0:
+            return
+        last = self.table.rowAt(self.table.viewport().height() - 1)
+        if last < 0:
+            last = self.model.rowCount() - 1
+        self.thumbnails.set_visible(
+            self.model.cell_value(row, column)
+            for row in range(first, last + 1)
+            for column in self.model.image_columns
+        )
+
+    @traced('viewer.refresh_table')
     def refresh_table(self):
         """Обновляет отображение таблицы"""
-        self.table.setRowCount(0)
-
-        if not self.table_data:
+        if self.current_table is None:
+            self.model.set_source([], 0, None)
             self.status_label.setText("Нет данных")
             return
 
         fields = self.current_table.get('fields', [])
+        search = self.search_text
+        filter = self.current_filter()
+
+        if self.project_manager is not None:
+            table_id = self.current_table['id']
+            total = self.project_manager.count(table_id, filter=filter, search=search)
+
+            def fetch_page(page, page_size):
+                return self.project_manager.get_page(table_id, page, page_size, filter=filter, search=search)
+        else:
+            records = self.table_data
+            if search:
+                needle = search.lower()
+                records = [
+                    record for record in records
+                    if any(needle in str(value).lower() for value in record.values())
+                ]
+            total = len(records)
+
+            def fetch_page(page, page_size):
+                start = page * page_size
+                return records[start:start + page_size]
+
+        self.model.set_source(fields, total, fetch_page)
+        self.update_visible_thumbnails()
+        self.update_facets()
+        self.apply_column_widths()
+
+        if total:
+            suffix = " (отбор)" if filter else ""
+            self.status_label.setText(f"Записей: {total}{suffix}")
+        else:
+            self.status_label.setText("Нет данных")
 
-        for row, record in enumerate(self.table_data):
-            self.table.insertRow(row)
+    # ========== ШИРИНА КОЛОНОК ==========
 
-            for col, field in enumerate(fields):
-                field_name = field.get('name')
-                value = record.get(field_name, '')
-                item = QTableWidgetItem(str(value))
-                item.setData(Qt.ItemDataRole.UserRole, record)
-                self.table.setItem(row, col, item)
+    def apply_column_widths(self):
+        """
+        Ширина колонок по заголовку и выборке записей (см. column_width).
+        Подбирается один раз при смене таблицы, чтобы не сбивать ширину,
+        заданную пользователем.
+        """
+        if self.current_table is None:
+            return
+        table_id = self.current_table.get('id')
+        layout_key = (table_id, tuple(field.get('id') for field in self.model.fields))
+        if self.sized_table == layout_key:
+            return
+        self.sized_table = layout_key
+
+        lengths = None
+        if self.project_manager is not None:
+            def fetch_sample(size):
+                return self.project_manager.sample_records(table_id, size)
+            stats = self.project_manager.statistics.get(table_id)
+            if stats is not None:
+                lengths = {column.field_id: column.length_p95 for column in stats.columns.values()}
+        else:
+            def fetch_sample(size):
+                records = self.table_data
+                return random.sample(records, size) if len(records) > size else records
+
+        font = self.table.font()
+        widths = self.width_estimator.widths(
+            table_id, self.model.fields, fetch_sample, QFontMetrics(font), font.key(), lengths
+        )
+        header = self.table.horizontalHeader()
+        for column, width in enumerate(widths):
+            header.resizeSection(column, width)
+
+    # ========== ФАСЕТЫ ==========
+
+    def current_filter(self):
+        """Фильтр по выбранным значениям фасетов в форме {field_id: [значения]}"""
+        return {field_id: list(values) for field_id, values in self.facet_filter.items() if values}
+
+    def facet_label(self, field, value, format_value):
+        if value is None:
+            return "(пусто)"
+        if field.get('type_id') == 'boolean':
+            return "Да" if value else "Нет"
+        if field.get('type_id') == 'rating':
+            return "★" * int(value) if isinstance(value, int) and 0 < value <= 10 else str(value)
+        return format_value(value)
+
+    def facet_values(self, field, counts):
+        """Порядок значений на панели: варианты списка - как в поле, остальные - по возрастанию"""
+        selected = self.facet_filter.get(field['id'], set())
+        if field.get('type_id') == 'list':
+            values = list(ensure_codes(field))
+        elif field.get('type_id') == 'boolean':
+            values = [1, 0]
+        else:
+            values = sorted(value for value in counts if isinstance(value, int))
+        values += [value for value in selected if value not in values and value is not None]
+        if None in counts or None in selected:
+            values.append(None)
+        return values
+
+    def update_facets(self):
+        """Перестраивает панель фасетов; числа считаются по битовому индексу"""
+        while self.facet_layout.count():
+            item = self.facet_layout.takeAt(0)
+            if item.widget() is not None:
+                item.widget().deleteLater()
+
+        field = None
+        if self.current_table is not None and self.project_manager is not None:
+            field = next(
+                (f for f in self.current_table.get('fields', []) if f.get('id') == self.facet_field), None
+            )
+        if field is None:
+            self.facet_bar.hide()
+            return
+
+        # Счётчики поля учитывают отбор по остальным полям, но не по нему самому
+        filter = {field_id: values for field_id, values in self.current_filter().items() if field_id != field['id']}
+        counts = self.project_manager.facet_counts(self.current_table['id'], field['id'], filter, self.search_text)
+        selected = self.facet_filter.get(field['id'], set())
+        format_value = formatter(field)
+
+        title = QLabel(field.get('display_name', field.get('name', '')) + ":")
+        self.facet_layout.addWidget(title)
+        for value in self.facet_values(field, counts):
+            button = QPushButton(f"{self.facet_label(field, value, format_value)}  {counts.get(value, 0)}")
+            button.setCheckable(True)
+            button.setChecked(value in selected)
+            button.toggled.connect(lambda checked, value=value: self.on_facet_toggled(field['id'], value, checked))
+            self.facet_layout.addWidget(button)
+        self.facet_layout.addStretch()
+
+        if self.current_filter():
+            reset = QPushButton("✕ Сбросить отбор")
+            reset.clicked.connect(self.reset_facets)
+            self.facet_layout.addWidget(reset)
+        self.facet_bar.show()
+
+    def on_facet_toggled(self, field_id, value, checked):
+        values = self.facet_filter.setdefault(field_id, set())
+        if checked:
+            values.add(value)
+        else:
+            values.discard(value)
+        self.refresh_table()
 
-        self.status_label.setText(f"Записей: {len(self.table_data)}")
+    def reset_facets(self):
+        self.facet_filter = {}
+        self.refresh_table()
+
+    def current_record(self):
+        """Выделенная запись или None"""
+        index = self.table.currentIndex()
+        if not index.isValid():
+            return None
+        return self.model.record(index.row())
 
     def add_record(self):
         """Добавление новой записи"""
@@ -194,39 +564,49 @@ class TableViewer(QWidget):
 
     def edit_record(self):
         """Редактирование выбранной записи"""
-        current_row = self.table.currentRow()
+        current_row = self.table.currentIndex().row()
         if current_row >= 0:
             QMessageBox.information(self, "Редактирование", f"Редактирование записи {current_row + 1}")
 
     def delete_record(self):
         """Удаление выбранной записи"""
-        current_row = self.table.currentRow()
-        if current_row >= 0:
+        current_row = self.table.currentIndex().row()
+        record = self.current_record()
+        if record is not None:
             reply = QMessageBox.question(
                 self, "Подтверждение",
                 f"Удалить запись №{current_row + 1}?",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
             )
             if reply == QMessageBox.StandardButton.Yes:
-                self.table.removeRow(current_row)
-
+                if self.project_manager is not None:
+                    try:
+                        self.project_manager.delete_record(self.current_table['id'], record.id)
+                    except MigrationInProgress as e:
+                        QMessageBox.warning(self, "Внимание", f"{e}. Удалите запись после окончания преобразования.")
+                        return
+                    self.recordDeleted.emit(record.id)
+                else:
+                    self.table_data.remove(record)
+                    self.recordDeleted.emit(current_row)
+                self.refresh_table()
+
+    @traced('viewer.filter_table')
     def filter_table(self, text):
-        """Фильтрация таблицы по тексту"""
-        for row in range(self.table.rowCount()):
-            visible = False
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item and text.lower() in item.text().lower():
-                    visible = True
-                    break
-            self.table.setRowHidden(row, not visible)
+        """Фильтрация таблицы по тексту (выполняется запросом, а не обходом строк)"""
+        self.search_text = text
+        self.refresh_table()
 
     def on_selection_changed(self):
         """Обработка изменения выделения"""
-        has_selection = len(self.table.selectedIndexes()) > 0
+        has_selection = self.table.selectionModel().hasSelection()
         self.edit_btn.setEnabled(has_selection)
         self.delete_btn.setEnabled(has_selection)
 
     def on_field_selected(self, field_data):
-        """Вызывается при выборе поля в конструкторе"""
-        pass
\ No newline at end of file
+        """Вызывается при выборе поля в конструкторе: для Да/Нет, списка и оценки - фасеты"""
+        if field_data is not None and field_data.get('type_id') in INDEXED_TYPES:
+            self.facet_field = field_data['id']
+        else:
+            self.facet_field = None
+        self.update_facets()
\ No newline at end of file
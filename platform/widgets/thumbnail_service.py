@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Миниатюры для полей «Изображение»
+
+Картинки декодируются и уменьшаются в пуле потоков (QImageReader
+уменьшает JPEG прямо при декодировании), готовые миниатюры сохраняются
+на диск по ключу «хэш вложения + размер». В памяти GUI-потока держится
+LRU готовых QPixmap. Запросы, которые устарели из-за прокрутки, пропускаются.
+"""
+
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import *
+from PyQt6.QtGui import *
+
+from ..core.memory import accountant
+
+
+def default_thumbnail_folder():
+    return os.path.join(os.path.expanduser("~"), ".lowcode", "thumbnails")
+
+
+class ThumbnailService(QObject):
+    """Фоновая подготовка миниатюр с дисковым кэшем"""
+
+    thumbnailReady = pyqtSignal(str)
+
+    # Внутренний сигнал: испускается в рабочем потоке, обрабатывается в GUI-потоке
+    _decoded = pyqtSignal(str, QImage)
+
+    def __init__(self, blob_store, size=48, cache_folder=None, max_pixmaps=500, workers=2, parent=None):
+        super().__init__(parent)
+        self.blob_store = blob_store
+        self.size = size
+        self.cache_folder = cache_folder or default_thumbnail_folder()
+        self.max_pixmaps = max_pixmaps
+        os.makedirs(self.cache_folder, exist_ok=True)
+
+        self.pixmaps = OrderedDict()
+        self.pending = set()
+        self.failed = set()
+        self.wanted = set()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnails")
+
+        self._decoded.connect(self._on_decoded)
+        accountant.register(self, "Миниатюры", 'thumbnails', ThumbnailService.memory_usage,
+                            trim=ThumbnailService.trim)
+
+    def pixmap(self, blob_hash):
+        """Готовая миниатюра или None (тогда она ставится в очередь)"""
+        if not blob_hash:
+            return None
+        pixmap = self.pixmaps.get(blob_hash)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(blob_hash)
+            return pixmap
+        self.request(blob_hash)
+        return None
+
+    def request(self, blob_hash):
+        if blob_hash in self.pending or blob_hash in self.failed:
+            return
+        self.pending.add(blob_hash)
+        self.wanted.add(blob_hash)
+        self.executor.submit(self._load, blob_hash)
+
+    def set_visible(self, hashes):
+        """Хэши видимых строк: задания для остальных будут пропущены"""
+        self.wanted = set(hashes)
+        accountant.touch(self, "Миниатюры")
+
+    def cache_path(self, blob_hash):
+        return os.path.join(self.cache_folder, f"{blob_hash}_{self.size}.png")
+
+    def _load(self, blob_hash):
+        # Рабочий поток: только QImage, QPixmap создаётся в GUI-потоке
+        image = QImage()
+        try:
+            if blob_hash not in self.wanted:
+                return
+
+            cached = self.cache_path(blob_hash)
+            if os.path.exists(cached):
+                image.load(cached)
+
+            if image.isNull():
+                path = self.blob_store.path(blob_hash)
+                reader = QImageReader(path)
+                reader.setAutoTransform(True)
+                original = reader.size()
+                if original.isValid():
+                    reader.setScaledSize(original.scaled(
+                        self.size, self.size, Qt.AspectRatioMode.KeepAspectRatio
+                    ))
+                image = reader.read()
+                if not image.isNull():
+                    image.save(cached, "PNG")
+        finally:
+            self._decoded.emit(blob_hash, image)
+
+    def _on_decoded(self, blob_hash, image):
+        self.pending.discard(blob_hash)
+        if image.isNull():
+            # Не картинка или задание пропущено - повторный запрос только если строку снова покажут
+            if blob_hash in self.wanted:
+                self.failed.add(blob_hash)
+            return
+
+        self.pixmaps[blob_hash] = QPixmap.fromImage(image)
+        while len(self.pixmaps) > self.max_pixmaps:
+            self.pixmaps.popitem(last=False)
+        self.thumbnailReady.emit(blob_hash)
+
+    def memory_usage(self):
+        """(байт, миниатюр) - по размеру пикселей готовых QPixmap"""
+        pixmaps = list(self.pixmaps.values())
+        return sum(p.width() * p.height() * p.depth() // 8 for p in pixmaps), len(pixmaps)
+
+    def trim(self, target_bytes):
+        """Вытесняет давно не показанные миниатюры (с диска они загрузятся снова)"""
+        total, _ = self.memory_usage()
+        while self.pixmaps and total > target_bytes:
+            _, pixmap = self.pixmaps.popitem(last=False)
+            total -= pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+    def clear(self):
+        self.pixmaps.clear()
+        self.failed.clear()
+
+    def shutdown(self):
+        self.wanted = set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -6,10 +6,13 @@
 
 import os
 import json
+import logging
 import datetime
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass, field
 
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class Project:
@@ -72,17 +75,11 @@ class ProjectManager:
         
         # Создаем папку для проектов, если её нет
         try:
-            # Получаем абсолютный путь
             abs_path = os.path.abspath(projects_folder)
             os.makedirs(abs_path, exist_ok=True)
-            print(f"✅ Папка проектов: {abs_path}")
-            
-            # Проверяем, есть ли там файлы
-            if os.path.exists(abs_path):
-                files = os.listdir(abs_path)
-                print(f"📁 Файлы в папке: {files}")
+            logger.debug("Папка проектов: %s", abs_path)
         except Exception as e:
-            print(f"❌ Ошибка создания папки: {e}")
+            logger.error("Ошибка создания папки %s: %s", projects_folder, e)
     
     def create_project(self, name: str, description: str = "", author: str = "") -> Optional[Project]:
         """Создать новый проект"""
@@ -93,16 +90,16 @@ class ProjectManager:
                 author=author
             )
             self.current_file = None
-            print(f"✅ Проект '{name}' создан")
+            logger.info("Проект '%s' создан", name)
             return self.current_project
         except Exception as e:
-            print(f"❌ Ошибка создания проекта: {e}")
+            logger.error("Ошибка создания проекта: %s", e)
             return None
     
     def save_project(self, filename: Optional[str] = None) -> bool:
         """Сохранить текущий проект"""
         if not self.current_project:
-            print("❌ Нет текущего проекта для сохранения")
+            logger.warning("Нет текущего проекта для сохранения")
             return False
         
         try:
@@ -127,48 +124,31 @@ class ProjectManager:
             with open(self.current_file, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
             
-            print(f"✅ Проект сохранен: {self.current_file}")
-            
-            # Проверяем, что файл действительно создался
-            if os.path.exists(self.current_file):
-                print(f"📄 Файл создан, размер: {os.path.getsize(self.current_file)} байт")
-            else:
-                print(f"❌ Файл не создался!")
-            
+            logger.info("Проект сохранен: %s", self.current_file)
             return True
             
-        except Exception as e:
-            print(f"❌ Ошибка сохранения: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Ошибка сохранения: %s", self.current_file)
             return False
     
     def load_project(self, filename: str) -> Optional[Project]:
         """Загрузить проект из файла"""
         try:
-            print(f"📂 Загрузка проекта: {filename}")
-            
             if not os.path.exists(filename):
-                print(f"❌ Файл не найден: {filename}")
+                logger.error("Файл не найден: %s", filename)
                 return None
             
-            print(f"📄 Размер файла: {os.path.getsize(filename)} байт")
-            
             with open(filename, 'r', encoding='utf-8') as f:
                 data = json.load(f)
             
-            print(f"📊 Данные из файла: {list(data.keys())}")
-            
             self.current_project = Project.from_dict(data)
             self.current_file = filename
             
-            print(f"✅ Проект '{self.current_project.name}' загружен")
+            logger.info("Проект '%s' загружен: %s", self.current_project.name, filename)
             return self.current_project
             
-        except Exception as e:
-            print(f"❌ Ошибка загрузки: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Ошибка загрузки: %s", filename)
             return None
     
     def list_projects(self) -> List[Dict]:
@@ -176,27 +156,19 @@ class ProjectManager:
         projects = []
         
         try:
-            # Получаем абсолютный путь
             abs_path = os.path.abspath(self.projects_folder)
-            print(f"🔍 Поиск проектов в: {abs_path}")
-            
             if not os.path.exists(abs_path):
-                print(f"📁 Папка не найдена: {abs_path}")
+                logger.warning("Папка проектов не найдена: %s", abs_path)
                 return projects
             
-            # Смотрим все файлы в папке
-            all_files = os.listdir(abs_path)
-            print(f"📋 Все файлы в папке: {all_files}")
-            
             # Ищем файлы с расширением .ncp
-            ncp_files = [f for f in all_files if f.endswith('.ncp')]
-            print(f"📋 NCP файлы: {ncp_files}")
+            ncp_files = [f for f in os.listdir(abs_path) if f.endswith('.ncp')]
+            # Уровень проверяется один раз, а не на каждом файле
+            debug = logger.isEnabledFor(logging.DEBUG)
             
             for file in ncp_files:
                 filepath = os.path.join(abs_path, file)
                 try:
-                    print(f"📄 Чтение файла: {file}")
-                    
                     with open(filepath, 'r', encoding='utf-8') as f:
                         data = json.load(f)
                     
@@ -209,19 +181,18 @@ class ProjectManager:
                     }
                     
                     projects.append(project_info)
-                    print(f"✅ Найден проект: {project_info['name']}")
+                    if debug:
+                        logger.debug("Найден проект: %s (%s)", project_info['name'], file)
                     
                 except json.JSONDecodeError as e:
-                    print(f"⚠️ Ошибка JSON в {file}: {e}")
+                    logger.warning("Ошибка JSON в %s: %s", file, e)
                 except Exception as e:
-                    print(f"⚠️ Ошибка чтения {file}: {e}")
+                    logger.warning("Ошибка чтения %s: %s", file, e)
                     continue
             
-            print(f"📊 Всего проектов найдено: {len(projects)}")
+            logger.debug("Проектов в %s: %d", abs_path, len(projects))
             
-        except Exception as e:
-            print(f"❌ Ошибка списка проектов: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Ошибка списка проектов: %s", self.projects_folder)
         
         return projects
\ No newline at end of file
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+"""
+Тесты целых чисел с фиксированной точкой (core.fixed_point)
+
+Запуск из корня репозитория (pytest там не работает: пакет platform
+закрывает одноимённый модуль стандартной библиотеки):
+
+    python -m unittest discover tests
+"""
+
+import unittest
+from decimal import Decimal
+
+from platform.core import fixed_point
+from platform.core.fixed_point import FACTOR
+
+
+class DivRoundTest(unittest.TestCase):
+
+    def test_half_away_from_zero(self):
+        self.assertEqual(fixed_point.div_round(5, 2), 3)
+        self.assertEqual(fixed_point.div_round(-5, 2), -3)
+        self.assertEqual(fixed_point.div_round(5, -2), -3)
+        self.assertEqual(fixed_point.div_round(4, 3), 1)
+        self.assertEqual(fixed_point.div_round(-4, 3), -1)
+
+
+class ToUnitsTest(unittest.TestCase):
+
+    def test_numbers(self):
+        self.assertEqual(fixed_point.to_units(12), 12 * FACTOR)
+        self.assertEqual(fixed_point.to_units(0.1), 1000)
+        self.assertEqual(fixed_point.to_units(Decimal('1234.5')), 12345000)
+
+    def test_user_text(self):
+        self.assertEqual(fixed_point.to_units("1 234,50 ₽"), 12345000)
+        self.assertEqual(fixed_point.to_units("20%"), 20 * FACTOR)
+        self.assertEqual(fixed_point.to_units("-0,00005"), -1)
+
+    def test_empty_and_invalid(self):
+        self.assertIsNone(fixed_point.to_units(None))
+        self.assertIsNone(fixed_point.to_units(''))
+        for value in ("abc", True, float('nan'), [1]):
+            with self.assertRaises(ValueError):
+                fixed_point.to_units(value)
+        self.assertIsNone(fixed_point.to_units_or_none("abc"))
+
+
+class ArithmeticTest(unittest.TestCase):
+
+    def test_mul_div(self):
+        price, rate = fixed_point.to_units("19,99"), fixed_point.to_units("0,15")
+        self.assertEqual(fixed_point.mul(price, rate), fixed_point.to_units("2,9985"))
+        self.assertEqual(fixed_point.div(10 * FACTOR, 3 * FACTOR), 33333)
+        self.assertIsNone(fixed_point.div(FACTOR, 0))
+
+    def test_no_float_drift(self):
+        total = sum(fixed_point.to_units("0,1") for _ in range(10))
+        self.assertEqual(total, FACTOR)
+
+
+class FormatTest(unittest.TestCase):
+
+    def test_format_units(self):
+        self.assertEqual(fixed_point.format_units(12345000, 2, suffix="₽"), "1\u00a0234,50 ₽")
+        self.assertEqual(fixed_point.format_units(12345, 2, thousands=False), "1,23")
+        self.assertEqual(fixed_point.format_units(-5000, 0), "-1")
+        self.assertEqual(fixed_point.format_units(0, 1), "0,0")
+
+    def test_format_plain(self):
+        self.assertEqual(fixed_point.format_plain(12345000), "1234.5")
+        self.assertEqual(fixed_point.format_plain(20 * FACTOR), "20")
+
+    def test_round_units(self):
+        self.assertEqual(fixed_point.round_units(12345, 2), 12300)
+        self.assertEqual(fixed_point.round_units(12355, 2), 12400)
+        self.assertEqual(fixed_point.round_units(12345, 6), 12345)
+
+
+class AggregateTest(unittest.TestCase):
+
+    def test_sum_and_avg_skip_empty(self):
+        values = [FACTOR, None, 2 * FACTOR, None]
+        self.assertEqual(fixed_point.sum_units(values), 3 * FACTOR)
+        self.assertEqual(fixed_point.avg_units(values), 15000)
+        self.assertIsNone(fixed_point.avg_units([None]))
+
+    def test_large_column(self):
+        values = [FACTOR] * (fixed_point.NUMPY_MIN_SIZE + 1)
+        self.assertEqual(fixed_point.sum_units(values), len(values) * FACTOR)
+
+
+if __name__ == '__main__':
+    unittest.main()
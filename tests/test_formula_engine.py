@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""
+Тесты арифметики формул на деньгах, процентах и целых и кэша колонок
+формул (core.formula_engine)
+
+    python -m unittest discover tests
+"""
+
+import unittest
+
+from platform.core import fixed_point
+from platform.core.formula_engine import FormulaCache, FormulaEngine, FormulaError
+from platform.core.schema import FieldDef, TableDef
+
+
+def units(text):
+    return fixed_point.to_units(text)
+
+
+class FormulaArithmeticTest(unittest.TestCase):
+
+    def setUp(self):
+        table = TableDef(id='goods', name_ru="Товары", fields=[
+            FieldDef(id='price', name_ru="Цена", name_en='price', type_id='money'),
+            FieldDef(id='discount', name_ru="Скидка", name_en='discount', type_id='percent'),
+            FieldDef(id='qty', name_ru="Количество", name_en='qty', type_id='integer'),
+        ])
+        self.engine = FormulaEngine(table)
+        # Цена 1000 ₽, скидка 20%, 3 шт. - в хранимом виде
+        self.record = {'price': units("1000"), 'discount': units("20"), 'qty': 3}
+
+    def evaluate(self, text, record=None):
+        formula = self.engine.compile(text)
+        value = formula.evaluate(record or self.record)
+        return formula, value
+
+    def assertResult(self, text, kind, expected_text):
+        formula, value = self.evaluate(text)
+        self.assertEqual(formula.kind, kind, text)
+        self.assertEqual(formula.as_text(value), expected_text, text)
+
+    def test_money_times_percent(self):
+        self.assertResult("[Цена]*[Скидка]", 'fixed', "200")
+        self.assertResult("[Цена]*(1-[Скидка])", 'fixed', "800")
+        self.assertResult("[Цена]-[Цена]*[Скидка]", 'fixed', "800")
+
+    def test_money_and_integer(self):
+        self.assertResult("[Цена]*[Количество]", 'fixed', "3000")
+        self.assertResult("[Цена]/[Количество]", 'fixed', "333.3333")
+        self.assertResult("[Цена]+[Количество]", 'fixed', "1003")
+
+    def test_integer_only(self):
+        self.assertResult("[Количество]*2+1", 'int', "7")
+        self.assertResult("[Количество]/2", 'fixed', "1.5")
+
+    def test_percent_with_integer_and_percent(self):
+        self.assertResult("[Скидка]*[Количество]", 'fixed', "0.6")
+        self.assertResult("[Скидка]+[Скидка]", 'fixed', "0.4")
+        self.assertResult("1+[Скидка]", 'fixed', "1.2")
+
+    def test_percent_alone_stays_percent(self):
+        self.assertResult("[Скидка]", 'percent', "20")
+        self.assertResult("-[Скидка]", 'percent', "-20")
+
+    def test_percent_comparison(self):
+        self.assertResult("[Скидка]>0,1", 'bool', "Да")
+        self.assertResult("[Скидка]=0,2", 'bool', "Да")
+        self.assertResult("[Скидка]>[Количество]", 'bool', "Нет")
+
+    def test_percent_in_functions(self):
+        self.assertResult("ЕСЛИ([Количество]>2;[Скидка];0)", 'fixed', "0.2")
+        self.assertResult("ROUND([Цена]*[Скидка]/7;2)", 'fixed', "28.57")
+
+    def test_column_aggregates(self):
+        records = [
+            {'price': units("10,5"), 'discount': units("10"), 'qty': 1},
+            {'price': units("20"), 'discount': units("30"), 'qty': None},
+        ]
+        for text, expected in (
+            ("SUM([Цена])", ["30.5", "30.5"]),
+            ("AVG([Скидка])", ["20", "20"]),
+            ("[Цена]*[Скидка]/SUM([Скидка])", ["2.625", "15"]),
+            ("[Количество]+SUM([Количество])", ["2", None]),
+        ):
+            formula = self.engine.compile(text)
+            self.assertEqual([formula.as_text(v) for v in formula.evaluate_all(records)], expected, text)
+
+    def test_empty_operand(self):
+        formula, value = self.evaluate("[Цена]*[Скидка]", {'price': units("5"), 'discount': None, 'qty': 1})
+        self.assertIsNone(value)
+
+    def test_division_by_zero(self):
+        formula, value = self.evaluate("[Цена]/([Количество]-3)")
+        self.assertIsNone(value)
+
+    def test_unknown_field(self):
+        with self.assertRaises(FormulaError):
+            self.engine.compile("[Вес]*2")
+
+
+class FormulaCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = FormulaCache()
+
+    def test_stored_results_replace_column(self):
+        self.cache.column('goods', 'total', lambda: ['1', '2'])
+        self.cache.table_aggregates('goods')[('SUM', 'total')] = 3
+        self.cache.store('goods', 'total', ['2', '4'], self.cache.generation)
+        self.assertEqual(self.cache.column('goods', 'total', lambda: self.fail("колонка читается заново")), ['2', '4'])
+        self.assertNotIn(('SUM', 'total'), self.cache.table_aggregates('goods'))
+
+    def test_results_from_before_data_change_are_dropped(self):
+        generation = self.cache.generation
+        self.cache.invalidate('goods')
+        self.cache.store('goods', 'total', ['2', '4'], generation)
+        self.assertEqual(self.cache.column('goods', 'total', lambda: ['3']), ['3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""
+Тесты выгрузки и загрузки таблиц (core.table_io): записи, выгруженные
+в CSV или JSON, загружаются обратно без потерь
+
+    python -m unittest discover tests
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from platform.core.table_io import export_table, import_table
+from platform.project_manager import ProjectManager
+
+
+class TableRoundTripTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.manager = ProjectManager(self.folder, use_snapshot_cache=False)
+        self.manager.create_project("Тест")
+        self.manager.save_project(os.path.join(self.folder, "test.ncp"))
+
+    def tearDown(self):
+        self.manager.close_database()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def create_table(self, name, fields):
+        table = self.manager.create_table(name)
+        data = table.to_dict()
+        data['fields'] = fields
+        self.manager.update_table(data)
+        return table.id
+
+    def round_trip(self, fields, records, fmt):
+        source = self.create_table("Источник", fields)
+        self.manager.add_records(source, records)
+        path = os.path.join(self.folder, f"data.{fmt}")
+        self.assertEqual(export_table(self.manager, source, path), len(records))
+
+        target = self.create_table("Копия", fields)
+        result = import_table(self.manager, target, path)
+        self.assertEqual((result['imported'], result['skipped']), (len(records), 0))
+        rows = lambda table_id: [record.as_dict() for record in self.manager.iter_records(table_id)]
+        self.assertEqual([{k: v for k, v in row.items() if k != 'id'} for row in rows(target)],
+                         [{k: v for k, v in row.items() if k != 'id'} for row in rows(source)])
+
+    def test_csv_single_column(self):
+        # Разделитель в файле с одной колонкой не определяется по содержимому
+        fields = [{'id': 'name', 'name_ru': "Имя", 'type_id': 'text'}]
+        self.round_trip(fields, [{'name': "Анна"}, {'name': "Борис"}, {'name': None}], 'csv')
+
+    def typed_fields(self):
+        return [
+            {'id': 'name', 'name_ru': "Имя", 'type_id': 'text'},
+            {'id': 'price', 'name_ru': "Цена", 'type_id': 'money'},
+            {'id': 'day', 'name_ru': "Дата", 'type_id': 'date'},
+            {'id': 'count', 'name_ru': "Количество", 'type_id': 'integer'},
+            {'id': 'status', 'name_ru': "Статус", 'type_id': 'list', 'options': ["Новый", "Готово"]},
+        ]
+
+    def typed_records(self):
+        return [
+            {'name': "Анна", 'price': "1234,50", 'day': "01.02.2024", 'count': 3, 'status': "Новый"},
+            {'name': "Борис; младший", 'price': "0,99", 'day': None, 'count': None, 'status': "Готово"},
+        ]
+
+    def test_csv_typed_columns(self):
+        self.round_trip(self.typed_fields(), self.typed_records(), 'csv')
+
+    def test_json_typed_columns(self):
+        self.round_trip(self.typed_fields(), self.typed_records(), 'json')
+
+
+if __name__ == '__main__':
+    unittest.main()